@@ -9,6 +9,7 @@ gSpan_path = os.path.join(currentdir, "gSpan")
 sys.path.append(gSpan_path)
 from gspan_mining.config import parser as gSpanParser
 from gspan_mining.main import main
+from gspan_mining.registry import PatternRegistry
 
 # Importing Other Scripts
 import ruleMining as rm
@@ -177,15 +178,17 @@ if __name__ == "__main__":
     freq_seqs = rm.frequentSequences(gs, samples, 3, 7, 1, 1)
 
     # reID variables, needed because when we run this script for different months, we get same ID's (always starts from 0)
-    # But we need them to be different, thus we need to change start_ID and reID them
-    subgraphs, samples, freq_seqs, support_where = utils.reID(gs.subgraphs, samples, freq_seqs, support_where, start_ID=0)
+    # The registry gives every subgraph the same global ID in all months, so months can be run in any order, or at once
+    registry = PatternRegistry('../data/months/prediction/registry.pkl', is_undirected=(not FLAGS.directed))
+    subgraphs, samples, freq_seqs, support_where = utils.reID(gs.subgraphs, samples, freq_seqs, support_where, registry=registry)
 
     # Mine rules from frequent sequences
     rules = rm.mineRulesFromSequences(freq_seqs, support_where, 0.8)
     
     # Save information mined for a specific month
-    utils.save_month(subgraphs=subgraphs, rules=rules, graphs=gs.graphs,
+    # gs.graphs holds all graphs in flat arrays, they are saved as Graph objects as before
+    graphs = {gid: gs.graphs.to_graph(gid) for gid in range(len(gs.graphs))}
+    utils.save_month(subgraphs=subgraphs, rules=rules, graphs=graphs,
 			freq_seqs=freq_seqs, support_where=support_where, name='../data/months/prediction/january')
 
-    # Modify start_ID for next month with the given number
-    print("Next month subgraph ID :", max(samples) + 1)
+    print("Registered Subgraph Count :", len(registry))
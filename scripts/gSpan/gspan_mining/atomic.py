@@ -0,0 +1,32 @@
+"""Write files at once, so readers never see them half written."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import contextlib
+import os
+import pickle
+
+
+@contextlib.contextmanager
+def atomic_open(file_name, mode='wb'):
+    """Open a temporary file that replaces `file_name` once closed.
+
+    The temporary file is named after the process, so processes writing
+    the same file do not clash; the last one to finish wins. If the block
+    raises, `file_name` is left as it was.
+    """
+    tmp_file = '{}.tmp{}'.format(file_name, os.getpid())
+    try:
+        with open(tmp_file, mode) as f:
+            yield f
+        os.replace(tmp_file, file_name)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def dump_pickle(obj, file_name):
+    """Pickle `obj` to `file_name`, replacing it at once."""
+    with atomic_open(file_name, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
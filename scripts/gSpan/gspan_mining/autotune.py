@@ -0,0 +1,155 @@
+"""Choose min_support from a pattern count or time budget."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import math
+import time
+
+import numpy as np
+
+from .database import GraphDatabase
+from .gspan import gSpan
+from .sampling import sample_graphs
+from .sweep import PatternLattice
+
+
+class SupportEstimate(object):
+    """Pattern counts at any support, extrapolated from a sample.
+
+    A pattern of support s in the N graphs has about s * n / N in a
+    random sample of n, so the patterns of the sample with at least that
+    support estimate those of the full run. The frequent 1-edge patterns,
+    counted exactly in all graphs, bound the estimate from below.
+    """
+
+    def __init__(self, num_graphs, edge_supports, sample_size,
+                 sample_min_support, sample_supports, sample_seconds):
+        """Initialize SupportEstimate instance.
+
+        Args:
+            num_graphs: number of graphs.
+            edge_supports: supports of the (vlb, elb, vlb) triples in all
+                graphs.
+            sample_size: number of graphs in the sample.
+            sample_min_support: support the sample is mined at.
+            sample_supports: supports of the patterns found in the sample.
+            sample_seconds: time mining the sample took.
+        """
+        self.num_graphs = num_graphs
+        self.edge_supports = np.sort(np.asarray(edge_supports,
+                                                dtype=np.int64))
+        self.sample_size = sample_size
+        self.sample_min_support = sample_min_support
+        self.sample_supports = np.sort(np.asarray(sample_supports,
+                                                  dtype=np.int64))
+        self.sample_seconds = sample_seconds
+
+    def _count(self, supports, min_support):
+        return len(supports) - int(np.searchsorted(supports, min_support))
+
+    def sample_support(self, min_support):
+        """Return the support in the sample matching min_support."""
+        return max(1, int(math.ceil(min_support * self.sample_size /
+                                    max(self.num_graphs, 1))))
+
+    def num_patterns(self, min_support):
+        """Estimate the number of patterns at min_support."""
+        return max(self._count(self.edge_supports, min_support),
+                   self._count(self.sample_supports,
+                               self.sample_support(min_support)))
+
+    def seconds(self, min_support):
+        """Estimate the time of a run at min_support.
+
+        Time is taken as proportional to the patterns found and to the
+        number of graphs their embeddings are looked up in.
+        """
+        found = self._count(self.sample_supports,
+                            self.sample_support(min_support))
+        per_pattern = self.sample_seconds / max(len(self.sample_supports), 1)
+        return (per_pattern * max(found, 1) * self.num_graphs /
+                max(self.sample_size, 1))
+
+    def choose(self, max_patterns=None, time_budget=None):
+        """Return the lowest support estimated to stay within budget.
+
+        Supports whose sample support is below the one the sample is mined
+        at are not estimated, and not chosen.
+        """
+        lo = (self.sample_min_support - 1) * self.num_graphs // max(
+            self.sample_size, 1) + 1
+        hi = max(self.num_graphs, lo)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ((max_patterns is None or
+                    self.num_patterns(mid) <= max_patterns) and
+                    (time_budget is None or self.seconds(mid) <= time_budget)):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+
+def estimate_supports(database_file_name, max_patterns=None,
+                      sample_size=1000, sample_budget=60, seed=None,
+                      is_undirected=True, max_num_vertices=float('inf'),
+                      max_ngraphs=float('inf'), start_gid=None, hub=None):
+    """Mine a sample of the graphs for a SupportEstimate.
+
+    The sample is mined at the support of the `max_patterns`-th most
+    frequent 1-edge pattern, below which the budget is exceeded for sure,
+    for at most `sample_budget` seconds. Runs that do not finish are
+    repeated at twice the support.
+    """
+    db = GraphDatabase.from_file(database_file_name,
+                                 is_undirected=is_undirected,
+                                 max_ngraphs=max_ngraphs,
+                                 start_gid=start_gid)
+    num_graphs = len(db)
+    _, edge_supports = db.graph_support(db.edge_triples(), db.edge_gids())
+    sample_size = int(min(sample_size, num_graphs))
+    sample = sample_graphs(num_graphs, sample_size, seed)
+    lowest = 1
+    if max_patterns is not None and max_patterns < len(edge_supports):
+        lowest = int(np.sort(edge_supports)[::-1][max_patterns]) + 1
+    support = max(1, int(math.ceil(lowest * sample_size /
+                                   max(num_graphs, 1))))
+    while True:
+        lattice = PatternLattice(support, max_num_vertices,
+                                 is_undirected=is_undirected)
+        gs = gSpan(
+            database_file_name=db,
+            min_support=support,
+            max_num_vertices=max_num_vertices,
+            is_undirected=is_undirected,
+            quiet=True,
+            lattice=lattice,
+            hub=hub,
+            sample=sample,
+            time_budget=sample_budget,
+        )
+        start = time.time()
+        gs.run()
+        if not gs.truncated or support >= sample_size:
+            break
+        support *= 2
+    return SupportEstimate(num_graphs, edge_supports, sample_size, support,
+                           lattice.supports, time.time() - start)
+
+
+def choose_support(database_file_name, max_patterns=None, time_budget=None,
+                   verbose=True, **kwargs):
+    """Return the min_support of a run within the budgets.
+
+    Extra keyword arguments are passed to estimate_supports().
+    """
+    estimate = estimate_supports(database_file_name,
+                                 max_patterns=max_patterns, **kwargs)
+    support = estimate.choose(max_patterns, time_budget)
+    if verbose:
+        print('Chose support {} of {} graphs, about {} patterns in {} '
+              's'.format(support, estimate.num_graphs,
+                         estimate.num_patterns(support),
+                         round(estimate.seconds(support), 2)))
+    return support
@@ -0,0 +1,174 @@
+"""Memoization of gSpan minimality checks."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+from .graph import VACANT_VERTEX_LABEL
+
+
+def _vertex_labels(code):
+    vlbs = dict()
+    for frm, to, vlb1, _, vlb2 in code:
+        if vlb1 != VACANT_VERTEX_LABEL:
+            vlbs[frm] = vlb1
+        if vlb2 != VACANT_VERTEX_LABEL:
+            vlbs[to] = vlb2
+    return vlbs
+
+
+def graph_key(code, is_undirected=True):
+    """Return a key of the graph of a DFS code tuple.
+
+    The key is the multiset of vertex labels and of (vlb, elb, vlb) edge
+    triples, so it is the same for every DFS code of a graph, whichever
+    order the code was grown in. Graphs that are not isomorphic may share
+    a key.
+    """
+    vlbs = _vertex_labels(code)
+    triples = list()
+    for frm, to, _, elb, _ in code:
+        vlb1, vlb2 = vlbs[frm], vlbs[to]
+        if is_undirected and vlb2 < vlb1:
+            vlb1, vlb2 = vlb2, vlb1
+        triples.append((vlb1, elb, vlb2))
+    return tuple(sorted(vlbs.values())), tuple(sorted(triples))
+
+
+def is_isomorphic(code_a, code_b, is_undirected=True):
+    """Check if the graphs of two DFS code tuples with one key match.
+
+    The codes must have the same graph_key(), so mapping the edges of
+    `code_a` one to one onto edges of `code_b` maps the whole graph.
+    """
+    vlbs_a, vlbs_b = _vertex_labels(code_a), _vertex_labels(code_b)
+    edges_b = dict()
+    for frm, to, _, elb, _ in code_b:
+        edges_b[(frm, to)] = elb
+        if is_undirected:
+            edges_b[(to, frm)] = elb
+    out_b = collections.defaultdict(list)
+    for frm, to in edges_b:
+        out_b[frm].append(to)
+    mapping, used = dict(), set()
+
+    def extend(depth):
+        if depth == len(code_a):
+            return True
+        frm, to, _, elb, _ = code_a[depth]
+        if frm in mapping and to in mapping:
+            return (edges_b.get((mapping[frm], mapping[to])) == elb and
+                    extend(depth + 1))
+        if frm in mapping:
+            pairs = [(mapping[frm], y) for y in out_b[mapping[frm]]]
+        else:
+            pairs = list(edges_b)
+        for x, y in pairs:
+            if (y in used or (frm not in mapping and x in used) or
+                    edges_b[(x, y)] != elb or vlbs_b[y] != vlbs_a[to] or
+                    vlbs_b[x] != vlbs_a[frm]):
+                continue
+            new = [(frm, x)] if frm not in mapping else []
+            new.append((to, y))
+            for p, v in new:
+                mapping[p] = v
+                used.add(v)
+            if extend(depth + 1):
+                return True
+            for p, v in new:
+                del mapping[p]
+                used.discard(v)
+        return False
+
+    return extend(0)
+
+
+class CanonicalCache(object):
+    """Bounded LRU cache of minimum DFS code checks.
+
+    gSpan builds every DFS code once, but reaches a graph through as many
+    codes as it has growth orders; all but its minimum code are pruned.
+    Entries are therefore keyed by graph_key(), which does not depend on
+    the growth order, and hold the codes checked under that key with the
+    verdict and the minimum DFS code, as far as it was built before the
+    verdict was clear. A code isomorphic to a cached one, verified with
+    is_isomorphic(), is minimum iff it equals the cached minimum code, or
+    is not minimum if it departs from the cached prefix of it.
+
+    Codes use interned labels, so the cache is bound to a labelling
+    context and is cleared when used under another one; one cache can
+    therefore be shared by several runs on the same database.
+    """
+
+    def __init__(self, maxsize=65536, is_undirected=True):
+        """Initialize CanonicalCache instance.
+
+        Args:
+            maxsize: max number of cached keys, 0 disables the cache.
+            is_undirected: whether codes are of undirected graphs.
+        """
+        self.maxsize = maxsize
+        self.is_undirected = is_undirected
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._context = None
+
+    def __len__(self):
+        """Return number of cached keys."""
+        return len(self._entries)
+
+    def bind(self, context, is_undirected=None):
+        """Use the cache for codes of `context`, clearing other entries.
+
+        Args:
+            context: hashable description of how codes are labelled, such
+                as the label names and whether graphs are undirected.
+            is_undirected: whether codes are of undirected graphs, if it
+                changes.
+        """
+        if is_undirected is not None:
+            self.is_undirected = is_undirected
+        if context != self._context:
+            self._entries.clear()
+            self._context = context
+        return self
+
+    def key(self, code):
+        """Return the key of DFS code tuple `code`."""
+        return graph_key(code, self.is_undirected)
+
+    def get(self, key, code):
+        """Return (is_min, min_code) of DFS code tuple `code`, or None.
+
+        `min_code` is the minimum DFS code of the graph, or a prefix of it
+        if the verdict was clear before it was built in full.
+        """
+        entries = self._entries.get(key) if self.maxsize > 0 else None
+        for cached, is_min, min_code in entries or ():
+            if code == cached:
+                verdict = is_min, min_code
+            elif not is_isomorphic(code, cached, self.is_undirected):
+                continue
+            elif is_min or len(min_code) == len(code):
+                # The whole minimum code is known.
+                verdict = code == min_code, min_code
+            elif code[:len(min_code)] != min_code:
+                verdict = False, min_code
+            else:
+                continue
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return verdict
+        self.misses += 1
+        return None
+
+    def put(self, key, code, is_min, min_code):
+        """Cache the verdict and minimum code computed for `code`."""
+        if self.maxsize <= 0:
+            return
+        self._entries.setdefault(key, list()).append((code, is_min, min_code))
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -0,0 +1,59 @@
+"""Compile a database in gSpan text format to the binary format."""
+# -*- coding=utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import sys
+import time
+
+from .config import str2bool
+from .database import GraphDatabase
+
+
+parser = argparse.ArgumentParser(
+    description='Compile a gSpan text database so that gSpan maps it into '
+                'memory instead of parsing it.')
+parser.add_argument(
+    'database_file_name',
+    type=str,
+    help='str, database file name in gSpan text format'
+)
+parser.add_argument(
+    'output_file_name',
+    type=str,
+    help='str, binary database file to write'
+)
+parser.add_argument(
+    '-d', '--directed',
+    type=str2bool,
+    default=False,
+    help='bool, compile for directed graphs, default off, i.e. undirected '
+         'graphs'
+)
+
+
+def compile_database(database_file_name, output_file_name,
+                     is_undirected=True):
+    """Compile `database_file_name` to `output_file_name`."""
+    db = GraphDatabase.from_gspan_file(database_file_name,
+                                       is_undirected=is_undirected)
+    db.save(output_file_name)
+    return db
+
+
+def main(FLAGS=None):
+    """Run the compiler."""
+    if FLAGS is None:
+        FLAGS = parser.parse_args(args=sys.argv[1:])
+    start = time.time()
+    db = compile_database(FLAGS.database_file_name, FLAGS.output_file_name,
+                          is_undirected=(not FLAGS.directed))
+    print('Compiled {} graphs, {} vertices in {} s'.format(
+        len(db), db.num_vertices, round(time.time() - start, 2)))
+    return db
+
+
+if __name__ == '__main__':
+    main()
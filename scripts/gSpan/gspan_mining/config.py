@@ -5,6 +5,9 @@ from __future__ import print_function
 
 import argparse
 
+from .gspan import PATTERN_TYPES
+from .report import REPORT_MODES
+
 
 def str2bool(s):
     """Convert str to bool."""
@@ -25,6 +28,29 @@ parser.add_argument(
     help='only read the first n graphs in the given database, '
          'default inf, i.e. all graphs'
 )
+parser.add_argument(
+    '--start_gid',
+    type=int,
+    default=None,
+    help='int, read graphs from the one with this id (its t # id line) on, '
+         'so that -n graphs from it form the mined window, default none, '
+         'i.e. the first graph'
+)
+parser.add_argument(
+    '--date_range',
+    type=str,
+    default=None,
+    help='str, FIRST:LAST, mine the graphs dated FIRST .. LAST '
+         '(YYYY-MM-DD) according to --dates_file, instead of --start_gid '
+         'and -n'
+)
+parser.add_argument(
+    '--dates_file',
+    type=str,
+    default=None,
+    help='str, csv file with the date of graph i on row i, used by '
+         '--date_range'
+)
 parser.add_argument(
     '-l', '--lower_bound_of_num_vertices',
     type=int,
@@ -53,7 +79,8 @@ parser.add_argument(
 parser.add_argument(
     'database_file_name',
     type=str,
-    help='str, database file name'
+    help='str, database file name, in gSpan text format or compiled by '
+         'python -m gspan_mining.compile_db'
 )
 parser.add_argument(
     '-p', '--plot',
@@ -68,3 +95,174 @@ parser.add_argument(
     help='bool, output where one frequent subgraph appears in database, '
          'default off'
 )
+parser.add_argument(
+    '--workers',
+    type=int,
+    default=1,
+    help='int, number of processes mining root edge branches in parallel, '
+         'default 1, i.e. serial'
+)
+parser.add_argument(
+    '--report',
+    type=str,
+    default='none',
+    choices=REPORT_MODES,
+    help='str, where to stream mined patterns: none, jsonl or binary '
+         '(columnar), default none'
+)
+parser.add_argument(
+    '--report_file',
+    type=str,
+    default=None,
+    help='str, output file of --report jsonl and binary'
+)
+parser.add_argument(
+    '-q', '--quiet',
+    type=str2bool,
+    default=False,
+    help='bool, do not print mined patterns, default off'
+)
+parser.add_argument(
+    '--canonical_cache_size',
+    type=int,
+    default=65536,
+    help='int, max number of cached minimum DFS code checks, 0 disables '
+         'the cache, default 65536'
+)
+parser.add_argument(
+    '--prune_infrequent',
+    type=str2bool,
+    default=True,
+    help='bool, drop infrequent vertex labels and edges before mining, '
+         'default on'
+)
+parser.add_argument(
+    '--lattice_file',
+    type=str,
+    default=None,
+    help='str, save all patterns with their supports to this file, so that '
+         'runs at higher supports can be answered by '
+         'sweep.PatternLattice.load(file).query(min_support)'
+)
+parser.add_argument(
+    '--pattern_type',
+    type=str,
+    default='all',
+    choices=PATTERN_TYPES,
+    help='str, output all frequent subgraphs, only closed ones (no '
+         'supergraph with the same support) or only maximal ones (no '
+         'frequent supergraph), default all'
+)
+parser.add_argument(
+    '--checkpoint_file',
+    type=str,
+    default=None,
+    help='str, periodically save the search state to this file and resume '
+         'from it when it exists, default none'
+)
+parser.add_argument(
+    '--checkpoint_interval',
+    type=float,
+    default=300,
+    help='float, seconds between checkpoints, default 300'
+)
+parser.add_argument(
+    '--stats_file',
+    type=str,
+    default=None,
+    help='str, collect calls and times of the mining hot path and search '
+         'counters, and dump them to this JSON file, default none'
+)
+parser.add_argument(
+    '--required_vlbs',
+    type=str,
+    default=None,
+    help='str, comma separated vertex labels, only output subgraphs '
+         'containing one of them, e.g. 2,3,4,5,6,7,8,9 for the named '
+         'entities of news graphs, default none'
+)
+parser.add_argument(
+    '--allowed_elbs',
+    type=str,
+    default=None,
+    help='str, comma separated edge labels subgraphs may use, '
+         'default none, i.e. all'
+)
+parser.add_argument(
+    '--max_fanout',
+    type=int,
+    default=None,
+    help='int, max number of --fanout_elb edges at one vertex of a '
+         'subgraph, default none'
+)
+parser.add_argument(
+    '--fanout_elb',
+    type=str,
+    default='1',
+    help='str, edge label counted by --max_fanout, default 1, i.e. '
+         'CONTAINS in news graphs'
+)
+parser.add_argument(
+    '--hub_vlb',
+    type=str,
+    default=None,
+    help='str, label of hub vertices left out while mining and re-attached '
+         'to the output subgraphs, e.g. 10 for News in news graphs, '
+         'default none'
+)
+parser.add_argument(
+    '--hub_elb',
+    type=str,
+    default='1',
+    help='str, label of the edges from --hub_vlb vertices, default 1, i.e. '
+         'CONTAINS in news graphs'
+)
+parser.add_argument(
+    '--sample_size',
+    type=float,
+    default=None,
+    help='float, mine a random sample of this many graphs, or this fraction '
+         'of them if below 1, for candidates, then count the candidates in '
+         'all graphs for exact supports, default none, i.e. no sampling'
+)
+parser.add_argument(
+    '--sample_delta',
+    type=float,
+    default=0.05,
+    help='float, max probability that --sample_size misses a frequent '
+         'subgraph, default 0.05'
+)
+parser.add_argument(
+    '--sample_seed',
+    type=int,
+    default=None,
+    help='int, seed of the samples of --sample_size and --auto_support, '
+         'default none, i.e. random'
+)
+parser.add_argument(
+    '--max_patterns',
+    type=int,
+    default=None,
+    help='int, stop once this many frequent subgraphs are found, default '
+         'none, i.e. no limit'
+)
+parser.add_argument(
+    '--time_budget',
+    type=float,
+    default=None,
+    help='float, stop mining after this many seconds, default none, i.e. '
+         'no limit'
+)
+parser.add_argument(
+    '--auto_support',
+    type=str2bool,
+    default=False,
+    help='bool, choose --min_support from --max_patterns and --time_budget '
+         'by mining a sample, default off'
+)
+parser.add_argument(
+    '--tune_sample_size',
+    type=int,
+    default=1000,
+    help='int, number of graphs --auto_support mines, default 1000'
+)
@@ -0,0 +1,139 @@
+"""Constraints on the mined patterns, enforced during growth."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+
+
+class PatternConstraints(object):
+    """Constraints pushed into the gSpan search.
+
+    Labels are given as they appear in the database file and are interned
+    by bind(). Each constraint prunes the search where it is sound to:
+
+    - `allowed_elbs`: edges with other labels can not be in a pattern, so
+      they are dropped from the mining database.
+    - `required_vlbs`: patterns must contain a vertex with one of these
+      labels. Graphs without such a vertex can not support a reported
+      pattern and are dropped, patterns without one are not reported, and
+      they are not grown once they have max_num_vertices vertices.
+    - `max_fanout`: no pattern vertex may have more than `max_fanout`
+      edges labelled `fanout_elb`. Adding edges never lowers that count,
+      so extensions exceeding it are not grown.
+    """
+
+    def __init__(self, required_vlbs=None, allowed_elbs=None,
+                 max_fanout=None, fanout_elb=None):
+        """Initialize PatternConstraints instance.
+
+        Args:
+            required_vlbs: vertex labels of which a pattern must contain
+                one, None for no constraint.
+            allowed_elbs: edge labels patterns may use, None for all.
+            max_fanout: max number of `fanout_elb` edges at one vertex of a
+                pattern, None for no constraint.
+            fanout_elb: edge label counted by `max_fanout`.
+        """
+        self.required_vlbs = required_vlbs
+        self.allowed_elbs = allowed_elbs
+        self.max_fanout = max_fanout
+        self.fanout_elb = fanout_elb
+        self._required = None
+        self._allowed = None
+        self._fanout_elb = None
+
+    def bind(self, vlb_table, elb_table):
+        """Intern the constrained labels through the database tables."""
+        if self.required_vlbs is not None:
+            self._required = frozenset(
+                vlb_table.encode(vlb) for vlb in self.required_vlbs
+                if vlb in vlb_table.codes)
+        if self.allowed_elbs is not None:
+            self._allowed = np.array(
+                [elb_table.encode(elb) for elb in self.allowed_elbs
+                 if elb in elb_table.codes], dtype=np.int64)
+        if self.max_fanout is not None:
+            self._fanout_elb = elb_table.codes.get(self.fanout_elb, -1)
+        return self
+
+    def signature(self):
+        """Describe the constraints, e.g. to match checkpoints."""
+        return (None if self.required_vlbs is None
+                else tuple(self.required_vlbs),
+                None if self.allowed_elbs is None
+                else tuple(self.allowed_elbs),
+                self.max_fanout, self.fanout_elb)
+
+    def masks(self, db):
+        """Return the vertex and edge masks of what patterns may use."""
+        vertex_mask = np.ones(db.num_vertices, dtype=bool)
+        edge_mask = np.ones(db.num_edges, dtype=bool)
+        if self._allowed is not None:
+            edge_mask &= np.isin(db.array('adj_elb'), self._allowed)
+        if self.max_fanout is not None and self.max_fanout < 1:
+            edge_mask &= db.array('adj_elb') != self._fanout_elb
+        if self._required is not None:
+            gids = db.vertex_gids()
+            required = np.isin(db.array('vlb'),
+                               np.array(sorted(self._required),
+                                        dtype=np.int64))
+            has_required = np.zeros(len(db), dtype=bool)
+            has_required[gids[required]] = True
+            vertex_mask &= has_required[gids]
+        return vertex_mask, edge_mask
+
+    def accepts_vlb(self, vlb):
+        """Check if the one-vertex pattern of label `vlb` is reported."""
+        return self._required is None or vlb in self._required
+
+    def accepts(self, dfscode):
+        """Check if the pattern of `dfscode` is reported."""
+        if self._required is None:
+            return True
+        # Vacant labels of backward edges are never required.
+        for dfsedge in dfscode:
+            vlb1, _, vlb2 = dfsedge.vevlb
+            if vlb1 in self._required or vlb2 in self._required:
+                return True
+        return False
+
+    def filter_children(self, dfscode, children):
+        """Drop the (dfsedge, projected) extensions exceeding max_fanout."""
+        if self.max_fanout is None:
+            return children
+        fanout = collections.Counter()
+        for dfsedge in dfscode:
+            if dfsedge.vevlb[1] == self._fanout_elb:
+                fanout[dfsedge.frm] += 1
+                fanout[dfsedge.to] += 1
+        return [
+            (dfsedge, projected) for dfsedge, projected in children
+            if dfsedge.vevlb[1] != self._fanout_elb or (
+                fanout[dfsedge.frm] < self.max_fanout and
+                fanout[dfsedge.to] < self.max_fanout)
+        ]
+
+
+def news_constraints(ne_cnt=8, require_ne=True, allowed_elbs=None,
+                     max_contains=None):
+    """Return constraints for the news graph schema.
+
+    News graphs have a News root labelled ne_cnt + 2 with CONTAINS (1)
+    edges to words, IS (2) edges from words to named entities labelled
+    2 .. ne_cnt + 1, and FOLLOWED_BY (3) edges between words.
+
+    Args:
+        ne_cnt: number of named entity types.
+        require_ne: whether patterns must contain a named entity.
+        allowed_elbs: edge labels patterns may use, None for all.
+        max_contains: max number of CONTAINS edges at one vertex.
+    """
+    return PatternConstraints(
+        required_vlbs=([str(i + 2) for i in range(ne_cnt)]
+                       if require_ne else None),
+        allowed_elbs=allowed_elbs,
+        max_fanout=max_contains,
+        fanout_elb='1')
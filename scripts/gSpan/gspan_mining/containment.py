@@ -0,0 +1,398 @@
+"""Count the supports of known patterns in a database without mining it."""
+# -*- coding=utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import collections
+import pickle
+import sys
+import time
+
+import numpy as np
+
+from .config import str2bool
+from .database import GraphDatabase
+
+
+def _postings(keys, gids, ngraphs):
+    """Group the distinct (key, gid) pairs by key.
+
+    Returns:
+        dict of key -> (sorted gids, number of elements of that key in
+        each of them).
+    """
+    ngraphs = max(ngraphs, 1)
+    pairs, counts = np.unique(np.asarray(keys, dtype=np.int64) * ngraphs +
+                              gids, return_counts=True)
+    keys, gids = pairs // ngraphs, pairs % ngraphs
+    bounds = np.flatnonzero(np.diff(keys)) + 1
+    return {
+        int(k[0]): (g, c)
+        for k, g, c in zip(np.split(keys, bounds), np.split(gids, bounds),
+                           np.split(counts, bounds))
+        if len(k)
+    }
+
+
+class _Pattern(object):
+    """A pattern Graph with its labels interned through a database."""
+
+    def __init__(self, g, db):
+        vids = {vid: i for i, vid in enumerate(g.vertices)}
+        vcodes, ecodes = db.vlb_table.codes, db.elb_table.codes
+        self.vlbs = [vcodes.get(v.vlb, -1) for v in g.vertices.values()]
+        self.out = [list() for _ in vids]
+        self.inn = [list() for _ in vids]
+        self.known = -1 not in self.vlbs
+        self.is_undirected = db.is_undirected
+        for vid, v in g.vertices.items():
+            frm = vids[vid]
+            for to, e in v.edges.items():
+                to, elb = vids[to], ecodes.get(e.elb, -1)
+                if elb == -1:
+                    self.known = False
+                    continue
+                self.out[frm].append((to, elb))
+                if not db.is_undirected:
+                    self.inn[to].append((frm, elb))
+        self._index(len(db.vlb_table), len(db.elb_table))
+
+    def _index(self, nvlb, nelb):
+        """Collect the edge label triples and vertex signatures."""
+        self._nlabels = (nvlb, nelb)
+        self.triples = set()
+        for frm, edges in enumerate(self.out):
+            for to, elb in edges:
+                vlb1, vlb2 = self._triple(frm, to)
+                self.triples.add((vlb1 * nelb + elb) * nvlb + vlb2)
+        self.signatures = [
+            collections.Counter(
+                [(0, elb, self.vlbs[to]) for to, elb in self.out[p]] +
+                [(1, elb, self.vlbs[frm]) for frm, elb in self.inn[p]])
+            for p in range(len(self.vlbs))
+        ]
+
+    def __len__(self):
+        return len(self.vlbs)
+
+    def _triple(self, frm, to):
+        vlb1, vlb2 = self.vlbs[frm], self.vlbs[to]
+        if self.is_undirected:
+            vlb1, vlb2 = min(vlb1, vlb2), max(vlb1, vlb2)
+        return vlb1, vlb2
+
+    def loops(self):
+        """Return the edges (p, q) gSpan also embeds into a self-loop.
+
+        gSpan starts the embeddings of a pattern at an edge of its least
+        (vlb, elb, vlb) triple, the first edge of its minimum DFS code, and
+        takes every data edge of that triple as one, a self-loop too; both
+        ends of the pattern edge then sit on the looping vertex. Edges
+        grown later only reach vertices not embedded yet. Ends with a
+        common neighbor would need two edges to it, which graphs do not
+        have. If several edges share the least triple, any of them may
+        loop here, while gSpan only loops the one its code starts at.
+        """
+        edges = [(p, q, elb) for p in range(len(self))
+                 for q, elb in self.out[p]
+                 if p != q and (p < q or not self.is_undirected)]
+        if not edges:
+            return list()
+
+        def key(edge):
+            p, q, elb = edge
+            vlb1, vlb2 = self._triple(p, q)
+            return vlb1, elb, vlb2
+
+        least = min(key(edge) for edge in edges)
+        neighbors = [set(q for q, _ in self.out[p]) |
+                     set(q for q, _ in self.inn[p]) for p in range(len(self))]
+        return [(p, q) for p, q, elb in edges
+                if key((p, q, elb)) == least and
+                self.vlbs[p] == self.vlbs[q] and
+                not (neighbors[p] & neighbors[q])]
+
+    def merged(self, p, q):
+        """Return the pattern with vertex q merged into p.
+
+        The edge between them becomes a self-loop of p, see loops().
+        """
+        keep = [r for r in range(len(self)) if r != q]
+        index = {r: i for i, r in enumerate(keep)}
+        index[q] = index[p]
+        pattern = _Pattern.__new__(_Pattern)
+        pattern.vlbs = [self.vlbs[r] for r in keep]
+        pattern.known = self.known
+        pattern.is_undirected = self.is_undirected
+        pattern.out = [list() for _ in keep]
+        pattern.inn = [list() for _ in keep]
+        for adj, new in ((self.out, pattern.out), (self.inn, pattern.inn)):
+            for r in range(len(self)):
+                for to, elb in adj[r]:
+                    edge = (index[to], elb)
+                    if edge not in new[index[r]]:
+                        new[index[r]].append(edge)
+        pattern._index(*self._nlabels)
+        return pattern
+
+    def order(self, rarity):
+        """Return the match order of the vertices and their anchors.
+
+        Matching starts at the vertex of the rarest label and goes on with
+        the vertex with the most edges to the matched ones. The anchor of
+        a vertex is (q, elb, direction) of an edge to a matched vertex q,
+        None for the first one.
+        """
+        order, anchors, done = list(), list(), set()
+        while len(order) < len(self):
+            best, best_key = None, None
+            for p in range(len(self)):
+                if p in done:
+                    continue
+                links = (sum(1 for q, _ in self.out[p] if q in done) +
+                         sum(1 for q, _ in self.inn[p] if q in done))
+                key = (bool(order) and not links, -links,
+                       rarity(self.vlbs[p]), p)
+                if best_key is None or key < best_key:
+                    best, best_key = p, key
+            anchor = None
+            for q, elb in self.inn[best]:
+                if q in done:
+                    anchor = (q, elb, 0)
+            for q, elb in self.out[best]:
+                if q in done:
+                    # Undirected edges are stored both ways.
+                    anchor = (q, elb, 0 if self.is_undirected else 1)
+            order.append(best)
+            anchors.append(anchor)
+            done.add(best)
+        return order, anchors
+
+
+class ContainmentIndex(object):
+    """Index of a database answering which graphs contain a pattern.
+
+    Graphs are filtered by the label multiset and the edge label triples
+    of the pattern, looked up in inverted lists, before the pattern is
+    matched, VF2 style, into each remaining graph. The matcher extends a
+    partial embedding along pattern edges, rejecting data vertices whose
+    neighborhood signature, their (direction, elb, neighbor vlb) counts,
+    does not cover that of the pattern vertex. Occurrences are embeddings
+    as counted by gSpan: not necessarily induced, and injective but for
+    an edge gSpan also embeds into a self-loop, see _Pattern.loops().
+    """
+
+    def __init__(self, db):
+        """Initialize ContainmentIndex instance.
+
+        Args:
+            db: database.GraphDatabase to look patterns up in.
+        """
+        self.db = db
+        self.num_tested = 0
+        ngraphs = len(db)
+        self._vlb_postings = _postings(db.array('vlb'), db.vertex_gids(),
+                                       ngraphs)
+        self._triple_postings = _postings(db.edge_triples(), db.edge_gids(),
+                                          ngraphs)
+        self._signatures = dict()
+
+    @classmethod
+    def from_file(cls, file_name, is_undirected=True,
+                  max_ngraphs=float('inf'), start_gid=None):
+        """Index a database file, see GraphDatabase.from_file()."""
+        return cls(GraphDatabase.from_file(file_name,
+                                           is_undirected=is_undirected,
+                                           max_ngraphs=max_ngraphs,
+                                           start_gid=start_gid))
+
+    def _rarity(self, vlb):
+        gids, _ = self._vlb_postings.get(vlb, ((), ()))
+        return len(gids)
+
+    def candidates(self, pattern):
+        """Return the graphs passing the filters of a _Pattern."""
+        if not pattern.known:
+            return np.zeros(0, dtype=np.int64)
+        gids = None
+        for vlb, count in collections.Counter(pattern.vlbs).items():
+            posted, counts = self._vlb_postings.get(vlb, ((), ()))
+            posted = np.asarray(posted, dtype=np.int64)
+            posted = posted[np.asarray(counts) >= count]
+            gids = posted if gids is None else np.intersect1d(
+                gids, posted, assume_unique=True)
+        for triple in pattern.triples:
+            posted, _ = self._triple_postings.get(triple, ((), ()))
+            gids = np.intersect1d(gids, np.asarray(posted, dtype=np.int64),
+                                  assume_unique=True)
+        return gids
+
+    def _signature(self, vid):
+        signature = self._signatures.get(vid)
+        if signature is None:
+            db = self.db
+            signature = collections.Counter(
+                (0, db.adj_elb[e], db.vlb[db.adj_to[e]])
+                for e in db.edges(vid))
+            if not db.is_undirected:
+                signature.update(
+                    (1, db.adj_elb[e], db.vlb[db.adj_frm[e]])
+                    for e in db.in_edges(vid))
+            self._signatures[vid] = signature
+        return signature
+
+    def _has_edge(self, frm, to, elb):
+        db = self.db
+        for e in db.edges(frm):
+            if db.adj_to[e] == to and db.adj_elb[e] == elb:
+                return True
+        return False
+
+    def _contains(self, gid, pattern, order, anchors):
+        """Check if graph gid contains the pattern by backtracking."""
+        db = self.db
+        self.num_tested += 1
+        mapping = dict()
+
+        def feasible(p, v):
+            if v in used or db.vlb[v] != pattern.vlbs[p]:
+                return False
+            signature = self._signature(v)
+            for key, count in pattern.signatures[p].items():
+                if signature[key] < count:
+                    return False
+            for q, elb in pattern.out[p]:
+                to = v if q == p else mapping.get(q)
+                if to is not None and not self._has_edge(v, to, elb):
+                    return False
+            for q, elb in pattern.inn[p]:
+                if q in mapping and not self._has_edge(mapping[q], v, elb):
+                    return False
+            return True
+
+        def extend(depth):
+            if depth == len(order):
+                return True
+            p, anchor = order[depth], anchors[depth]
+            if anchor is None:
+                vids = db.vertices(gid)
+            elif anchor[2] == 0:
+                vids = [db.adj_to[e] for e in db.edges(mapping[anchor[0]])
+                        if db.adj_elb[e] == anchor[1]]
+            else:
+                vids = [db.adj_frm[e]
+                        for e in db.in_edges(mapping[anchor[0]])
+                        if db.adj_elb[e] == anchor[1]]
+            for v in vids:
+                if not feasible(p, v):
+                    continue
+                mapping[p] = v
+                used.add(v)
+                if extend(depth + 1):
+                    return True
+                del mapping[p]
+                used.discard(v)
+            return False
+
+        used = set()
+        return extend(0)
+
+    def graphs_containing(self, g):
+        """Return the sorted graphs containing pattern Graph `g`.
+
+        Graphs are numbered by their position in the database, as gSpan
+        numbers them in `support_where`.
+        """
+        pattern = _Pattern(g, self.db)
+        found = set(self._graphs_containing(pattern))
+        for p, q in pattern.loops():
+            found.update(self._graphs_containing(pattern.merged(p, q)))
+        self._signatures.clear()
+        return sorted(found)
+
+    def _graphs_containing(self, pattern):
+        gids = self.candidates(pattern)
+        if not len(pattern) or not len(gids):
+            return list()
+        order, anchors = pattern.order(self._rarity)
+        return [gid for gid in gids.tolist()
+                if self._contains(gid, pattern, order, anchors)]
+
+    def support_where(self, subgraphs):
+        """Find the graphs containing every pattern of `subgraphs`.
+
+        Args:
+            subgraphs: dict of id -> Graph, e.g. a *_subgraphs.pkl file.
+
+        Returns:
+            dict of id -> set of graphs, as gSpan.support_where.
+        """
+        return {sid: set(self.graphs_containing(g))
+                for sid, g in subgraphs.items()}
+
+
+parser = argparse.ArgumentParser(
+    description='Find the graphs of a database containing known patterns, '
+                'without mining it.')
+parser.add_argument(
+    'subgraphs_file',
+    type=str,
+    help='str, pickle file of a dict of id -> pattern Graph, e.g. '
+         '<month>_subgraphs.pkl'
+)
+parser.add_argument(
+    'database_file_name',
+    type=str,
+    help='str, database file name, in gSpan text or binary format'
+)
+parser.add_argument(
+    'output_file',
+    type=str,
+    help='str, pickle file to write the dict of id -> set of graphs to'
+)
+parser.add_argument(
+    '-d', '--directed',
+    type=str2bool,
+    default=False,
+    help='bool, patterns and graphs are directed, default off, i.e. '
+         'undirected'
+)
+parser.add_argument(
+    '-n', '--num_graphs',
+    type=float,
+    default=float('inf'),
+    help='int, only read the first n graphs in the database, default inf'
+)
+parser.add_argument(
+    '--start_gid',
+    type=int,
+    default=None,
+    help='int, id of the first graph to read, default none, i.e. the '
+         'first graph in the database'
+)
+
+
+def main(FLAGS=None):
+    """Count the supports of the patterns of a subgraphs file."""
+    if FLAGS is None:
+        FLAGS = parser.parse_args(args=sys.argv[1:])
+    start = time.time()
+    with open(FLAGS.subgraphs_file, 'rb') as f:
+        subgraphs = pickle.load(f)
+    index = ContainmentIndex.from_file(FLAGS.database_file_name,
+                                       is_undirected=(not FLAGS.directed),
+                                       max_ngraphs=FLAGS.num_graphs,
+                                       start_gid=FLAGS.start_gid)
+    support_where = index.support_where(subgraphs)
+    with open(FLAGS.output_file, 'wb') as f:
+        pickle.dump(support_where, f)
+    print('{} patterns in {} graphs, {} matched in {} s'.format(
+        len(subgraphs), len(index.db), index.num_tested,
+        round(time.time() - start, 2)))
+    return support_where
+
+
+if __name__ == '__main__':
+    main()
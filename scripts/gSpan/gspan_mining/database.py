@@ -0,0 +1,678 @@
+"""Compact, label-interned graph database in CSR form."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import codecs
+import json
+import struct
+
+import numpy as np
+
+from .graph import AUTO_EDGE_ID
+from .graph import Graph
+
+
+VERTEX_ARRAYS = ('vertex_offsets', 'vlb', 'adj_offsets')
+EDGE_ARRAYS = ('adj_frm', 'adj_to', 'adj_elb', 'adj_eid')
+ARRAY_DTYPES = {
+    'vertex_offsets': np.int64,
+    'vlb': np.int32,
+    'adj_offsets': np.int64,
+    'adj_frm': np.int32,
+    'adj_to': np.int32,
+    'adj_elb': np.int32,
+    'adj_eid': np.int32,
+    'graph_ids': np.int64,
+}
+
+BINARY_MAGIC = b'GSPNDB01'
+BINARY_ALIGNMENT = 8
+
+
+class LabelTable(object):
+    """Interns labels to consecutive ints.
+
+    Codes follow the string order of the labels, which is the order gSpan
+    has always compared them in. Minimum DFS codes, and therefore the mined
+    patterns, stay the same; note that in directed mode the miner only grows
+    patterns from their smallest vertex label, so reordering labels changes
+    which patterns are found.
+    """
+
+    def __init__(self, names=()):
+        """Initialize LabelTable instance.
+
+        Args:
+            names: labels, the i-th one is interned to i.
+        """
+        self.names = list(names)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+
+    @classmethod
+    def from_labels(cls, labels):
+        """Build a table whose code order follows the label order."""
+        return cls(sorted(set(labels)))
+
+    def __len__(self):
+        """Return number of interned labels."""
+        return len(self.names)
+
+    def encode(self, label):
+        """Return the code of `label`."""
+        return self.codes[label]
+
+    def decode(self, code):
+        """Return the label interned to `code`."""
+        return self.names[code]
+
+
+class GraphIndex(object):
+    """Byte offsets of the graphs of a database in gSpan text format.
+
+    The index is built in one pass over the file without parsing it. The
+    i-th graph spans bytes offsets[i] .. offsets[i + 1] - 1 and has the id
+    of its 't # id' line in gids[i].
+    """
+
+    def __init__(self, file_name):
+        """Initialize GraphIndex instance by scanning `file_name`."""
+        self.file_name = file_name
+        gids, offsets = list(), list()
+        offset = 0
+        with open(file_name, 'rb') as f:
+            for line in f:
+                if line.startswith(b't'):
+                    gid = int(line.split()[-1])
+                    if gid == -1:
+                        break
+                    gids.append(gid)
+                    offsets.append(offset)
+                offset += len(line)
+        offsets.append(offset)
+        self.gids = np.array(gids, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+    def __len__(self):
+        """Return number of graphs."""
+        return len(self.gids)
+
+    def positions(self, start_gid=None, count=float('inf')):
+        """Return the range i .. j - 1 of graphs from id start_gid on.
+
+        Graph ids are expected in ascending order; the range starts at the
+        first graph whose id is at least `start_gid`.
+        """
+        i = 0 if start_gid is None else int(
+            np.searchsorted(self.gids, start_gid))
+        return i, int(min(i + count, len(self)))
+
+    def read(self, i, j):
+        """Return the text of graphs i .. j - 1 as bytes."""
+        with open(self.file_name, 'rb') as f:
+            f.seek(self.offsets[i])
+            return f.read(self.offsets[j] - self.offsets[i])
+
+
+def gids_of_dates(dates_file, first, last):
+    """Return (start_gid, count) of the graphs dated first .. last.
+
+    Args:
+        dates_file: csv file with a `date` header and the date of graph i,
+            in YYYY-MM-DD format, on row i. Dates are expected in ascending
+            order; the window spans from the first to the last graph in
+            the range before a later date, whatever is in between.
+        first: first date, YYYY-MM-DD.
+        last: last date, YYYY-MM-DD, included.
+    """
+    start_gid, last_gid = None, None
+    with codecs.open(dates_file, 'r', 'utf-8') as f:
+        next(f)
+        for gid, line in enumerate(f):
+            date = line.strip()
+            if first <= date <= last:
+                if start_gid is None:
+                    start_gid = gid
+                last_gid = gid
+            elif date > last:
+                break
+    if start_gid is None:
+        raise ValueError('No graph is dated {} .. {} in {}.'.format(
+            first, last, dates_file))
+    return start_gid, last_gid - start_gid + 1
+
+
+def build_csr(graphs, is_undirected=True):
+    """Build CSR lists from graphs given as (vlbs, edges) pairs.
+
+    Args:
+        graphs: iterable of (vlbs, edges), where vlbs[i] is the label of
+            local vertex i and edges is a list of (frm, to, elb) with local
+            vertex ids.
+        is_undirected: whether edges are stored in both directions.
+
+    Returns:
+        dict of name -> list, keyed by VERTEX_ARRAYS and EDGE_ARRAYS.
+        Edge ids in `adj_eid` are local to their graph, vertex ids in
+        `adj_frm` and `adj_to` are global.
+    """
+    csr = {name: list() for name in VERTEX_ARRAYS + EDGE_ARRAYS}
+    csr['vertex_offsets'].append(0)
+    csr['adj_offsets'].append(0)
+    for vlbs, edges in graphs:
+        base = len(csr['vlb'])
+        csr['vlb'].extend(vlbs)
+        # Same semantics as Vertex.edges: a repeated edge keeps its first
+        # position and takes the label of the last occurrence.
+        adj = [dict() for _ in vlbs]
+        eid = 0
+        for frm, to, elb in edges:
+            adj[frm][to] = (elb, eid)
+            if is_undirected:
+                adj[to][frm] = (elb, eid)
+            eid += 1
+        eids = dict()
+        for frm, out in enumerate(adj):
+            for to, (elb, eid) in out.items():
+                csr['adj_frm'].append(base + frm)
+                csr['adj_to'].append(base + to)
+                csr['adj_elb'].append(elb)
+                csr['adj_eid'].append(eids.setdefault(eid, len(eids)))
+            csr['adj_offsets'].append(len(csr['adj_to']))
+        csr['vertex_offsets'].append(len(csr['vlb']))
+    return csr
+
+
+class GraphDatabase(object):
+    """Graphs stored in flat arrays.
+
+    Vertices of all graphs are numbered globally; the vertices of graph gid
+    are vertex_offsets[gid] .. vertex_offsets[gid + 1] - 1. The outgoing
+    edges of vertex v are the adjacency slots adj_offsets[v] ..
+    adj_offsets[v + 1] - 1, and an edge is referred to by its slot. Labels
+    are interned through `vlb_table` and `elb_table`.
+
+    The array attributes are memoryviews of NumPy arrays (or plain lists for
+    small throwaway databases), so indexing them yields Python ints.
+    """
+
+    def __init__(self, csr, vlb_table, elb_table, is_undirected=True,
+                 use_numpy=True):
+        """Initialize GraphDatabase instance.
+
+        Args:
+            csr: dict of name -> array, keyed by VERTEX_ARRAYS and
+                EDGE_ARRAYS, as returned by build_csr().
+            vlb_table: LabelTable of vertex labels.
+            elb_table: LabelTable of edge labels.
+            is_undirected: whether edges are stored in both directions.
+            use_numpy: whether to keep the arrays in NumPy arrays.
+        """
+        self.vlb_table = vlb_table
+        self.elb_table = elb_table
+        self.is_undirected = is_undirected
+        # Ids of the graphs in the file they are read from, if known.
+        self.graph_ids = csr.get('graph_ids')
+        if self.graph_ids is not None:
+            self.graph_ids = np.asarray(self.graph_ids,
+                                        dtype=ARRAY_DTYPES['graph_ids'])
+        self._arrays = None
+        self._in_offsets, self._in_slots = None, None
+        if use_numpy:
+            self._arrays = {
+                name: np.ascontiguousarray(csr[name],
+                                           dtype=ARRAY_DTYPES[name])
+                for name in VERTEX_ARRAYS + EDGE_ARRAYS
+            }
+        self._bind(csr)
+
+    def _bind(self, csr=None):
+        for name in VERTEX_ARRAYS + EDGE_ARRAYS:
+            if self._arrays is not None:
+                setattr(self, name, memoryview(self._arrays[name]))
+            else:
+                setattr(self, name, csr[name])
+
+    def __getstate__(self):
+        """Drop the memoryviews, which can not be pickled."""
+        state = self.__dict__.copy()
+        for name in VERTEX_ARRAYS + EDGE_ARRAYS:
+            if self._arrays is not None:
+                del state[name]
+        state['_in_offsets'], state['_in_slots'] = None, None
+        return state
+
+    def __setstate__(self, state):
+        """Restore the memoryviews."""
+        self.__dict__.update(state)
+        if self._arrays is not None:
+            self._bind()
+
+    @classmethod
+    def from_file(cls, file_name, is_undirected=True,
+                  max_ngraphs=float('inf'), start_gid=None):
+        """Read a database in binary or gSpan text format."""
+        if cls.is_binary(file_name):
+            return cls.from_binary(file_name, is_undirected, max_ngraphs,
+                                   start_gid)
+        return cls.from_gspan_file(file_name, is_undirected, max_ngraphs,
+                                   start_gid)
+
+    @staticmethod
+    def is_binary(file_name):
+        """Check if `file_name` is a database written by save()."""
+        with open(file_name, 'rb') as f:
+            return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+    @classmethod
+    def from_binary(cls, file_name, is_undirected=None,
+                    max_ngraphs=float('inf'), start_gid=None):
+        """Map a database written by save() into memory.
+
+        The arrays are read-only views of the memory-mapped file, so
+        loading does not parse or copy anything; pages are read as the
+        graphs are used.
+
+        Args:
+            file_name: file written by save().
+            is_undirected: expected direction of the database, None to
+                accept either.
+            max_ngraphs: only keep max_ngraphs graphs.
+            start_gid: id of the first graph to keep, None for the first
+                one in the file.
+        """
+        data = np.memmap(file_name, dtype=np.uint8, mode='r')
+        if bytes(data[:len(BINARY_MAGIC)]) != BINARY_MAGIC:
+            raise ValueError('{} is not a binary graph database'.format(
+                file_name))
+        start = len(BINARY_MAGIC) + 8
+        hlen, = struct.unpack('<Q', bytes(data[len(BINARY_MAGIC):start]))
+        header = json.loads(bytes(data[start:start + hlen]).decode('utf-8'))
+        if (is_undirected is not None and
+                header['is_undirected'] != is_undirected):
+            raise ValueError('{} holds {} graphs'.format(
+                file_name,
+                'undirected' if header['is_undirected'] else 'directed'))
+        data_start = -(-(start + hlen) // BINARY_ALIGNMENT) * BINARY_ALIGNMENT
+        csr = dict()
+        for name, (offset, size) in header['arrays'].items():
+            offset += data_start
+            dtype = np.dtype(ARRAY_DTYPES[name]).newbyteorder('<')
+            csr[name] = data[offset:offset + size * dtype.itemsize].view(
+                dtype)
+        db = cls(csr, LabelTable(header['vlb']), LabelTable(header['elb']),
+                 header['is_undirected'])
+        if start_gid is not None or max_ngraphs < len(db):
+            db = db.select_gids(start_gid, max_ngraphs)
+        return db
+
+    def save(self, file_name):
+        """Write the database in a binary, memory-mappable format.
+
+        The file starts with BINARY_MAGIC, a uint64 length and a JSON
+        header holding the label tables, the direction and the (offset,
+        length) of every array, offsets counting from the first array. The
+        arrays follow, little endian and aligned to BINARY_ALIGNMENT
+        bytes. The per-graph index is
+        `vertex_offsets`, with `adj_offsets` locating the edges of each
+        vertex. Load it with from_binary().
+        """
+        arrays = [
+            (name, self.array(name).astype(
+                np.dtype(ARRAY_DTYPES[name]).newbyteorder('<')))
+            for name in VERTEX_ARRAYS + EDGE_ARRAYS
+        ]
+        if self.graph_ids is not None:
+            arrays.append(('graph_ids', self.graph_ids.astype('<i8')))
+
+        def align(n):
+            return -(-n // BINARY_ALIGNMENT) * BINARY_ALIGNMENT
+
+        header = {'vlb': list(self.vlb_table.names),
+                  'elb': list(self.elb_table.names),
+                  'is_undirected': self.is_undirected,
+                  'arrays': dict()}
+        offset = 0
+        for name, a in arrays:
+            header['arrays'][name] = [offset, len(a)]
+            offset = align(offset + a.nbytes)
+        raw = json.dumps(header).encode('utf-8')
+        data_start = align(len(BINARY_MAGIC) + 8 + len(raw))
+        with open(file_name, 'wb') as f:
+            f.write(BINARY_MAGIC)
+            f.write(struct.pack('<Q', len(raw)))
+            f.write(raw)
+            for name, a in arrays:
+                offset = data_start + header['arrays'][name][0]
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(a.tobytes())
+
+    @classmethod
+    def from_gspan_file(cls, file_name, is_undirected=True,
+                        max_ngraphs=float('inf'), start_gid=None):
+        """Read a database in gSpan text format.
+
+        With `start_gid`, only the graphs from that id on are read, located
+        through a GraphIndex.
+        """
+        if start_gid is None:
+            with codecs.open(file_name, 'r', 'utf-8') as f:
+                return cls._parse_gspan(f, is_undirected, max_ngraphs)
+        index = GraphIndex(file_name)
+        i, j = index.positions(start_gid, max_ngraphs)
+        lines = index.read(i, j).decode('utf-8').splitlines()
+        return cls._parse_gspan(lines, is_undirected)
+
+    @classmethod
+    def _parse_gspan(cls, lines, is_undirected=True,
+                     max_ngraphs=float('inf')):
+        graphs, vlb_names, elb_names = list(), list(), list()
+        graph_ids = list()
+        vlbs, edges, vids = None, None, None
+        for line in lines:
+            cols = line.split()
+            if not cols:
+                continue
+            if cols[0] == 't':
+                if vlbs is not None:
+                    graphs.append((vlbs, edges))
+                    vlbs = None
+                if cols[-1] == '-1' or len(graphs) >= max_ngraphs:
+                    break
+                graph_ids.append(int(cols[-1]))
+                vlbs, edges, vids = list(), list(), dict()
+            elif cols[0] == 'v':
+                if cols[1] in vids:
+                    continue
+                vids[cols[1]] = len(vlbs)
+                vlbs.append(cols[2])
+                vlb_names.append(cols[2])
+            elif cols[0] == 'e':
+                edges.append((vids[cols[1]], vids[cols[2]], cols[3]))
+                elb_names.append(cols[3])
+        # adapt to input files that do not end with 't # -1'
+        if vlbs is not None:
+            graphs.append((vlbs, edges))
+        vlb_table = LabelTable.from_labels(vlb_names)
+        elb_table = LabelTable.from_labels(elb_names)
+        vcodes, ecodes = vlb_table.codes, elb_table.codes
+        graphs = [
+            ([vcodes[vlb] for vlb in vlbs],
+             [(frm, to, ecodes[elb]) for frm, to, elb in edges])
+            for vlbs, edges in graphs
+        ]
+        csr = build_csr(graphs, is_undirected)
+        csr['graph_ids'] = graph_ids
+        return cls(csr, vlb_table, elb_table, is_undirected)
+
+    def __len__(self):
+        """Return number of graphs."""
+        return len(self.vertex_offsets) - 1
+
+    def __iter__(self):
+        """Iterate over graph ids."""
+        return iter(range(len(self)))
+
+    def __contains__(self, gid):
+        """Check if graph gid exists."""
+        return 0 <= gid < len(self)
+
+    def __getitem__(self, gid):
+        """Return graph gid as a Graph with its original labels."""
+        if gid not in self:
+            raise KeyError(gid)
+        return self.to_graph(gid)
+
+    def keys(self):
+        """Return graph ids."""
+        return range(len(self))
+
+    def values(self):
+        """Iterate over graphs as Graph instances."""
+        return (self.to_graph(gid) for gid in self)
+
+    def items(self):
+        """Iterate over (gid, Graph) pairs."""
+        return ((gid, self.to_graph(gid)) for gid in self)
+
+    @property
+    def num_vertices(self):
+        """Return total number of vertices."""
+        return len(self.vlb)
+
+    @property
+    def num_edges(self):
+        """Return total number of adjacency slots."""
+        return len(self.adj_to)
+
+    @property
+    def nbytes(self):
+        """Return number of bytes held by the arrays."""
+        if self._arrays is None:
+            return 0
+        return sum(a.nbytes for a in self._arrays.values())
+
+    def vertices(self, gid):
+        """Return global ids of the vertices of graph gid."""
+        return range(self.vertex_offsets[gid], self.vertex_offsets[gid + 1])
+
+    def edges(self, vid):
+        """Return adjacency slots of the outgoing edges of vertex vid."""
+        return range(self.adj_offsets[vid], self.adj_offsets[vid + 1])
+
+    def in_edges(self, vid):
+        """Return adjacency slots of the edges ending at vertex vid.
+
+        The reverse index is built on first use.
+        """
+        if self._in_offsets is None:
+            adj_to = self.array('adj_to')
+            slots = np.argsort(adj_to, kind='stable').astype(np.int32)
+            offsets = np.concatenate(([0], np.cumsum(
+                np.bincount(adj_to, minlength=self.num_vertices))))
+            if self._arrays is None:
+                self._in_offsets, self._in_slots = (offsets.tolist(),
+                                                    slots.tolist())
+            else:
+                self._in_offsets = memoryview(offsets.astype(np.int64))
+                self._in_slots = memoryview(slots)
+        return self._in_slots[self._in_offsets[vid]:
+                              self._in_offsets[vid + 1]]
+
+    def array(self, name):
+        """Return array `name` as a NumPy array, without copying."""
+        if self._arrays is not None:
+            return self._arrays[name]
+        return np.asarray(getattr(self, name), dtype=ARRAY_DTYPES[name])
+
+    def vertex_gids(self):
+        """Return the graph id of every vertex."""
+        return np.repeat(np.arange(len(self), dtype=np.int64),
+                         np.diff(self.array('vertex_offsets')))
+
+    def edge_gids(self):
+        """Return the graph id of every adjacency slot."""
+        return self.vertex_gids()[self.array('adj_frm')]
+
+    def edge_triples(self):
+        """Return the (vlb1, elb, vlb2) of every adjacency slot as one int.
+
+        In undirected databases vlb1 <= vlb2, so both slots of an edge get
+        the same triple.
+        """
+        nvlb, nelb = len(self.vlb_table), len(self.elb_table)
+        vlb = self.array('vlb').astype(np.int64)
+        vlb1, vlb2 = vlb[self.array('adj_frm')], vlb[self.array('adj_to')]
+        if self.is_undirected:
+            vlb1, vlb2 = np.minimum(vlb1, vlb2), np.maximum(vlb1, vlb2)
+        return (vlb1 * nelb + self.array('adj_elb')) * nvlb + vlb2
+
+    def graph_support(self, codes, gids):
+        """Count the graphs each code occurs in.
+
+        Args:
+            codes: int array, one code per vertex or adjacency slot.
+            gids: graph id of every element of `codes`.
+
+        Returns:
+            the distinct codes, in order of first occurrence, and the
+            number of graphs containing each of them.
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        ngraphs = max(len(self), 1)
+        pairs = np.unique(codes * ngraphs + gids)
+        distinct, counts = np.unique(pairs // ngraphs, return_counts=True)
+        _, first = np.unique(codes, return_index=True)
+        order = np.argsort(first, kind='stable')
+        return distinct[order], counts[order]
+
+    def select(self, start=0, count=None):
+        """Return a database of graphs start .. start + count - 1.
+
+        Graphs are renumbered from 0. Labels and edge ids are views of this
+        database; offsets and vertex ids are rebased, which copies them
+        unless the range starts at the first graph.
+        """
+        stop = len(self) if count is None else min(start + count, len(self))
+        start = min(max(start, 0), stop)
+        vertex_offsets = self.array('vertex_offsets')
+        adj_offsets = self.array('adj_offsets')
+        v0, v1 = vertex_offsets[start], vertex_offsets[stop]
+        e0, e1 = adj_offsets[v0], adj_offsets[v1]
+        csr = {
+            'vertex_offsets': vertex_offsets[start:stop + 1],
+            'vlb': self.array('vlb')[v0:v1],
+            'adj_offsets': adj_offsets[v0:v1 + 1],
+            'adj_frm': self.array('adj_frm')[e0:e1],
+            'adj_to': self.array('adj_to')[e0:e1],
+            'adj_elb': self.array('adj_elb')[e0:e1],
+            'adj_eid': self.array('adj_eid')[e0:e1],
+        }
+        if self.graph_ids is not None:
+            csr['graph_ids'] = self.graph_ids[start:stop]
+        if v0:
+            for name in ('vertex_offsets', 'adj_frm', 'adj_to'):
+                csr[name] = csr[name] - v0
+        if e0:
+            csr['adj_offsets'] = csr['adj_offsets'] - e0
+        return GraphDatabase(csr, self.vlb_table, self.elb_table,
+                             self.is_undirected)
+
+    @classmethod
+    def concatenate(cls, databases, is_undirected=True):
+        """Return one database holding the graphs of all `databases`.
+
+        Labels are interned again through tables of all of them; graph ids
+        are kept, and must be known for all databases or none.
+        """
+        databases = [db for db in databases if len(db)]
+        vlb_table = LabelTable.from_labels(
+            name for db in databases for name in db.vlb_table.names)
+        elb_table = LabelTable.from_labels(
+            name for db in databases for name in db.elb_table.names)
+        csr = {name: list() for name in VERTEX_ARRAYS + EDGE_ARRAYS}
+        csr['vertex_offsets'].append(np.zeros(1, dtype=np.int64))
+        csr['adj_offsets'].append(np.zeros(1, dtype=np.int64))
+        graph_ids = list()
+        nv, ne = 0, 0
+        for db in databases:
+            vlbs = np.array([vlb_table.encode(name)
+                             for name in db.vlb_table.names], dtype=np.int64)
+            elbs = np.array([elb_table.encode(name)
+                             for name in db.elb_table.names], dtype=np.int64)
+            csr['vertex_offsets'].append(db.array('vertex_offsets')[1:] + nv)
+            csr['vlb'].append(vlbs[db.array('vlb')])
+            csr['adj_offsets'].append(db.array('adj_offsets')[1:] + ne)
+            csr['adj_frm'].append(db.array('adj_frm') + nv)
+            csr['adj_to'].append(db.array('adj_to') + nv)
+            csr['adj_elb'].append(elbs[db.array('adj_elb')])
+            csr['adj_eid'].append(db.array('adj_eid'))
+            graph_ids.append(db.graph_ids)
+            nv, ne = nv + db.num_vertices, ne + db.num_edges
+        csr = {name: np.concatenate(arrays) if arrays else
+               np.zeros(0, dtype=ARRAY_DTYPES[name])
+               for name, arrays in csr.items()}
+        if databases and all(gids is not None for gids in graph_ids):
+            csr['graph_ids'] = np.concatenate(graph_ids)
+        return cls(csr, vlb_table, elb_table, is_undirected)
+
+    def select_gids(self, start_gid=None, count=float('inf')):
+        """Return a database of `count` graphs from id start_gid on.
+
+        Ids are those of the file the graphs are read from, or their
+        positions if unknown; see select().
+        """
+        start = 0
+        if start_gid is not None:
+            if self.graph_ids is None:
+                start = start_gid
+            else:
+                start = int(np.searchsorted(self.graph_ids, start_gid))
+        return self.select(start, None if count == float('inf')
+                           else int(count))
+
+    def subgraph(self, vertex_mask, edge_mask):
+        """Return a database keeping only the masked vertices and edges.
+
+        Edges losing an end are dropped as well. Graph ids, label tables and
+        the order of the remaining vertices and edges are kept.
+        """
+        vertex_mask = np.asarray(vertex_mask, dtype=bool)
+        adj_frm, adj_to = self.array('adj_frm'), self.array('adj_to')
+        edge_mask = (np.asarray(edge_mask, dtype=bool) &
+                     vertex_mask[adj_frm] & vertex_mask[adj_to])
+        vertices_before = np.concatenate(([0], np.cumsum(vertex_mask)))
+        edges_before = np.concatenate(([0], np.cumsum(edge_mask)))
+        adj_offsets = self.array('adj_offsets')
+        csr = {
+            'vertex_offsets': vertices_before[self.array('vertex_offsets')],
+            'vlb': self.array('vlb')[vertex_mask],
+            'adj_offsets': np.append(
+                edges_before[adj_offsets[:-1][vertex_mask]],
+                edges_before[-1]),
+            'adj_frm': vertices_before[adj_frm[edge_mask]],
+            'adj_to': vertices_before[adj_to[edge_mask]],
+            'adj_elb': self.array('adj_elb')[edge_mask],
+            'adj_eid': self.array('adj_eid')[edge_mask],
+            'graph_ids': self.graph_ids,
+        }
+        return GraphDatabase(csr, self.vlb_table, self.elb_table,
+                             self.is_undirected)
+
+    def to_graph(self, gid):
+        """Materialize graph gid as a Graph with its original labels."""
+        g = Graph(gid, is_undirected=self.is_undirected,
+                  eid_auto_increment=True)
+        base = self.vertex_offsets[gid]
+        vertices = self.vertices(gid)
+        for vid in vertices:
+            g.add_vertex(str(vid - base), self.vlb_table.decode(self.vlb[vid]))
+        for vid in vertices:
+            for e in self.edges(vid):
+                frm, to = self.adj_frm[e] - base, self.adj_to[e] - base
+                if self.is_undirected and to < frm:
+                    continue
+                g.add_edge(AUTO_EDGE_ID, str(frm), str(to),
+                           self.elb_table.decode(self.adj_elb[e]))
+        return g
+
+    @classmethod
+    def read_graph_ids(cls, file_name, start_gid=None,
+                       max_ngraphs=float('inf')):
+        """Return the ids of the graphs from_file() would read.
+
+        Binary files are mapped and text files indexed, so no graph is
+        parsed. Ids are positions if the file does not record them.
+        """
+        if cls.is_binary(file_name):
+            db = cls.from_binary(file_name)
+            gids = (np.arange(len(db), dtype=np.int64)
+                    if db.graph_ids is None else np.asarray(db.graph_ids))
+        else:
+            gids = GraphIndex(file_name).gids
+        start = 0
+        if start_gid is not None:
+            start = int(np.searchsorted(gids, start_gid))
+        if max_ngraphs == float('inf'):
+            return gids[start:]
+        return gids[start:start + int(max_ngraphs)]
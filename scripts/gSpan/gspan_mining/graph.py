@@ -109,23 +109,15 @@ class Graph(object):
 
     def display(self):
         """Display the graph as text."""
-        display_str = ''
-        print('t # {}'.format(self.gid))
-        for vid in self.vertices:
-            print('v {} {}'.format(vid, self.vertices[vid].vlb))
-            display_str += 'v {} {} '.format(vid, self.vertices[vid].vlb)
+        lines = ['v {} {}'.format(vid, self.vertices[vid].vlb)
+                 for vid in self.vertices]
         for frm in self.vertices:
             edges = self.vertices[frm].edges
             for to in edges:
-                if self.is_undirected:
-                    if frm < to:
-                        print('e {} {} {}'.format(frm, to, edges[to].elb))
-                        display_str += 'e {} {} {} '.format(
-                            frm, to, edges[to].elb)
-                else:
-                    print('e {} {} {}'.format(frm, to, edges[to].elb))
-                    display_str += 'e {} {} {}'.format(frm, to, edges[to].elb)
-        return display_str
+                if (not self.is_undirected) or frm < to:
+                    lines.append('e {} {} {}'.format(frm, to, edges[to].elb))
+        print('\n'.join(['t # {}'.format(self.gid)] + lines))
+        return ' '.join(lines)
 
     def plot(self):
         """Visualize the graph."""
@@ -3,18 +3,31 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import codecs
 import collections
 import copy
 import itertools
+import multiprocessing
+import os
+import pickle
 import time
 
+import numpy as np
+
+from .atomic import dump_pickle
+from .cache import CanonicalCache
+from .database import GraphDatabase
+from .database import build_csr
 from .graph import AUTO_EDGE_ID
 from .graph import Graph
 from .graph import VACANT_GRAPH_ID
 from .graph import VACANT_VERTEX_LABEL
+from .report import ReportSink
+from .stats import TIMED_METHODS
+
 
-import pandas as pd
+PATTERN_TYPES = ('all', 'closed', 'maximal')
+
+CHECKPOINT_VERSION = 1
 
 
 def record_timestamp(func):
@@ -84,20 +97,41 @@ class DFScode(list):
         self.append(DFSedge(frm, to, vevlb))
         return self
 
-    def to_graph(self, gid=VACANT_GRAPH_ID, is_undirected=True):
-        """Construct a graph according to the dfs code."""
+    def to_graph(self, gid=VACANT_GRAPH_ID, is_undirected=True,
+                 vlb_table=None, elb_table=None):
+        """Construct a graph according to the dfs code.
+
+        Interned labels are decoded through `vlb_table` and `elb_table`
+        when they are given.
+        """
         g = Graph(gid,
                   is_undirected=is_undirected,
                   eid_auto_increment=True)
         for dfsedge in self:
             frm, to, (vlb1, elb, vlb2) = dfsedge.frm, dfsedge.to, dfsedge.vevlb
             if vlb1 != VACANT_VERTEX_LABEL:
-                g.add_vertex(frm, vlb1)
+                g.add_vertex(frm, vlb1 if vlb_table is None
+                             else vlb_table.decode(vlb1))
             if vlb2 != VACANT_VERTEX_LABEL:
-                g.add_vertex(to, vlb2)
-            g.add_edge(AUTO_EDGE_ID, frm, to, elb)
+                g.add_vertex(to, vlb2 if vlb_table is None
+                             else vlb_table.decode(vlb2))
+            g.add_edge(AUTO_EDGE_ID, frm, to,
+                       elb if elb_table is None else elb_table.decode(elb))
         return g
 
+    def to_database(self, is_undirected=True):
+        """Construct a one-graph database according to the dfs code."""
+        vlbs, edges = list(), list()
+        for dfsedge in self:
+            frm, to, (vlb1, elb, vlb2) = dfsedge.frm, dfsedge.to, dfsedge.vevlb
+            if vlb1 != VACANT_VERTEX_LABEL and frm == len(vlbs):
+                vlbs.append(vlb1)
+            if vlb2 != VACANT_VERTEX_LABEL and to == len(vlbs):
+                vlbs.append(vlb2)
+            edges.append((frm, to, elb))
+        return GraphDatabase(build_csr([(vlbs, edges)], is_undirected),
+                             None, None, is_undirected, use_numpy=False)
+
     def from_graph(self, g):
         """Build DFScode from graph `g`."""
         raise NotImplementedError('Not inplemented yet.')
@@ -121,15 +155,110 @@ class DFScode(list):
             [dfsedge.to for dfsedge in self]
         ))
 
+    def to_tuple(self):
+        """Return the code as a tuple of (frm, to, vlb1, elb, vlb2)."""
+        return tuple([(dfsedge.frm, dfsedge.to) + dfsedge.vevlb
+                      for dfsedge in self])
+
+    @staticmethod
+    def from_tuple(code):
+        """Build DFScode from the output of to_tuple()."""
+        dfscode = DFScode()
+        for frm, to, vlb1, elb, vlb2 in code:
+            dfscode.push_back(frm, to, (vlb1, elb, vlb2))
+        return dfscode
+
+
+class History(object):
+    """History class.
+
+    The edges, vertices and edges used by one embedding. Vertices and edges
+    are kept as bitmasks over the ids local to the embedded graph, so that
+    has_vertex() and has_edge() are bit tests.
+    """
+
+    __slots__ = ('edges', 'base', 'vertices_used', 'edges_used')
+
+    def __init__(self, db=None, pdfs=None):
+        """Initialize History instance.
+
+        The history extends the one of `pdfs` by nothing; use extend() to
+        add an edge of database `db`.
+        """
+        if pdfs is None:
+            self.edges = ()
+            self.base = 0
+            self.vertices_used = 0
+            self.edges_used = 0
+        else:
+            self.edges = pdfs.edges
+            self.base = pdfs.base
+            self.vertices_used = pdfs.vertices_used
+            self.edges_used = pdfs.edges_used
+
+    def extend(self, db, prev, gid, e):
+        """Set this history to the one of `prev` plus edge e of graph gid."""
+        if prev is None:
+            base = db.vertex_offsets[gid]
+            self.edges = (e,)
+            self.vertices_used = 1 << (db.adj_frm[e] - base)
+            self.edges_used = 0
+        else:
+            base = prev.base
+            self.edges = prev.edges + (e,)
+            self.vertices_used = prev.vertices_used | (
+                1 << (db.adj_frm[e] - base))
+            self.edges_used = prev.edges_used
+        self.base = base
+        self.vertices_used |= 1 << (db.adj_to[e] - base)
+        self.edges_used |= 1 << db.adj_eid[e]
+        return self
+
+    def has_vertex(self, vid):
+        """Check if the vertex with vid exists in the history."""
+        return (self.vertices_used >> (vid - self.base)) & 1 == 1
+
+    def has_edge(self, eid):
+        """Check if the edge with eid exists in the history."""
+        return (self.edges_used >> eid) & 1 == 1
+
+
+def _load_pdfs(gid, edge, edges, base, vertices_used, edges_used):
+    """Rebuild a PDFS pickled by PDFS.__reduce__()."""
+    pdfs = PDFS(gid)
+    pdfs.edge = edge
+    pdfs.edges = edges
+    pdfs.base = base
+    pdfs.vertices_used = vertices_used
+    pdfs.edges_used = edges_used
+    return pdfs
+
+
+class PDFS(History):
+    """PDFS class.
+
+    A PDFS is one embedding, extending the embedding `prev` by `edge`, and
+    carries its own History. It is pickled without `prev`, which is only
+    needed to build the history, so long embeddings do not pickle as
+    deeply nested objects.
+    """
 
-class PDFS(object):
-    """PDFS class."""
+    __slots__ = ('gid', 'edge', 'prev')
 
-    def __init__(self, gid=VACANT_GRAPH_ID, edge=None, prev=None):
+    def __init__(self, gid=VACANT_GRAPH_ID, edge=None, prev=None, db=None):
         """Initialize PDFS instance."""
         self.gid = gid
         self.edge = edge
         self.prev = prev
+        if edge is None:
+            History.__init__(self)
+        else:
+            self.extend(db, prev, gid, edge)
+
+    def __reduce__(self):
+        """Pickle the embedding by its history."""
+        return (_load_pdfs, (self.gid, self.edge, self.edges, self.base,
+                             self.vertices_used, self.edges_used))
 
 
 class Projected(list):
@@ -143,40 +272,37 @@ class Projected(list):
         """Initialize Projected instance."""
         super(Projected, self).__init__()
 
-    def push_back(self, gid, edge, prev):
+    def push_back(self, gid, edge, prev, db=None):
         """Update this Projected instance."""
-        self.append(PDFS(gid, edge, prev))
+        self.append(PDFS(gid, edge, prev, db))
         return self
 
 
-class History(object):
-    """History class."""
-
-    def __init__(self, g, pdfs):
-        """Initialize History instance."""
-        super(History, self).__init__()
-        self.edges = list()
-        self.vertices_used = collections.defaultdict(int)
-        self.edges_used = collections.defaultdict(int)
-        if pdfs is None:
-            return
-        while pdfs:
-            e = pdfs.edge
-            self.edges.append(e)
-            (self.vertices_used[e.frm],
-                self.vertices_used[e.to],
-                self.edges_used[e.eid]) = 1, 1, 1
+# gSpan instance shared by the worker processes of a parallel run.
+_worker_gspan = None
 
-            pdfs = pdfs.prev
-        self.edges = self.edges[::-1]
 
-    def has_vertex(self, vid):
-        """Check if the vertex with vid exists in the history."""
-        return self.vertices_used[vid] == 1
+def _init_worker(gs):
+    """Keep the gSpan instance and its root projections in this worker."""
+    global _worker_gspan
+    _worker_gspan = gs
+    if gs._root is None:
+        gs._root = gs._get_root_projections()
 
-    def has_edge(self, eid):
-        """Check if the edge with eid exists in the history."""
-        return self.edges_used[eid] == 1
+
+def _mine_root_branch(vevlb):
+    """Mine the search branch growing from root edge `vevlb`."""
+    gs = _worker_gspan
+    gs._branch_reports = list()
+    gs._DFScode = DFScode()
+    gs._DFScode.append(DFSedge(0, 1, vevlb))
+    hits, misses = gs._canonical_cache.hits, gs._canonical_cache.misses
+    if gs._stats is not None:
+        gs._stats.reset()
+    gs._subgraph_mining(gs._root[vevlb])
+    reports, gs._branch_reports = gs._branch_reports, None
+    return (vevlb, reports, gs._canonical_cache.hits - hits,
+            gs._canonical_cache.misses - misses, gs._stats, gs.truncated)
 
 
 class gSpan(object):
@@ -191,8 +317,55 @@ class gSpan(object):
                  is_undirected=True,
                  verbose=False,
                  visualize=False,
-                 where=False):
-        """Initialize gSpan instance."""
+                 where=False,
+                 workers=1,
+                 report_sink=None,
+                 quiet=False,
+                 canonical_cache_size=65536,
+                 canonical_cache=None,
+                 prune_infrequent=True,
+                 lattice=None,
+                 pattern_type='all',
+                 checkpoint_file=None,
+                 checkpoint_interval=300,
+                 stats=None,
+                 start_gid=None,
+                 constraints=None,
+                 hub=None,
+                 sample=None,
+                 max_patterns=None,
+                 time_budget=None):
+        """Initialize gSpan instance.
+
+        `database_file_name` may also be a GraphDatabase already in memory.
+
+        With `checkpoint_file`, the search frontier and the patterns
+        reported so far are saved to it every `checkpoint_interval`
+        seconds, and a run with the same parameters resumes from it. The
+        file is removed once the run completes.
+
+        With `stats`, a stats.MiningStats, the calls and times of the hot
+        path methods and counters of the search are collected into it.
+
+        With `start_gid`, max_ngraphs graphs are read from the graph with
+        that id in the database file on, instead of from its first graph.
+
+        With `constraints`, a constraints.PatternConstraints, only patterns
+        satisfying them are reported, and the search is pruned by them.
+
+        With `hub`, a hub.HubAnchor, hub vertices are left out while mining
+        and re-attached to the reported subgraphs; vertex bounds count the
+        re-attached hub.
+
+        With `sample`, positions among the graphs read, only those graphs
+        are mined; the others are kept empty, so `where` still gives
+        positions among the graphs read.
+
+        With `max_patterns` or `time_budget`, in seconds, the search stops
+        once that many frequent patterns are found or that much time has
+        passed since run() started, keeping the patterns found so far, and
+        sets `truncated`.
+        """
         self._database_file_name = database_file_name
         self.graphs = dict()
 
@@ -202,6 +375,7 @@ class gSpan(object):
 
         self.pid = 0
         self._max_ngraphs = max_ngraphs
+        self._start_gid = start_gid
         self._is_undirected = is_undirected
         self._min_support = min_support
         self._min_num_vertices = min_num_vertices
@@ -216,13 +390,63 @@ class gSpan(object):
         self._verbose = verbose
         self._visualize = visualize
         self._where = where
+        self._workers = workers
+        self._sink = ReportSink() if report_sink is None else report_sink
+        self._quiet = quiet
+        if canonical_cache is None:
+            canonical_cache = CanonicalCache(canonical_cache_size,
+                                             is_undirected)
+        self._canonical_cache = canonical_cache
+        self._prune = prune_infrequent
+        self._db = None
+        self.prune_stats = dict()
+        self._lattice = lattice
+        self._constraints = constraints
+        self._hub = hub
+        self._sample = sample
+        self._max_patterns = max_patterns
+        self._time_budget = time_budget
+        self._deadline = None
+        self.truncated = False
+        if pattern_type not in PATTERN_TYPES:
+            raise ValueError('Unknown pattern type {}, expected one of '
+                             '{}.'.format(pattern_type,
+                                          ', '.join(PATTERN_TYPES)))
+        self._pattern_type = pattern_type
+        self._num_frequent = 0
+        self._checkpoint_file = checkpoint_file
+        self._checkpoint_interval = checkpoint_interval
+        self._checkpoint_time = 0
+        self._reports = None
+        self._root = None
+        self._branch_reports = None
+        self._stats = stats
+        self._instrument()
         self.timestamps = dict()
         if self._max_num_vertices < self._min_num_vertices:
             print('Max number of vertices can not be smaller than '
                   'min number of that.\n'
                   'Set max_num_vertices = min_num_vertices.')
             self._max_num_vertices = self._min_num_vertices
-        self._report_df = pd.DataFrame()
+
+    def _instrument(self):
+        """Wrap the hot path methods of this instance to collect stats."""
+        if self._stats is None:
+            return
+        for name in TIMED_METHODS:
+            setattr(self, name, self._stats.timed(name, getattr(self, name)))
+
+    def __getstate__(self):
+        """Pickle without the wrapped methods."""
+        state = self.__dict__.copy()
+        for name in TIMED_METHODS:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        """Restore from pickle and wrap the methods again."""
+        self.__dict__.update(state)
+        self._instrument()
 
     def time_stats(self):
         """Print stats of time."""
@@ -238,60 +462,74 @@ class gSpan(object):
         print('Mine:\t{} s'.format(
             time_deltas['run'] - time_deltas['_read_graphs']))
         print('Total:\t{} s'.format(time_deltas['run']))
+        if self._pattern_type != 'all':
+            print('{}:\t{} of {} frequent patterns, {}x fewer'.format(
+                self._pattern_type.capitalize(), len(self.subgraphs),
+                self._num_frequent,
+                round(self._num_frequent / max(len(self.subgraphs), 1), 2)))
+        if self.prune_stats:
+            print('Pruned:\t{} of {} vertices, {} of {} edges'.format(
+                *(self.prune_stats['vertices'] + self.prune_stats['edges'])))
+        print('is_min cache:\t{} hits, {} misses'.format(
+            self._canonical_cache.hits, self._canonical_cache.misses))
+        if self.truncated:
+            print('Stopped early, the pattern or time budget was reached.')
 
         return self
 
     @record_timestamp
     def _read_graphs(self):
-        self.graphs = dict()
-        with codecs.open(self._database_file_name, 'r', 'utf-8') as f:
-            lines = [line.strip() for line in f.readlines()]
-            tgraph, graph_cnt = None, 0
-            for i, line in enumerate(lines):
-                cols = line.split(' ')
-                if cols[0] == 't':
-                    if tgraph is not None:
-                        self.graphs[graph_cnt] = tgraph
-                        graph_cnt += 1
-                        tgraph = None
-                    if cols[-1] == '-1' or graph_cnt >= self._max_ngraphs:
-                        break
-                    tgraph = Graph(graph_cnt,
-                                   is_undirected=self._is_undirected,
-                                   eid_auto_increment=True)
-                elif cols[0] == 'v':
-                    tgraph.add_vertex(cols[1], cols[2])
-                elif cols[0] == 'e':
-                    tgraph.add_edge(AUTO_EDGE_ID, cols[1], cols[2], cols[3])
-            # adapt to input files that do not end with 't # -1'
-            if tgraph is not None:
-                self.graphs[graph_cnt] = tgraph
+        if isinstance(self._database_file_name, GraphDatabase):
+            self.graphs = self._database_file_name.select_gids(
+                self._start_gid, self._max_ngraphs)
+        else:
+            self.graphs = GraphDatabase.from_file(
+                self._database_file_name,
+                is_undirected=self._is_undirected,
+                max_ngraphs=self._max_ngraphs,
+                start_gid=self._start_gid
+            )
+        if self._sample is not None:
+            db = self.graphs
+            sampled = np.zeros(len(db), dtype=bool)
+            sampled[np.asarray(self._sample, dtype=np.int64)] = True
+            self.graphs = db.subgraph(sampled[db.vertex_gids()],
+                                      np.ones(db.num_edges, dtype=bool))
         return self
 
     @record_timestamp
     def _generate_1edge_frequent_subgraphs(self):
-        vlb_counter = collections.Counter()
-        vevlb_counter = collections.Counter()
-        vlb_counted = set()
-        vevlb_counted = set()
-        for g in self.graphs.values():
-            for v in g.vertices.values():
-                if (g.gid, v.vlb) not in vlb_counted:
-                    vlb_counter[v.vlb] += 1
-                vlb_counted.add((g.gid, v.vlb))
-                for to, e in v.edges.items():
-                    vlb1, vlb2 = v.vlb, g.vertices[to].vlb
-                    if self._is_undirected and vlb1 > vlb2:
-                        vlb1, vlb2 = vlb2, vlb1
-                    if (g.gid, (vlb1, e.elb, vlb2)) not in vevlb_counter:
-                        vevlb_counter[(vlb1, e.elb, vlb2)] += 1
-                    vevlb_counted.add((g.gid, (vlb1, e.elb, vlb2)))
+        db = self.graphs
+        vlbs, vlb_cnts = db.graph_support(db.array('vlb'), db.vertex_gids())
+        vevlbs, vevlb_cnts = db.graph_support(db.edge_triples(),
+                                              db.edge_gids())
+        self._frequent_vlbs = vlbs[vlb_cnts >= self._min_support]
+        self._frequent_vevlbs = vevlbs[vevlb_cnts >= self._min_support]
+        # Largest support of an edge at each vertex label.
+        nvlb = len(db.vlb_table)
+        ext_cnts = np.zeros(nvlb, dtype=np.int64)
+        if self._max_num_vertices >= 2:
+            np.maximum.at(ext_cnts, vevlbs // len(db.elb_table) // nvlb,
+                          vevlb_cnts)
+            np.maximum.at(ext_cnts, vevlbs % nvlb, vevlb_cnts)
         # add frequent vertices.
-        for vlb, cnt in vlb_counter.items():
+        for vlb, cnt in zip(vlbs.tolist(), vlb_cnts.tolist()):
             if cnt >= self._min_support:
+                if (self._constraints is not None and
+                        not self._constraints.accepts_vlb(vlb)):
+                    continue
+                if self._lattice is not None:
+                    self._lattice.add_size1(vlb, cnt)
+                if self._min_num_vertices <= 1:
+                    self._num_frequent += 1
+                if ((self._pattern_type == 'closed' and
+                        ext_cnts[vlb] >= cnt) or
+                        (self._pattern_type == 'maximal' and
+                         ext_cnts[vlb] >= self._min_support)):
+                    continue
                 g = Graph(gid=next(self._counter),
                           is_undirected=self._is_undirected)
-                g.add_vertex(0, vlb)
+                g.add_vertex(0, db.vlb_table.decode(vlb))
                 self._frequent_size1_subgraphs.append(g)
                 if self._min_num_vertices <= 1:
                     self._report_size1(g, support=cnt)
@@ -300,29 +538,227 @@ class gSpan(object):
         if self._min_num_vertices > 1:
             self._counter = itertools.count()
 
+    @record_timestamp
+    def _prune_infrequent(self):
+        """Drop vertices and edges that can not be in a frequent pattern.
+
+        Every vertex label and (vlb, elb, vlb) triple of a frequent pattern
+        is frequent itself, so mining on the pruned database finds the same
+        patterns with the same supports. What the constraints rule out and
+        hub vertices are dropped as well. self.graphs is left untouched.
+        """
+        db = self.graphs
+        self._db = db
+        if (not self._prune and self._constraints is None and
+                self._hub is None):
+            return
+        vertex_mask = np.ones(db.num_vertices, dtype=bool)
+        edge_mask = np.ones(db.num_edges, dtype=bool)
+        if self._hub is not None:
+            hub_vertex_mask, hub_edge_mask = self._hub.masks(db)
+            vertex_mask &= hub_vertex_mask
+            edge_mask &= hub_edge_mask
+        if self._prune:
+            frequent_vlb = np.zeros(len(db.vlb_table), dtype=bool)
+            frequent_vlb[self._frequent_vlbs] = True
+            vertex_mask &= frequent_vlb[db.array('vlb')]
+            edge_mask &= np.isin(db.edge_triples(), self._frequent_vevlbs)
+        if self._constraints is not None:
+            allowed_vertices, allowed_edges = self._constraints.masks(db)
+            vertex_mask &= allowed_vertices
+            edge_mask &= allowed_edges
+        self._db = db.subgraph(vertex_mask, edge_mask)
+        # Undirected edges take two adjacency slots.
+        shift = 1 if self._is_undirected else 0
+        self.prune_stats = {
+            'vertices': (db.num_vertices - self._db.num_vertices,
+                         db.num_vertices),
+            'edges': ((db.num_edges - self._db.num_edges) >> shift,
+                      db.num_edges >> shift),
+        }
+
     @record_timestamp
     def run(self):
         """Run the gSpan algorithm."""
         try:
+                if self._time_budget is not None:
+                    self._deadline = time.time() + self._time_budget
                 self._read_graphs()
+                self._sink.open(self.graphs.vlb_table, self.graphs.elb_table)
+                self._canonical_cache.bind((
+                    tuple(self.graphs.vlb_table.names),
+                    tuple(self.graphs.elb_table.names),
+                    self._is_undirected
+                ), self._is_undirected)
+                if self._hub is not None:
+                    self._hub.bind(self.graphs)
+                if self._lattice is not None:
+                    self._lattice.open(self.graphs.vlb_table,
+                                       self.graphs.elb_table,
+                                       hub=self._hub)
+                if self._constraints is not None:
+                    self._constraints.bind(self.graphs.vlb_table,
+                                           self.graphs.elb_table)
                 self._generate_1edge_frequent_subgraphs()
-                if self._max_num_vertices < 2:
+                if self._max_num_vertices < (2 if self._hub is None else 3):
                     return
-                root = collections.defaultdict(Projected)
-                for gid, g in self.graphs.items():
-                    for vid, v in g.vertices.items():
-                        edges = self._get_forward_root_edges(g, vid)
-                        for e in edges:
-                            root[(v.vlb, e.elb, g.vertices[e.to].vlb)].append(
-                                PDFS(gid, e, None)
-                            )
+                self._prune_infrequent()
+                state = self._load_checkpoint()
+                self._root = self._get_root_projections()
+                if state is None and self._workers > 1 or (
+                        state is not None and 'branches' in state):
+                    self._run_parallel(state)
+                else:
+                    self._run_serial(state)
+                self._remove_checkpoint()
+                if self._stats is not None:
+                    self._stats.counters.update({
+                        'frequent_patterns': self._num_frequent,
+                        'reported_patterns': len(self.subgraphs),
+                        'is_min_cache_hits': self._canonical_cache.hits,
+                        'is_min_cache_misses': self._canonical_cache.misses,
+                    })
+        finally:
+                self._sink.close()
+
+    def _checkpoint_signature(self):
+        """Describe the run, so a checkpoint is resumed by the same one."""
+        return (self._database_file_name, self._start_gid, self._max_ngraphs,
+                self._is_undirected, self._min_support,
+                self._min_num_vertices, self._max_num_vertices,
+                self._prune, self._pattern_type,
+                None if self._constraints is None
+                else self._constraints.signature(),
+                None if self._hub is None else (self._hub.vlb, self._hub.elb),
+                None if self._sample is None else tuple(self._sample),
+                self._db.num_vertices, self._db.num_edges)
+
+    def _load_checkpoint(self):
+        """Return the state saved by an interrupted run, or None."""
+        if self._checkpoint_file is None:
+            return None
+        self._reports = list()
+        self._checkpoint_time = time.time()
+        if not os.path.exists(self._checkpoint_file):
+            return None
+        with open(self._checkpoint_file, 'rb') as f:
+            state = pickle.load(f)
+        if (state.get('version') != CHECKPOINT_VERSION or
+                state.get('signature') != self._checkpoint_signature()):
+            raise ValueError('Checkpoint {} was written by another run, '
+                             'remove it to start over.'.format(
+                                 self._checkpoint_file))
+        if not self._quiet:
+            print('Resuming from checkpoint {}'.format(self._checkpoint_file))
+        return state
+
+    def _checkpoint_due(self):
+        return (self._checkpoint_file is not None and
+                self._branch_reports is None and
+                time.time() - self._checkpoint_time >=
+                self._checkpoint_interval)
+
+    def _save_checkpoint(self, state):
+        """Atomically replace the checkpoint file by `state`."""
+        state = dict(state, version=CHECKPOINT_VERSION,
+                     signature=self._checkpoint_signature())
+        dump_pickle(state, self._checkpoint_file)
+        self._checkpoint_time = time.time()
+
+    def _remove_checkpoint(self):
+        if (self._checkpoint_file is not None and
+                os.path.exists(self._checkpoint_file)):
+            os.remove(self._checkpoint_file)
+
+    def _run_serial(self, state=None):
+        """Mine the root branches one after another in this process.
+
+        The search runs on one explicit stack of (depth, dfsedge, projected)
+        frames, see _mine_stack(), which is what a checkpoint saves along
+        with the patterns reported so far. On resume those patterns are
+        reported again, so gids and output match an uninterrupted run.
+        """
+        if state is None:
+            stack = [(0, DFSedge(0, 1, vevlb), projected)
+                     for vevlb, projected in reversed(
+                         list(self._root.items()))]
+        else:
+            for code, support, where, emit in state['reports']:
+                self._DFScode = DFScode.from_tuple(code)
+                self._support = support
+                self._report_where(where, emit)
+            self._DFScode = DFScode.from_tuple(state['dfscode'])
+            stack = state['stack']
+        self._mine_stack(stack)
+        self._DFScode = DFScode()
+
+    def _get_root_projections(self):
+        db = self._db
+        vlb, adj_to, adj_elb = db.vlb, db.adj_to, db.adj_elb
+        root = collections.defaultdict(Projected)
+        for gid in db:
+            for v in db.vertices(gid):
+                edges = self._get_forward_root_edges(db, v)
+                for e in edges:
+                    root[(vlb[v], adj_elb[e], vlb[adj_to[e]])].append(
+                        PDFS(gid, e, None, db)
+                    )
+        return root
+
+    def _run_parallel(self, state=None):
+        """Mine the root branches in worker processes.
+
+        Root branches are independent, so each one is mined by a worker and
+        its patterns are reported back here in the serial order of the
+        branches, which keeps gids and output identical to a serial run.
+        Branches with the largest projections are handed out first. A
+        checkpoint saves the patterns of the finished branches.
+        """
+        results = dict() if state is None else state['branches']
+        vevlbs = list(self._root.keys())
+        by_size = sorted([vevlb for vevlb in vevlbs
+                          if vevlb not in results],
+                         key=lambda k: -len(self._root[k]))
+        # Forked workers inherit the root projections; spawned ones rebuild.
+        # Only this process writes to the sink.
+        root, self._root = self._root, None
+        sink, self._sink = self._sink, ReportSink()
+        if multiprocessing.get_start_method() == 'fork':
+            self._root = root
+        pool = multiprocessing.Pool(max(self._workers, 1),
+                                    initializer=_init_worker,
+                                    initargs=(self,))
+        try:
+            for (vevlb, reports, hits, misses, stats,
+                 truncated) in pool.imap_unordered(_mine_root_branch,
+                                                   by_size):
+                results[vevlb] = reports
+                self.truncated |= truncated
+                self._canonical_cache.hits += hits
+                self._canonical_cache.misses += misses
+                if stats is not None:
+                    self._stats.merge(stats)
+                if self._checkpoint_due():
+                    self._save_checkpoint({'branches': results})
+        finally:
+            pool.close()
+            pool.join()
+        self._root, self._sink = root, sink
+        for vevlb in vevlbs:
+            for dfscode, support, where, emit in results.pop(vevlb):
+                if (self._max_patterns is not None and
+                        self._num_frequent >= self._max_patterns):
+                    self.truncated = True
+                    break
+                self._DFScode, self._support = dfscode, support
+                self._report_where(where, emit)
+        self._DFScode = DFScode()
 
-                for vevlb, projected in root.items():
-                    self._DFScode.append(DFSedge(0, 1, vevlb))
-                    self._subgraph_mining(projected)
-                    self._DFScode.pop()
-        except:
-                pass
+    def _get_num_vertices(self):
+        """Return number of vertices of the current pattern as reported."""
+        if self._hub is None:
+            return self._DFScode.get_num_vertices()
+        return self._hub.num_vertices(self._DFScode)
 
     def _get_support(self, projected):
         return len(set([pdfs.gid for pdfs in projected]))
@@ -330,90 +766,178 @@ class gSpan(object):
     def _report_size1(self, g, support):
         # Subgraph is added
         self.subgraphs[g.gid] = g
+        if self._quiet:
+            return
         g.display()
         print('\nSupport: {}'.format(support))
         print('\n-----------------\n')
 
     def _report(self, projected):
+        where = set([p.gid for p in projected])
+        emit = True
+        if self._pattern_type == 'closed':
+            emit = not self._has_extension(projected, self._support)
+        elif self._pattern_type == 'maximal':
+            emit = not self._has_extension(projected, self._min_support)
+        if self._branch_reports is not None:
+            self._branch_reports.append(
+                (copy.copy(self._DFScode), self._support, where, emit))
+            return
+        self._report_where(where, emit)
+
+    def _report_where(self, where, emit=True):
         self._frequent_subgraphs.append(copy.copy(self._DFScode))
-        if self._DFScode.get_num_vertices() < self._min_num_vertices:
+        if self._reports is not None:
+            self._reports.append(
+                (self._DFScode.to_tuple(), self._support, where, emit))
+        num_vertices = self._get_num_vertices()
+        if self._lattice is not None:
+            self._lattice.add(self._DFScode.to_tuple(), self._support,
+                              num_vertices, where)
+        if num_vertices < self._min_num_vertices:
+            return
+        self._num_frequent += 1
+        if not emit:
             return
         g = self._DFScode.to_graph(gid=next(self._counter),
-                                   is_undirected=self._is_undirected)
-        display_str = g.display()
-        
+                                   is_undirected=self._is_undirected,
+                                   vlb_table=self.graphs.vlb_table,
+                                   elb_table=self.graphs.elb_table)
+        if self._hub is not None:
+            g = self._hub.attach(g)
+
         # Subgraph is added
         self.subgraphs[g.gid] = g
-        self.support_where[g.gid]  = set([p.gid for p in projected])
-
-        print('\nSupport: {}'.format(self._support))
+        self.support_where[g.gid]  = where
 
-        # Add some report info to pandas dataframe "self._report_df".
-        self._report_df = self._report_df.append(
-            pd.DataFrame(
-                {
-                    'support': [self._support],
-                    'description': [display_str],
-                    'num_vert': self._DFScode.get_num_vertices()
-                },
-                index=[int(repr(self._counter)[6:-1])]
-            )
-        )
+        self._sink.write(g.gid, self._support,
+                         self._DFScode.to_tuple(),
+                         self._DFScode.get_num_vertices(), where)
         if self._visualize:
             g.plot()
+        if self._quiet:
+            return
+        g.display()
+        print('\nSupport: {}'.format(self._support))
         if self._where:
-            print('where: {}'.format(list(set([p.gid for p in projected]))))
+            print('where: {}'.format(list(where)))
         print('\n-----------------\n')
 
-    def _get_forward_root_edges(self, g, frm):
+    def _has_extension(self, projected, min_support):
+        """Check if a one-edge supergraph has at least `min_support`.
+
+        Every edge next to an embedding gives a supergraph, not only the
+        rightmost extensions gSpan grows. The supergraph is named by the
+        pattern vertices the edge touches, so an edge seen through
+        automorphic embeddings counts towards each of its names, just as
+        gSpan's projections list every embedding. Forward edges are not
+        considered once the pattern has max_num_vertices vertices.
+        Embeddings through a self-loop map two pattern vertices to one
+        vertex; gSpan never grows them, so they are skipped here too.
+        """
+        db = self._db
+        vlb, adj_frm, adj_to, adj_elb, adj_eid = (
+            db.vlb, db.adj_frm, db.adj_to, db.adj_elb, db.adj_eid)
+        num_vertices = self._DFScode.get_num_vertices()
+        grow = self._get_num_vertices() < self._max_num_vertices
+        ext_where = collections.defaultdict(set)
+        for p in projected:
+            vmap = dict()
+            for dfsedge, e in zip(self._DFScode, p.edges):
+                vmap[adj_frm[e]] = dfsedge.frm
+                vmap[adj_to[e]] = dfsedge.to
+            if len(vmap) < num_vertices:
+                continue
+            for v, i in vmap.items():
+                for e in db.edges(v):
+                    if p.has_edge(adj_eid[e]):
+                        continue
+                    to = adj_to[e]
+                    if to in vmap:
+                        j = vmap[to]
+                        if self._is_undirected and j < i:
+                            key = (j, i, adj_elb[e])
+                        else:
+                            key = (i, j, adj_elb[e])
+                    elif grow:
+                        key = (i, adj_elb[e], vlb[to], 1)
+                    else:
+                        continue
+                    gids = ext_where[key]
+                    gids.add(p.gid)
+                    if len(gids) >= min_support:
+                        return True
+                if self._is_undirected or not grow:
+                    continue
+                for e in db.in_edges(v):
+                    frm = adj_frm[e]
+                    if frm in vmap:
+                        continue
+                    gids = ext_where[(i, adj_elb[e], vlb[frm], -1)]
+                    gids.add(p.gid)
+                    if len(gids) >= min_support:
+                        return True
+        return False
+
+    def _get_forward_root_edges(self, db, frm):
         result = []
-        v_frm = g.vertices[frm]
-        for to, e in v_frm.edges.items():
-            if (not self._is_undirected) or v_frm.vlb <= g.vertices[to].vlb:
+        vlb, adj_to = db.vlb, db.adj_to
+        frm_vlb = vlb[frm]
+        for e in range(db.adj_offsets[frm], db.adj_offsets[frm + 1]):
+            if (not self._is_undirected) or frm_vlb <= vlb[adj_to[e]]:
                 result.append(e)
         return result
 
-    def _get_backward_edge(self, g, e1, e2, history):
+    def _get_backward_edge(self, db, e1, e2, history):
         if self._is_undirected and e1 == e2:
             return None
-        for to, e in g.vertices[e2.to].edges.items():
-            if history.has_edge(e.eid) or e.to != e1.frm:
+        vlb, adj_frm, adj_to, adj_elb, adj_eid = (
+            db.vlb, db.adj_frm, db.adj_to, db.adj_elb, db.adj_eid)
+        e1_frm, e2_to = adj_frm[e1], adj_to[e2]
+        for e in range(db.adj_offsets[e2_to], db.adj_offsets[e2_to + 1]):
+            if history.has_edge(adj_eid[e]) or adj_to[e] != e1_frm:
                 continue
             # if reture here, then self._DFScodep[0] != dfs_code_min[0]
             # should be checked in _is_min(). or:
             if self._is_undirected:
-                if e1.elb < e.elb or (
-                        e1.elb == e.elb and
-                        g.vertices[e1.to].vlb <= g.vertices[e2.to].vlb):
+                if adj_elb[e1] < adj_elb[e] or (
+                        adj_elb[e1] == adj_elb[e] and
+                        vlb[adj_to[e1]] <= vlb[e2_to]):
                     return e
             else:
-                if g.vertices[e1.frm].vlb < g.vertices[e2.to].vlb or (
-                        g.vertices[e1.frm].vlb == g.vertices[e2.to].vlb and
-                        e1.elb <= e.elb):
+                if vlb[e1_frm] < vlb[e2_to] or (
+                        vlb[e1_frm] == vlb[e2_to] and
+                        adj_elb[e1] <= adj_elb[e]):
                     return e
             # if e1.elb < e.elb or (e1.elb == e.elb and
             #     g.vertices[e1.to].vlb <= g.vertices[e2.to].vlb):
             #     return e
         return None
 
-    def _get_forward_pure_edges(self, g, rm_edge, min_vlb, history):
+    def _get_forward_pure_edges(self, db, rm_edge, min_vlb, history):
         result = []
-        for to, e in g.vertices[rm_edge.to].edges.items():
-            if min_vlb <= g.vertices[e.to].vlb and (
-                    not history.has_vertex(e.to)):
+        vlb, adj_to = db.vlb, db.adj_to
+        rm_to = adj_to[rm_edge]
+        for e in range(db.adj_offsets[rm_to], db.adj_offsets[rm_to + 1]):
+            if min_vlb <= vlb[adj_to[e]] and (
+                    not history.has_vertex(adj_to[e])):
                 result.append(e)
         return result
 
-    def _get_forward_rmpath_edges(self, g, rm_edge, min_vlb, history):
+    def _get_forward_rmpath_edges(self, db, rm_edge, min_vlb, history):
         result = []
-        to_vlb = g.vertices[rm_edge.to].vlb
-        for to, e in g.vertices[rm_edge.frm].edges.items():
-            new_to_vlb = g.vertices[to].vlb
-            if (rm_edge.to == e.to or
+        vlb, adj_to, adj_elb = db.vlb, db.adj_to, db.adj_elb
+        rm_frm, rm_to, rm_elb = db.adj_frm[rm_edge], adj_to[rm_edge], \
+            adj_elb[rm_edge]
+        to_vlb = vlb[rm_to]
+        for e in range(db.adj_offsets[rm_frm], db.adj_offsets[rm_frm + 1]):
+            new_to = adj_to[e]
+            new_to_vlb = vlb[new_to]
+            if (rm_to == new_to or
                     min_vlb > new_to_vlb or
-                    history.has_vertex(e.to)):
+                    history.has_vertex(new_to)):
                 continue
-            if rm_edge.elb < e.elb or (rm_edge.elb == e.elb and
+            if rm_elb < adj_elb[e] or (rm_elb == adj_elb[e] and
                                        to_vlb <= new_to_vlb):
                 result.append(e)
         return result
@@ -423,20 +947,49 @@ class gSpan(object):
             print('is_min: checking {}'.format(self._DFScode))
         if len(self._DFScode) == 1:
             return True
-        g = self._DFScode.to_graph(gid=VACANT_GRAPH_ID,
-                                   is_undirected=self._is_undirected)
+        code = self._DFScode.to_tuple()
+        key = self._canonical_cache.key(code)
+        cached = self._canonical_cache.get(key, code)
+        if cached is not None:
+            return cached[0]
+        res, dfs_code_min = self._compute_is_min()
+        self._canonical_cache.put(key, code, res, dfs_code_min.to_tuple())
+        return res
+
+    def _compute_is_min(self):
+        """Check if self._DFScode is minimum.
+
+        Returns:
+            the verdict and the minimum DFS code, as far as it was built
+            before the verdict was clear.
+        """
+        g = self._DFScode.to_database(is_undirected=self._is_undirected)
+        return self._min_dfs_code(g, self._DFScode)
+
+    def _min_dfs_code(self, g, dfscode=None):
+        """Build the minimum DFS code of the connected one-graph database g.
+
+        With `dfscode`, stop as soon as the minimum code departs from it.
+
+        Returns:
+            whether `dfscode` is minimum, True without one, and the minimum
+            DFS code, as far as it was built before the verdict was clear.
+        """
+        vlb, adj_to, adj_elb = g.vlb, g.adj_to, g.adj_elb
         dfs_code_min = DFScode()
         root = collections.defaultdict(Projected)
-        for vid, v in g.vertices.items():
+        for vid in g.vertices(0):
             edges = self._get_forward_root_edges(g, vid)
             for e in edges:
-                root[(v.vlb, e.elb, g.vertices[e.to].vlb)].append(
-                    PDFS(g.gid, e, None))
+                root[(vlb[vid], adj_elb[e], vlb[adj_to[e]])].append(
+                    PDFS(0, e, None, g))
         min_vevlb = min(root.keys())
         dfs_code_min.append(DFSedge(0, 1, min_vevlb))
         # No need to check if is min code because of pruning in get_*_edge*.
 
-        def project_is_min(projected):
+        # Grow dfs_code_min one edge at a time and compare it as it grows.
+        projected = root[min_vevlb]
+        while True:
             dfs_code_min.build_rmpath()
             rmpath = dfs_code_min.rmpath
             min_vlb = dfs_code_min[0].vevlb[0]
@@ -449,13 +1002,12 @@ class gSpan(object):
                 if flag:
                     break
                 for p in projected:
-                    history = History(g, p)
                     e = self._get_backward_edge(g,
-                                                history.edges[rmpath[i]],
-                                                history.edges[rmpath[0]],
-                                                history)
+                                                p.edges[rmpath[i]],
+                                                p.edges[rmpath[0]],
+                                                p)
                     if e is not None:
-                        backward_root[e.elb].append(PDFS(g.gid, e, p))
+                        backward_root[adj_elb[e]].append(PDFS(0, e, p, g))
                         newto = dfs_code_min[rmpath[i]].frm
                         flag = True
             if flag:
@@ -467,45 +1019,44 @@ class gSpan(object):
                      VACANT_VERTEX_LABEL)
                 ))
                 idx = len(dfs_code_min) - 1
-                if self._DFScode[idx] != dfs_code_min[idx]:
-                    return False
-                return project_is_min(backward_root[backward_min_elb])
+                if dfscode is not None and dfscode[idx] != dfs_code_min[idx]:
+                    return False, dfs_code_min
+                projected = backward_root[backward_min_elb]
+                continue
 
             forward_root = collections.defaultdict(Projected)
             flag, newfrm = False, 0
             for p in projected:
-                history = History(g, p)
                 edges = self._get_forward_pure_edges(g,
-                                                     history.edges[rmpath[0]],
+                                                     p.edges[rmpath[0]],
                                                      min_vlb,
-                                                     history)
+                                                     p)
                 if len(edges) > 0:
                     flag = True
                     newfrm = maxtoc
                     for e in edges:
                         forward_root[
-                            (e.elb, g.vertices[e.to].vlb)
-                        ].append(PDFS(g.gid, e, p))
+                            (adj_elb[e], vlb[adj_to[e]])
+                        ].append(PDFS(0, e, p, g))
             for rmpath_i in rmpath:
                 if flag:
                     break
                 for p in projected:
-                    history = History(g, p)
                     edges = self._get_forward_rmpath_edges(g,
-                                                           history.edges[
+                                                           p.edges[
                                                                rmpath_i],
                                                            min_vlb,
-                                                           history)
+                                                           p)
                     if len(edges) > 0:
                         flag = True
                         newfrm = dfs_code_min[rmpath_i].frm
                         for e in edges:
                             forward_root[
-                                (e.elb, g.vertices[e.to].vlb)
-                            ].append(PDFS(g.gid, e, p))
+                                (adj_elb[e], vlb[adj_to[e]])
+                            ].append(PDFS(0, e, p, g))
 
             if not flag:
-                return True
+                return True, dfs_code_min
 
             forward_min_evlb = min(forward_root.keys())
             dfs_code_min.append(DFSedge(
@@ -513,81 +1064,151 @@ class gSpan(object):
                 (VACANT_VERTEX_LABEL, forward_min_evlb[0], forward_min_evlb[1]))
             )
             idx = len(dfs_code_min) - 1
-            if self._DFScode[idx] != dfs_code_min[idx]:
-                return False
-            return project_is_min(forward_root[forward_min_evlb])
-
-        res = project_is_min(root[min_vevlb])
-        return res
+            if dfscode is not None and dfscode[idx] != dfs_code_min[idx]:
+                return False, dfs_code_min
+            projected = forward_root[forward_min_evlb]
 
     def _subgraph_mining(self, projected):
+        """Mine the patterns grown from self._DFScode and `projected`."""
+        self._mine_stack([(len(self._DFScode), None, projected)])
+        return self
+
+    def _mine_stack(self, stack):
+        """Run the depth first search of gSpan on an explicit stack.
+
+        A frame (depth, dfsedge, projected) is the pattern made of the
+        first `depth` edges of self._DFScode, which is an ancestor of every
+        frame still on the stack, plus `dfsedge`. Children are pushed in
+        reverse, so patterns are visited in the order of the recursive
+        search, and no recursion limit applies to the pattern size.
+        """
+        stats = self._stats
+        # Embeddings held by the frames on the stack.
+        if stats is not None:
+            live = sum([len(frame[2]) for frame in stack])
+        while stack:
+            if self._budget_spent():
+                self.truncated = True
+                break
+            if self._checkpoint_due():
+                self._save_checkpoint({'reports': self._reports,
+                                       'dfscode': self._DFScode.to_tuple(),
+                                       'stack': stack})
+            depth, dfsedge, projected = stack.pop()
+            del self._DFScode[depth:]
+            if dfsedge is not None:
+                self._DFScode.append(dfsedge)
+            children = self._grow(projected)
+            depth = len(self._DFScode)
+            for dfsedge, child in reversed(children):
+                stack.append((depth, dfsedge, child))
+            if stats is not None:
+                live += sum([len(child) for _, child in children])
+                stats.peak_embeddings = max(stats.peak_embeddings, live)
+                live -= len(projected)
+
+    def _budget_spent(self):
+        """Check if max_patterns or time_budget is reached."""
+        if self._deadline is not None and time.time() >= self._deadline:
+            return True
+        if self._max_patterns is None:
+            return False
+        if self._branch_reports is not None:
+            return len(self._branch_reports) >= self._max_patterns
+        return self._num_frequent >= self._max_patterns
+
+    def _grow(self, projected):
+        """Report self._DFScode if frequent and minimum, and extend it.
+
+        Returns:
+            list of (dfsedge, projected) of the extensions to search next,
+            in gSpan order.
+        """
+        stats = self._stats
+        if stats is not None:
+            stats.projection(len(self._DFScode), len(projected))
         self._support = self._get_support(projected)
         if self._support < self._min_support:
-            return
+            if stats is not None:
+                stats.pruned['support'] += 1
+            return []
         if not self._is_min():
-            return
-        self._report(projected)
-        num_vertices = self._DFScode.get_num_vertices()
+            if stats is not None:
+                stats.pruned['minimality'] += 1
+            return []
+        constraints = self._constraints
+        if constraints is None or constraints.accepts(self._DFScode):
+            self._report(projected)
+        elif self._get_num_vertices() >= self._max_num_vertices:
+            # No vertex can be added to satisfy the constraints.
+            return []
         self._DFScode.build_rmpath()
         rmpath = self._DFScode.rmpath
         maxtoc = self._DFScode[rmpath[0]].to
+        backward_root, forward_root = self._extend_projections(projected)
+
+        children = list()
+        # backward
+        for to, elb in backward_root:
+            children.append((DFSedge(
+                maxtoc, to,
+                (VACANT_VERTEX_LABEL, elb, VACANT_VERTEX_LABEL)),
+                backward_root[(to, elb)]))
+        # forward
+        # No need to check if num_vertices >= self._max_num_vertices.
+        # Because forward_root has no element.
+        for frm, elb, vlb2 in forward_root:
+            children.append((DFSedge(
+                frm, maxtoc + 1,
+                (VACANT_VERTEX_LABEL, elb, vlb2)),
+                forward_root[(frm, elb, vlb2)]))
+        if constraints is not None:
+            children = constraints.filter_children(self._DFScode, children)
+
+        return children
+
+    def _extend_projections(self, projected):
+        """Group the one-edge extensions of `projected` by DFS edge."""
+        num_vertices = self._get_num_vertices()
+        rmpath = self._DFScode.rmpath
+        maxtoc = self._DFScode[rmpath[0]].to
         min_vlb = self._DFScode[0].vevlb[0]
 
+        db = self._db
+        vlb, adj_to, adj_elb = db.vlb, db.adj_to, db.adj_elb
         forward_root = collections.defaultdict(Projected)
         backward_root = collections.defaultdict(Projected)
         for p in projected:
-            g = self.graphs[p.gid]
-            history = History(g, p)
             # backward
             for rmpath_i in rmpath[::-1]:
-                e = self._get_backward_edge(g,
-                                            history.edges[rmpath_i],
-                                            history.edges[rmpath[0]],
-                                            history)
+                e = self._get_backward_edge(db,
+                                            p.edges[rmpath_i],
+                                            p.edges[rmpath[0]],
+                                            p)
                 if e is not None:
                     backward_root[
-                        (self._DFScode[rmpath_i].frm, e.elb)
-                    ].append(PDFS(g.gid, e, p))
+                        (self._DFScode[rmpath_i].frm, adj_elb[e])
+                    ].append(PDFS(p.gid, e, p, db))
             # pure forward
             if num_vertices >= self._max_num_vertices:
                 continue
-            edges = self._get_forward_pure_edges(g,
-                                                 history.edges[rmpath[0]],
+            edges = self._get_forward_pure_edges(db,
+                                                 p.edges[rmpath[0]],
                                                  min_vlb,
-                                                 history)
+                                                 p)
             for e in edges:
                 forward_root[
-                    (maxtoc, e.elb, g.vertices[e.to].vlb)
-                ].append(PDFS(g.gid, e, p))
+                    (maxtoc, adj_elb[e], vlb[adj_to[e]])
+                ].append(PDFS(p.gid, e, p, db))
             # rmpath forward
             for rmpath_i in rmpath:
-                edges = self._get_forward_rmpath_edges(g,
-                                                       history.edges[rmpath_i],
+                edges = self._get_forward_rmpath_edges(db,
+                                                       p.edges[rmpath_i],
                                                        min_vlb,
-                                                       history)
+                                                       p)
                 for e in edges:
                     forward_root[
                         (self._DFScode[rmpath_i].frm,
-                         e.elb, g.vertices[e.to].vlb)
-                    ].append(PDFS(g.gid, e, p))
-
-        # backward
-        for to, elb in backward_root:
-            self._DFScode.append(DFSedge(
-                maxtoc, to,
-                (VACANT_VERTEX_LABEL, elb, VACANT_VERTEX_LABEL))
-            )
-            self._subgraph_mining(backward_root[(to, elb)])
-            self._DFScode.pop()
-        # forward
-        # No need to check if num_vertices >= self._max_num_vertices.
-        # Because forward_root has no element.
-        for frm, elb, vlb2 in forward_root:
-            self._DFScode.append(DFSedge(
-                frm, maxtoc + 1,
-                (VACANT_VERTEX_LABEL, elb, vlb2))
-            )
-            self._subgraph_mining(forward_root[(frm, elb, vlb2)])
-            self._DFScode.pop()
-
-        return self
+                         adj_elb[e], vlb[adj_to[e]])
+                    ].append(PDFS(p.gid, e, p, db))
+        return backward_root, forward_root
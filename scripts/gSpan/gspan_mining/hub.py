@@ -0,0 +1,96 @@
+"""Mining with the hub vertex of every graph factored out."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from .graph import AUTO_EDGE_ID
+from .graph import Graph
+
+
+class HubAnchor(object):
+    """Hub vertex left out while mining and re-attached when reporting.
+
+    In news graphs vertex 0 is the News root, labelled `vlb`, with a
+    CONTAINS edge, labelled `elb`, to every word. Through it every pair of
+    words is connected and every pattern has many more embeddings. Mining
+    without hub vertices and adding the hub with an edge to each pattern
+    vertex whose label always has one keeps the supports: such a pattern
+    occurs in a graph exactly when the pattern without the hub does.
+
+    Reported subgraphs carry the hub as vertex 0, as in the database. The
+    DFS codes passed to report sinks and recorded by a PatternLattice are
+    those of the patterns without the hub.
+    """
+
+    def __init__(self, vlb='10', elb='1'):
+        """Initialize HubAnchor instance.
+
+        Args:
+            vlb: label of hub vertices, News in news graphs.
+            elb: label of the edges from the hub, CONTAINS in news graphs.
+        """
+        self.vlb = vlb
+        self.elb = elb
+        self.attached_vlbs = frozenset()
+        self.attached_names = frozenset()
+        self._vlb = -1
+
+    def bind(self, db):
+        """Find the vertex labels that are always attached to a hub."""
+        self._vlb = db.vlb_table.codes.get(self.vlb, -1)
+        elb = db.elb_table.codes.get(self.elb, -1)
+        vlb = db.array('vlb')
+        adj_frm, adj_to = db.array('adj_frm'), db.array('adj_to')
+        hub_slots = (vlb[adj_frm] == self._vlb) & (db.array('adj_elb') == elb)
+        attached = np.zeros(db.num_vertices, dtype=bool)
+        attached[adj_to[hub_slots]] = True
+        nvlb = len(db.vlb_table)
+        totals = np.bincount(vlb, minlength=nvlb)
+        attached_totals = np.bincount(vlb[attached], minlength=nvlb)
+        codes = np.nonzero((totals > 0) & (attached_totals == totals))[0]
+        self.attached_vlbs = frozenset(
+            code for code in codes.tolist() if code != self._vlb)
+        self.attached_names = frozenset(
+            db.vlb_table.decode(code) for code in self.attached_vlbs)
+        return self
+
+    def masks(self, db):
+        """Return the vertex and edge masks of the mining database.
+
+        Hub vertices are dropped, and so are self-loops: the embedding of
+        an edge at a self-loop maps both of its ends to one vertex, which
+        the re-attached hub would connect twice.
+        """
+        vertex_mask = db.array('vlb') != self._vlb
+        edge_mask = db.array('adj_frm') != db.array('adj_to')
+        return vertex_mask, edge_mask
+
+    def attach(self, g):
+        """Return `g` with the hub added as vertex 0, if it attaches."""
+        attached = [vid for vid, v in g.vertices.items()
+                    if v.vlb in self.attached_names]
+        if not attached:
+            return g
+        h = Graph(g.gid, is_undirected=g.is_undirected,
+                  eid_auto_increment=True)
+        h.add_vertex(0, self.vlb)
+        for vid, v in g.vertices.items():
+            h.add_vertex(vid + 1, v.vlb)
+        for vid in attached:
+            h.add_edge(AUTO_EDGE_ID, 0, vid + 1, self.elb)
+        for vid, v in g.vertices.items():
+            for to, e in v.edges.items():
+                if g.is_undirected and to < vid:
+                    continue
+                h.add_edge(AUTO_EDGE_ID, vid + 1, to + 1, e.elb)
+        return h
+
+    def num_vertices(self, dfscode):
+        """Return number of vertices of a pattern once the hub attaches."""
+        for dfsedge in dfscode:
+            vlb1, _, vlb2 = dfsedge.vevlb
+            if vlb1 in self.attached_vlbs or vlb2 in self.attached_vlbs:
+                return dfscode.get_num_vertices() + 1
+        return dfscode.get_num_vertices()
@@ -0,0 +1,256 @@
+"""Keep the frequent patterns of a sliding window of graphs up to date."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+
+from .database import GraphDatabase
+from .graph import VACANT_VERTEX_LABEL
+from .gspan import DFScode
+from .gspan import gSpan
+from .partition import _decode_code
+from .sweep import PatternLattice
+
+
+class DeltaFilter(object):
+    """Limits a gSpan run to the patterns occurring in some graphs.
+
+    Used in the constraints interface. A pattern occurring in none of the
+    `touched` graphs keeps its support when graphs are added, and so do
+    all patterns grown from it, so those branches are not explored. The
+    patterns that do occur in one only use labels and edge label triples
+    of the touched graphs, so other vertices and edges are dropped.
+    """
+
+    def __init__(self, touched):
+        """Initialize DeltaFilter instance.
+
+        Args:
+            touched: positions of the added graphs in the mined database.
+        """
+        self.touched = frozenset(touched)
+
+    def bind(self, vlb_table, elb_table):
+        """Nothing to intern, positions do not depend on labels."""
+        return self
+
+    def signature(self):
+        """Describe the filter, e.g. to match checkpoints."""
+        return tuple(sorted(self.touched))
+
+    def masks(self, db):
+        """Return the vertex and edge masks of what touched graphs use."""
+        touched = np.zeros(len(db), dtype=bool)
+        touched[np.array(sorted(self.touched), dtype=np.int64)] = True
+        vlb = db.array('vlb')
+        vertex_mask = np.isin(vlb, vlb[touched[db.vertex_gids()]])
+        triples = db.edge_triples()
+        edge_mask = np.isin(triples, triples[touched[db.edge_gids()]])
+        return vertex_mask, edge_mask
+
+    def accepts_vlb(self, vlb):
+        """Report every frequent vertex label."""
+        return True
+
+    def accepts(self, dfscode):
+        """Report every pattern that is searched."""
+        return True
+
+    def filter_children(self, dfscode, children):
+        """Keep the (dfsedge, projected) extensions in a touched graph."""
+        touched = self.touched
+        return [
+            (dfsedge, projected) for dfsedge, projected in children
+            if any(pdfs.gid in touched for pdfs in projected)
+        ]
+
+
+def _encode_vacant(code, vacant=VACANT_VERTEX_LABEL):
+    """Return a decoded code with vacant labels replaced by `vacant`."""
+    return tuple(
+        (frm, to, vacant if vlb1 is None else vlb1, elb,
+         vacant if vlb2 is None else vlb2)
+        for frm, to, vlb1, elb, vlb2 in code)
+
+
+class SlidingWindowMiner(object):
+    """Frequent patterns of a window of graphs that grows and expires.
+
+    update() adds and removes graphs and updates supports and `where`,
+    which hold graph ids, not positions, as the window moves:
+
+    - Removed graphs are taken out of the `where` of the patterns they
+      support; supports only drop, so nothing has to be searched.
+    - Added graphs are mined together with the rest of the window by a
+      gSpan run limited by a DeltaFilter to the branches of patterns
+      occurring in an added graph; only those can gain support.
+
+    Patterns are keyed by DFS code with decoded labels, see
+    registry.canonical_code(); vertex labels by (vlb,). Supports of vertex
+    labels are counted, not searched. Both do not depend on the labels
+    the window holds at the time.
+    """
+
+    def __init__(self, min_support, max_num_vertices=float('inf'),
+                 is_undirected=True, prune_infrequent=True, hub=None,
+                 workers=1):
+        """Initialize SlidingWindowMiner instance.
+
+        Args:
+            min_support: min support in the window.
+            max_num_vertices: upper bound of number of vertices of the
+                patterns, counting the re-attached hub.
+            is_undirected: whether the graphs are undirected.
+            prune_infrequent: see gSpan.
+            hub: hub.HubAnchor to mine without hub vertices, see gSpan.
+            workers: number of processes of each gSpan run.
+        """
+        self.min_support = min_support
+        self.max_num_vertices = max_num_vertices
+        self.is_undirected = is_undirected
+        self.prune_infrequent = prune_infrequent
+        self.hub = hub
+        self.workers = workers
+        self.window = GraphDatabase.concatenate([], is_undirected)
+        self.size1 = dict()
+        self.support_where = dict()
+        self._codes_of = collections.defaultdict(set)
+
+    def __len__(self):
+        """Return number of frequent patterns with at least one edge."""
+        return len(self.support_where)
+
+    def _set_where(self, code, where):
+        for gid in self.support_where.get(code, ()):
+            self._codes_of[gid].discard(code)
+        if where is None:
+            self.support_where.pop(code, None)
+            return
+        self.support_where[code] = where
+        for gid in where:
+            self._codes_of[gid].add(code)
+
+    def _remove(self, removed):
+        """Take graph ids `removed` out of the window and the patterns."""
+        removed = set(removed)
+        graph_ids = self.window.graph_ids
+        keep = ~np.isin(graph_ids, np.array(sorted(removed), dtype=np.int64))
+        if keep.all():
+            return set()
+        # Keep the window in order by selecting runs of kept graphs.
+        bounds = np.flatnonzero(np.diff(np.concatenate(
+            ([False], keep, [False])).astype(np.int8)))
+        self.window = GraphDatabase.concatenate(
+            [self.window.select(start, stop - start)
+             for start, stop in zip(bounds[::2], bounds[1::2])],
+            self.is_undirected)
+        changed = set()
+        for gid in removed:
+            changed.update(self._codes_of.pop(gid, ()))
+        for code in changed:
+            where = self.support_where[code] - removed
+            self._set_where(code, where)
+        return changed
+
+    def _add(self, added):
+        """Append `added` to the window and mine what it touches."""
+        start = len(self.window)
+        self.window = GraphDatabase.concatenate([self.window, added],
+                                                self.is_undirected)
+        lattice = PatternLattice(self.min_support, self.max_num_vertices,
+                                 is_undirected=self.is_undirected)
+        gs = gSpan(
+            database_file_name=self.window,
+            min_support=self.min_support,
+            max_num_vertices=self.max_num_vertices,
+            is_undirected=self.is_undirected,
+            quiet=True,
+            prune_infrequent=self.prune_infrequent,
+            lattice=lattice,
+            constraints=DeltaFilter(range(start, len(self.window))),
+            hub=self.hub,
+            workers=self.workers,
+        )
+        gs.run()
+        graph_ids = self.window.graph_ids
+        changed, new = set(), set()
+        for code, where in zip(lattice.codes, lattice.wheres):
+            code = _decode_code(code, lattice.vlb_table, lattice.elb_table)
+            where = set(graph_ids[sorted(where)].tolist())
+            if code not in self.support_where:
+                new.add(code)
+            if where != self.support_where.get(code):
+                self._set_where(code, where)
+                changed.add(code)
+        return changed, new
+
+    def _count_size1(self):
+        db = self.window
+        if not len(db):
+            return dict()
+        vlbs, counts = db.graph_support(db.array('vlb'), db.vertex_gids())
+        return {(db.vlb_table.decode(vlb),): count
+                for vlb, count in zip(vlbs.tolist(), counts.tolist())}
+
+    def update(self, added=None, removed=()):
+        """Add and remove graphs, and update the frequent patterns.
+
+        Args:
+            added: GraphDatabase of the new graphs, with graph ids, e.g.
+                read with GraphDatabase.from_file(start_gid=...).
+            removed: ids of the graphs leaving the window.
+
+        Returns:
+            (newly_frequent, newly_infrequent), dicts of pattern code to
+            its support in the window.
+        """
+        if added is not None and len(added) and added.graph_ids is None:
+            raise ValueError('Added graphs need graph ids.')
+        changed, new = set(), set()
+        if len(removed) and len(self.window):
+            changed |= self._remove(removed)
+        if added is not None and len(added):
+            added_changed, new = self._add(added)
+            changed |= added_changed
+        newly_frequent, newly_infrequent = dict(), dict()
+        for code in changed:
+            support = len(self.support_where[code])
+            if code in new:
+                newly_frequent[code] = support
+            elif support < self.min_support:
+                self._set_where(code, None)
+                newly_infrequent[code] = support
+        counts = self._count_size1()
+        size1 = {code: support for code, support in counts.items()
+                 if support >= self.min_support}
+        for code, support in size1.items():
+            if code not in self.size1:
+                newly_frequent[code] = support
+        for code in self.size1:
+            if code not in size1:
+                newly_infrequent[code] = counts.get(code, 0)
+        self.size1 = size1
+        return newly_frequent, newly_infrequent
+
+    def query(self):
+        """Return the patterns of the window as gSpan would report them.
+
+        Returns:
+            (subgraphs, support_where), numbered in DFS code order, with
+            graph ids in `support_where`.
+        """
+        subgraphs, support_where = dict(), dict()
+        # Vacant labels sort first, as VACANT_VERTEX_LABEL does.
+        codes = sorted(self.support_where,
+                       key=lambda code: _encode_vacant(code, ''))
+        for gid, code in enumerate(codes):
+            g = DFScode.from_tuple(_encode_vacant(code)).to_graph(
+                gid=gid, is_undirected=self.is_undirected)
+            if self.hub is not None:
+                g = self.hub.attach(g)
+            subgraphs[gid] = g
+            support_where[gid] = set(self.support_where[code])
+        return subgraphs, support_where
@@ -7,8 +7,16 @@ from __future__ import print_function
 import os
 import sys
 
+from .autotune import choose_support
 from .config import parser
+from .constraints import PatternConstraints
+from .database import gids_of_dates
 from .gspan import gSpan
+from .hub import HubAnchor
+from .report import make_sink
+from .sampling import mine_candidates
+from .stats import MiningStats
+from .sweep import PatternLattice
 
 
 def main(FLAGS=None):
@@ -21,20 +29,104 @@ def main(FLAGS=None):
         print('{} does not exist.'.format(FLAGS.database_file_name))
         sys.exit()
 
+    if FLAGS.date_range is not None:
+        if FLAGS.dates_file is None:
+            print('--date_range needs --dates_file.')
+            sys.exit()
+        first, last = FLAGS.date_range.split(':')
+        FLAGS.start_gid, FLAGS.num_graphs = gids_of_dates(FLAGS.dates_file,
+                                                          first, last)
+
+    lattice = None
+    if FLAGS.lattice_file is not None:
+        lattice = PatternLattice(FLAGS.min_support,
+                                 FLAGS.upper_bound_of_num_vertices,
+                                 is_undirected=(not FLAGS.directed))
+
+    constraints = None
+    if (FLAGS.required_vlbs is not None or FLAGS.allowed_elbs is not None or
+            FLAGS.max_fanout is not None):
+        constraints = PatternConstraints(
+            required_vlbs=(None if FLAGS.required_vlbs is None
+                           else FLAGS.required_vlbs.split(',')),
+            allowed_elbs=(None if FLAGS.allowed_elbs is None
+                          else FLAGS.allowed_elbs.split(',')),
+            max_fanout=FLAGS.max_fanout,
+            fanout_elb=FLAGS.fanout_elb)
+
+    hub = None
+    if FLAGS.hub_vlb is not None:
+        hub = HubAnchor(FLAGS.hub_vlb, FLAGS.hub_elb)
+
+    if FLAGS.auto_support:
+        if FLAGS.max_patterns is None and FLAGS.time_budget is None:
+            print('--auto_support needs --max_patterns or --time_budget.')
+            sys.exit()
+        FLAGS.min_support = choose_support(
+            FLAGS.database_file_name,
+            max_patterns=FLAGS.max_patterns,
+            time_budget=FLAGS.time_budget,
+            sample_size=FLAGS.tune_sample_size,
+            seed=FLAGS.sample_seed,
+            is_undirected=(not FLAGS.directed),
+            max_num_vertices=FLAGS.upper_bound_of_num_vertices,
+            max_ngraphs=FLAGS.num_graphs,
+            start_gid=FLAGS.start_gid,
+            hub=hub)
+        if lattice is not None:
+            lattice.min_support = FLAGS.min_support
+
+    if FLAGS.sample_size is not None:
+        if constraints is not None:
+            print('--sample_size can not be combined with constraints.')
+            sys.exit()
+        constraints = mine_candidates(
+            FLAGS.database_file_name, FLAGS.min_support, FLAGS.sample_size,
+            delta=FLAGS.sample_delta,
+            seed=FLAGS.sample_seed,
+            is_undirected=(not FLAGS.directed),
+            max_num_vertices=FLAGS.upper_bound_of_num_vertices,
+            max_ngraphs=FLAGS.num_graphs,
+            start_gid=FLAGS.start_gid,
+            hub=hub)
+
+    stats = None
+    if FLAGS.stats_file is not None:
+        stats = MiningStats()
+
     gs = gSpan(
         database_file_name=FLAGS.database_file_name,
         min_support=FLAGS.min_support,
         min_num_vertices=FLAGS.lower_bound_of_num_vertices,
         max_num_vertices=FLAGS.upper_bound_of_num_vertices,
         max_ngraphs=FLAGS.num_graphs,
+        start_gid=FLAGS.start_gid,
+        constraints=constraints,
+        hub=hub,
         is_undirected=(not FLAGS.directed),
         verbose=FLAGS.verbose,
         visualize=FLAGS.plot,
-        where=FLAGS.where
+        where=FLAGS.where,
+        workers=FLAGS.workers,
+        report_sink=make_sink(FLAGS.report, FLAGS.report_file),
+        quiet=FLAGS.quiet,
+        canonical_cache_size=FLAGS.canonical_cache_size,
+        prune_infrequent=FLAGS.prune_infrequent,
+        lattice=lattice,
+        pattern_type=FLAGS.pattern_type,
+        checkpoint_file=FLAGS.checkpoint_file,
+        checkpoint_interval=FLAGS.checkpoint_interval,
+        stats=stats,
+        max_patterns=FLAGS.max_patterns,
+        time_budget=FLAGS.time_budget
     )
 
     gs.run()
     gs.time_stats()
+    if lattice is not None:
+        lattice.save(FLAGS.lattice_file)
+    if stats is not None:
+        stats.dump(FLAGS.stats_file)
     return gs
 
 
@@ -0,0 +1,537 @@
+"""Mine a database in shards and merge the shards' patterns."""
+# -*- coding=utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import pickle
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from .atomic import atomic_open
+from .atomic import dump_pickle
+from .config import str2bool
+from .database import GraphDatabase
+from .database import LabelTable
+from .graph import VACANT_VERTEX_LABEL
+from .gspan import DFScode
+from .gspan import gSpan
+from .hub import HubAnchor
+from .sweep import PatternLattice
+
+
+PLAN_FILE = 'plan.json'
+PLAN_VERSION = 1
+
+
+def local_support(min_support, shard_size, num_graphs):
+    """Return the support a shard of `shard_size` graphs is mined at.
+
+    A pattern below floor(min_support * shard_size / num_graphs) in every
+    shard has a total support of less than min_support, so every frequent
+    pattern is found in at least one shard.
+    """
+    if not num_graphs:
+        return 1
+    return max(1, int(math.floor(min_support * shard_size / num_graphs)))
+
+
+def _load(file_name):
+    with open(file_name, 'rb') as f:
+        return pickle.load(f)
+
+
+def _decode_code(code, vlb_table, elb_table):
+    """Return a DFScode.to_tuple() with labels decoded, vacant ones None."""
+    return tuple(
+        (frm, to,
+         None if vlb1 == VACANT_VERTEX_LABEL else vlb_table.decode(vlb1),
+         elb_table.decode(elb),
+         None if vlb2 == VACANT_VERTEX_LABEL else vlb_table.decode(vlb2))
+        for frm, to, vlb1, elb, vlb2 in code)
+
+
+def _encode_code(code, vlb_table, elb_table):
+    """Inverse of _decode_code(); None if a label is not in the tables."""
+    vlbs, elbs = vlb_table.codes, elb_table.codes
+    encoded = list()
+    for frm, to, vlb1, elb, vlb2 in code:
+        if (elb not in elbs or (vlb1 is not None and vlb1 not in vlbs) or
+                (vlb2 is not None and vlb2 not in vlbs)):
+            return None
+        encoded.append((
+            frm, to,
+            VACANT_VERTEX_LABEL if vlb1 is None else vlbs[vlb1],
+            elbs[elb],
+            VACANT_VERTEX_LABEL if vlb2 is None else vlbs[vlb2]))
+    return tuple(encoded)
+
+
+class CandidateSet(object):
+    """Candidate patterns counted in a shard, in the constraints interface.
+
+    Pass an instance as `constraints` to a gSpan run at support 1: only the
+    candidates are reported and grown, and vertices and edges no candidate
+    uses are dropped from the mining database. The candidates of a
+    partitioned run are closed under DFS code prefixes, as the patterns of
+    every shard are, so the search reaches each of them.
+    """
+
+    def __init__(self, codes, vlbs):
+        """Initialize CandidateSet instance.
+
+        Args:
+            codes: candidate DFS codes with decoded labels.
+            vlbs: candidate vertex labels, the one-vertex patterns.
+        """
+        self.codes = frozenset(codes)
+        self.vlbs = frozenset(vlbs)
+        self._codes = frozenset()
+        self._vlbs = frozenset()
+        self._vlb_array = None
+        self._triples = None
+
+    @classmethod
+    def from_lattice(cls, lattice):
+        """Build the candidates of the patterns recorded by `lattice`."""
+        vlb_table, elb_table = lattice.vlb_table, lattice.elb_table
+        return cls((_decode_code(code, vlb_table, elb_table)
+                    for code in lattice.codes),
+                   (vlb_table.decode(vlb) for vlb, _ in lattice.size1))
+
+    def bind(self, vlb_table, elb_table):
+        """Intern the candidates through the database tables."""
+        nvlb, nelb = len(vlb_table), len(elb_table)
+        codes, vlbs, triples = set(), set(), set()
+        for code in self.codes:
+            encoded = _encode_code(code, vlb_table, elb_table)
+            if encoded is None:
+                continue
+            codes.add(encoded)
+            labels = dict()
+            for frm, to, vlb1, elb, vlb2 in encoded:
+                if vlb1 != VACANT_VERTEX_LABEL:
+                    labels[frm] = vlb1
+                if vlb2 != VACANT_VERTEX_LABEL:
+                    labels[to] = vlb2
+            vlbs.update(labels.values())
+            for frm, to, _, elb, _ in encoded:
+                # Both ends, as adjacency slots of directed edges are
+                # stored once, and in undirected databases vlb1 <= vlb2.
+                vlb1, vlb2 = labels[frm], labels[to]
+                triples.add((vlb1 * nelb + elb) * nvlb + vlb2)
+                triples.add((vlb2 * nelb + elb) * nvlb + vlb1)
+        self._codes = frozenset(codes)
+        self._vlbs = frozenset(vlb_table.codes[vlb] for vlb in self.vlbs
+                               if vlb in vlb_table.codes)
+        self._vlb_array = np.array(sorted(vlbs | self._vlbs), dtype=np.int64)
+        self._triples = np.array(sorted(triples), dtype=np.int64)
+        return self
+
+    def signature(self):
+        """Describe the candidates, e.g. to match checkpoints."""
+        digest = hashlib.sha1(repr((sorted(self.codes, key=repr),
+                                    sorted(self.vlbs))).encode('utf-8'))
+        return digest.hexdigest()
+
+    def masks(self, db):
+        """Return the vertex and edge masks of what candidates use."""
+        vertex_mask = np.isin(db.array('vlb'), self._vlb_array)
+        edge_mask = np.isin(db.edge_triples(), self._triples)
+        return vertex_mask, edge_mask
+
+    def accepts_vlb(self, vlb):
+        """Check if the one-vertex pattern of label `vlb` is a candidate."""
+        return vlb in self._vlbs
+
+    def accepts(self, dfscode):
+        """Check if the pattern of `dfscode` is a candidate."""
+        return dfscode.to_tuple() in self._codes
+
+    def filter_children(self, dfscode, children):
+        """Keep the (dfsedge, projected) extensions to candidates."""
+        prefix = dfscode.to_tuple()
+        return [
+            (dfsedge, projected) for dfsedge, projected in children
+            if prefix + ((dfsedge.frm, dfsedge.to) + dfsedge.vevlb,)
+            in self._codes
+        ]
+
+
+def plan_partitions(database_file_name, shared_dir, min_support,
+                    num_shards, is_undirected=True,
+                    max_num_vertices=float('inf'), prune_infrequent=True,
+                    hub_vlb=None, hub_elb='1'):
+    """Split a database into shards and write the plan to `shared_dir`.
+
+    Shards are consecutive windows of about the same number of graphs,
+    each mined at its local_support().
+
+    Returns:
+        the plan, as written to PLAN_FILE.
+    """
+    gids = GraphDatabase.read_graph_ids(database_file_name)
+    num_graphs = len(gids)
+    num_shards = max(1, min(num_shards, num_graphs))
+    bounds = [num_graphs * i // num_shards for i in range(num_shards + 1)]
+    shards = list()
+    for i in range(num_shards):
+        start, stop = bounds[i], bounds[i + 1]
+        shards.append({
+            'start': start,
+            'start_gid': int(gids[start]) if start < num_graphs else None,
+            'count': stop - start,
+            'min_support': local_support(min_support, stop - start,
+                                         num_graphs),
+        })
+    plan = {
+        'version': PLAN_VERSION,
+        'database_file_name': os.path.abspath(database_file_name),
+        'num_graphs': num_graphs,
+        'min_support': min_support,
+        'is_undirected': is_undirected,
+        'max_num_vertices': (None if max_num_vertices == float('inf')
+                             else max_num_vertices),
+        'prune_infrequent': prune_infrequent,
+        'hub_vlb': hub_vlb,
+        'hub_elb': hub_elb,
+        'shards': shards,
+    }
+    if not os.path.exists(shared_dir):
+        os.makedirs(shared_dir)
+    with atomic_open(os.path.join(shared_dir, PLAN_FILE), 'w') as f:
+        json.dump(plan, f, indent=2, sort_keys=True)
+    return plan
+
+
+def load_plan(shared_dir):
+    """Load the plan written by plan_partitions()."""
+    with open(os.path.join(shared_dir, PLAN_FILE)) as f:
+        plan = json.load(f)
+    if plan.get('version') != PLAN_VERSION:
+        raise ValueError('{} has version {}, expected {}.'.format(
+            PLAN_FILE, plan.get('version'), PLAN_VERSION))
+    return plan
+
+
+def _shard_file(shared_dir, phase, shard):
+    return os.path.join(shared_dir, '{}-{}.pkl'.format(phase, shard))
+
+
+def _mine(plan, shard, min_support, constraints=None):
+    """Mine one shard of the plan into a PatternLattice."""
+    info = plan['shards'][shard]
+    max_num_vertices = plan['max_num_vertices']
+    if max_num_vertices is None:
+        max_num_vertices = float('inf')
+    hub = None
+    if plan['hub_vlb'] is not None:
+        hub = HubAnchor(plan['hub_vlb'], plan['hub_elb'])
+    lattice = PatternLattice(min_support, max_num_vertices,
+                             is_undirected=plan['is_undirected'])
+    gs = gSpan(
+        database_file_name=plan['database_file_name'],
+        min_support=min_support,
+        max_num_vertices=max_num_vertices,
+        max_ngraphs=info['count'],
+        start_gid=info['start_gid'],
+        is_undirected=plan['is_undirected'],
+        quiet=True,
+        prune_infrequent=plan['prune_infrequent'],
+        lattice=lattice,
+        constraints=constraints,
+        hub=hub,
+    )
+    if info['count']:
+        gs.run()
+    else:
+        lattice.open(LabelTable(), LabelTable(), hub=hub)
+    return lattice
+
+
+def mine_shard(shared_dir, shard):
+    """Find the locally frequent patterns of one shard.
+
+    The candidates are written to `shared_dir` for verify_shard().
+    """
+    plan = load_plan(shared_dir)
+    info = plan['shards'][shard]
+    lattice = _mine(plan, shard, info['min_support'])
+    candidate_set = CandidateSet.from_lattice(lattice)
+    candidates = {'size1': set(candidate_set.vlbs),
+                  'codes': set(candidate_set.codes)}
+    dump_pickle(candidates, _shard_file(shared_dir, 'candidates', shard))
+    return candidates
+
+
+def _load_shards(shared_dir, plan, phase):
+    """Load the files of `phase` written by every shard."""
+    results = list()
+    for shard in range(len(plan['shards'])):
+        file_name = _shard_file(shared_dir, phase, shard)
+        if not os.path.exists(file_name):
+            raise ValueError('Shard {} has no {} in {}.'.format(
+                shard, phase, shared_dir))
+        results.append(_load(file_name))
+    return results
+
+
+def verify_shard(shared_dir, shard):
+    """Count the supports of the candidates of all shards in one shard.
+
+    Needs the candidates of every shard; the counts are written to
+    `shared_dir` for merge_shards().
+    """
+    plan = load_plan(shared_dir)
+    codes, size1 = set(), set()
+    for candidates in _load_shards(shared_dir, plan, 'candidates'):
+        codes.update(candidates['codes'])
+        size1.update(candidates['size1'])
+    lattice = _mine(plan, shard, 1, constraints=CandidateSet(codes, size1))
+    vlb_table, elb_table = lattice.vlb_table, lattice.elb_table
+    start = plan['shards'][shard]['start']
+    counts = {
+        'size1': {vlb_table.decode(vlb): support
+                  for vlb, support in lattice.size1},
+        'codes': {
+            _decode_code(code, vlb_table, elb_table):
+            (support, [start + gid for gid in sorted(where)])
+            for code, support, where in zip(lattice.codes, lattice.supports,
+                                            lattice.wheres)
+        },
+        'vlbs': list(vlb_table.names),
+        'attached': (None if lattice.hub is None
+                     else sorted(lattice.hub.attached_names)),
+    }
+    dump_pickle(counts, _shard_file(shared_dir, 'counts', shard))
+    return counts
+
+
+def merge_shards(shared_dir, lattice_file=None):
+    """Sum the counts of every shard into the patterns of the database.
+
+    Returns:
+        PatternLattice of the patterns frequent in the whole database, as
+        recorded by an unpartitioned run but in DFS code order; saved to
+        `lattice_file` if given.
+    """
+    plan = load_plan(shared_dir)
+    shard_counts = _load_shards(shared_dir, plan, 'counts')
+    size1, codes = dict(), dict()
+    vlbs, elbs = set(), set()
+    for counts in shard_counts:
+        vlbs.update(counts['vlbs'])
+        for vlb, support in counts['size1'].items():
+            size1[vlb] = size1.get(vlb, 0) + support
+        for code, (support, where) in counts['codes'].items():
+            total = codes.setdefault(code, [0, list()])
+            total[0] += support
+            total[1].extend(where)
+            elbs.update(elb for _, _, _, elb, _ in code)
+    vlb_table = LabelTable.from_labels(vlbs)
+    elb_table = LabelTable.from_labels(elbs)
+    hub = None
+    if plan['hub_vlb'] is not None:
+        # A label attaches if it does in every shard it occurs in.
+        hub = HubAnchor(plan['hub_vlb'], plan['hub_elb'])
+        attached = set(vlbs)
+        for counts in shard_counts:
+            attached -= set(counts['vlbs']) - set(counts['attached'])
+        attached.discard(hub.vlb)
+        hub.attached_names = frozenset(attached)
+        hub.attached_vlbs = frozenset(vlb_table.encode(vlb)
+                                      for vlb in attached)
+    max_num_vertices = plan['max_num_vertices']
+    lattice = PatternLattice(
+        plan['min_support'],
+        float('inf') if max_num_vertices is None else max_num_vertices,
+        is_undirected=plan['is_undirected'])
+    lattice.open(vlb_table, elb_table, hub=hub)
+    min_support = plan['min_support']
+    for vlb in sorted(size1):
+        if size1[vlb] >= min_support:
+            lattice.add_size1(vlb_table.encode(vlb), size1[vlb])
+    frequent = list()
+    for code, (support, where) in codes.items():
+        if support >= min_support:
+            frequent.append((_encode_code(code, vlb_table, elb_table),
+                             support, where))
+    # Prefixes sort first, so every pattern follows the one it grew from.
+    for code, support, where in sorted(frequent):
+        dfscode = DFScode.from_tuple(code)
+        num_vertices = (dfscode.get_num_vertices() if hub is None
+                        else hub.num_vertices(dfscode))
+        lattice.add(code, support, num_vertices, where)
+    if lattice_file is not None:
+        lattice.save(lattice_file)
+    return lattice
+
+
+def _run_shard(args):
+    phase, shared_dir, shard = args
+    return (mine_shard if phase == 'mine' else verify_shard)(shared_dir,
+                                                             shard)
+
+
+def run_partitioned(database_file_name, shared_dir, min_support, num_shards,
+                    workers=1, lattice_file=None, **kwargs):
+    """Plan, mine, verify and merge on this machine with `workers`.
+
+    Extra keyword arguments are passed to plan_partitions().
+    """
+    plan = plan_partitions(database_file_name, shared_dir, min_support,
+                           num_shards, **kwargs)
+    shards = range(len(plan['shards']))
+    with Pool(max(workers, 1)) as pool:
+        pool.map(_run_shard, [('mine', shared_dir, i) for i in shards])
+        pool.map(_run_shard, [('verify', shared_dir, i) for i in shards])
+    return merge_shards(shared_dir, lattice_file=lattice_file)
+
+
+parser = argparse.ArgumentParser(
+    description='Mine a gSpan database in shards: plan the shards, mine '
+                'and verify each one, in any process or on any node '
+                'sharing the directory, then merge them.')
+parser.add_argument(
+    'command',
+    choices=('plan', 'mine', 'verify', 'merge', 'run'),
+    help='str, plan writes the plan, mine and verify process --shard once '
+         'the plan, respectively all candidates, are in the shared '
+         'directory, merge writes --lattice_file once all counts are, run '
+         'does all of it on this machine'
+)
+parser.add_argument(
+    'shared_dir',
+    type=str,
+    help='str, directory shared by the shards'
+)
+parser.add_argument(
+    'database_file_name',
+    type=str,
+    nargs='?',
+    default=None,
+    help='str, database file name, needed by plan and run'
+)
+parser.add_argument(
+    '-s', '--min_support',
+    type=int,
+    default=5000,
+    help='int, min support of the whole database, default 5000'
+)
+parser.add_argument(
+    '-k', '--num_shards',
+    type=int,
+    default=4,
+    help='int, number of shards, default 4'
+)
+parser.add_argument(
+    '-u', '--upper_bound_of_num_vertices',
+    type=float,
+    default=float('inf'),
+    help='int, upper bound of number of vertices of output subgraph, '
+         'default inf'
+)
+parser.add_argument(
+    '-d', '--directed',
+    type=str2bool,
+    default=False,
+    help='run for directed graphs, default off, i.e. undirected graphs'
+)
+parser.add_argument(
+    '--prune_infrequent',
+    type=str2bool,
+    default=True,
+    help='bool, drop infrequent vertices and edges before mining, '
+         'default on'
+)
+parser.add_argument(
+    '--hub_vlb',
+    type=str,
+    default=None,
+    help='str, label of hub vertices left out while mining, default none'
+)
+parser.add_argument(
+    '--hub_elb',
+    type=str,
+    default='1',
+    help='str, label of the edges from --hub_vlb vertices, default 1'
+)
+parser.add_argument(
+    '--shard',
+    type=int,
+    default=None,
+    help='int, shard to mine or verify'
+)
+parser.add_argument(
+    '--workers',
+    type=int,
+    default=1,
+    help='int, number of processes of run, default 1'
+)
+parser.add_argument(
+    '--lattice_file',
+    type=str,
+    default=None,
+    help='str, pickle file to save the merged PatternLattice to, '
+         'default <shared_dir>/lattice.pkl'
+)
+
+
+def main(FLAGS=None):
+    """Run one step of a partitioned run."""
+    if FLAGS is None:
+        FLAGS = parser.parse_args(args=sys.argv[1:])
+    lattice_file = FLAGS.lattice_file
+    if lattice_file is None:
+        lattice_file = os.path.join(FLAGS.shared_dir, 'lattice.pkl')
+    plan_kwargs = dict(
+        is_undirected=(not FLAGS.directed),
+        max_num_vertices=FLAGS.upper_bound_of_num_vertices,
+        prune_infrequent=FLAGS.prune_infrequent,
+        hub_vlb=FLAGS.hub_vlb,
+        hub_elb=FLAGS.hub_elb)
+    start = time.time()
+    if FLAGS.command in ('plan', 'run') and FLAGS.database_file_name is None:
+        parser.error('{} needs database_file_name'.format(FLAGS.command))
+    if FLAGS.command in ('mine', 'verify') and FLAGS.shard is None:
+        parser.error('{} needs --shard'.format(FLAGS.command))
+    if FLAGS.command == 'plan':
+        plan = plan_partitions(FLAGS.database_file_name, FLAGS.shared_dir,
+                               FLAGS.min_support, FLAGS.num_shards,
+                               **plan_kwargs)
+        for i, info in enumerate(plan['shards']):
+            print('Shard {}: {} graphs from id {} at support {}'.format(
+                i, info['count'], info['start_gid'], info['min_support']))
+        return plan
+    if FLAGS.command == 'mine':
+        result = mine_shard(FLAGS.shared_dir, FLAGS.shard)
+        print('Shard {}: {} candidates in {} s'.format(
+            FLAGS.shard, len(result['codes']), round(time.time() - start, 2)))
+        return result
+    if FLAGS.command == 'verify':
+        result = verify_shard(FLAGS.shared_dir, FLAGS.shard)
+        print('Shard {}: {} candidates counted in {} s'.format(
+            FLAGS.shard, len(result['codes']), round(time.time() - start, 2)))
+        return result
+    if FLAGS.command == 'merge':
+        lattice = merge_shards(FLAGS.shared_dir, lattice_file=lattice_file)
+    else:
+        lattice = run_partitioned(FLAGS.database_file_name, FLAGS.shared_dir,
+                                  FLAGS.min_support, FLAGS.num_shards,
+                                  workers=FLAGS.workers,
+                                  lattice_file=lattice_file, **plan_kwargs)
+    print('{} frequent patterns in {}, {} s'.format(
+        len(lattice), lattice_file, round(time.time() - start, 2)))
+    return lattice
+
+
+if __name__ == '__main__':
+    main()
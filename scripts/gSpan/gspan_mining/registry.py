@@ -0,0 +1,134 @@
+"""Stable global ids of patterns, shared by runs on any database."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import contextlib
+import fcntl
+import os
+import pickle
+
+from .atomic import dump_pickle
+from .database import GraphDatabase
+from .database import LabelTable
+from .database import build_csr
+from .graph import VACANT_VERTEX_LABEL
+from .gspan import gSpan
+
+
+REGISTRY_VERSION = 1
+
+
+def canonical_code(g, is_undirected=True):
+    """Return the minimum DFS code of graph `g`, with its own labels.
+
+    Codes are DFScode.to_tuple() with labels decoded, vacant ones None.
+    Labels are interned in string order, as in any mined database, so a
+    pattern has the same code whichever database it is mined from. A
+    graph of a single vertex has the code (vlb,). `g` must be connected.
+    """
+    vids = {vid: i for i, vid in enumerate(g.vertices)}
+    if len(vids) == 1:
+        return (next(iter(g.vertices.values())).vlb,)
+    vlb_table = LabelTable.from_labels(v.vlb for v in g.vertices.values())
+    elb_table = LabelTable.from_labels(e.elb for v in g.vertices.values()
+                                       for e in v.edges.values())
+    vlbs = [vlb_table.encode(v.vlb) for v in g.vertices.values()]
+    edges = list()
+    for vid, v in g.vertices.items():
+        for to, e in v.edges.items():
+            if is_undirected and vids[to] < vids[vid]:
+                continue
+            edges.append((vids[vid], vids[to], elb_table.encode(e.elb)))
+    db = GraphDatabase(build_csr([(vlbs, edges)], is_undirected),
+                       vlb_table, elb_table, is_undirected, use_numpy=False)
+    gs = gSpan(None, is_undirected=is_undirected, quiet=True,
+               canonical_cache_size=0)
+    _, dfscode = gs._min_dfs_code(db)
+    return tuple(
+        (frm, to,
+         None if vlb1 == VACANT_VERTEX_LABEL else vlb_table.decode(vlb1),
+         elb_table.decode(elb),
+         None if vlb2 == VACANT_VERTEX_LABEL else vlb_table.decode(vlb2))
+        for frm, to, vlb1, elb, vlb2 in dfscode.to_tuple())
+
+
+class PatternRegistry(object):
+    """Persistent ids of patterns, keyed by their canonical_code().
+
+    A pattern gets the next free id the first time it is registered and
+    keeps it in every later run, so patterns mined from different months
+    share ids. Writers lock `file_name`.lock while they update the file,
+    which is replaced at once, so any number of processes can register
+    patterns at the same time; readers need no lock.
+    """
+
+    def __init__(self, file_name, is_undirected=True):
+        """Initialize PatternRegistry instance.
+
+        Args:
+            file_name: pickle file of the registry, created if missing.
+            is_undirected: whether the registered patterns are undirected.
+        """
+        self.file_name = file_name
+        self.is_undirected = is_undirected
+        self.ids = dict()
+        self.reload()
+
+    def __len__(self):
+        """Return number of registered patterns."""
+        return len(self.ids)
+
+    def reload(self):
+        """Read the patterns registered so far by any process."""
+        if not os.path.exists(self.file_name):
+            self.ids = dict()
+            return self
+        with open(self.file_name, 'rb') as f:
+            state = pickle.load(f)
+        if state['version'] != REGISTRY_VERSION:
+            raise ValueError('{} has version {}, expected {}.'.format(
+                self.file_name, state['version'], REGISTRY_VERSION))
+        if state['is_undirected'] != self.is_undirected:
+            raise ValueError('{} registers {} patterns.'.format(
+                self.file_name,
+                'undirected' if state['is_undirected'] else 'directed'))
+        self.ids = state['ids']
+        return self
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with open(self.file_name + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def get(self, g):
+        """Return the id of pattern `g`, None if it is not registered."""
+        return self.ids.get(canonical_code(g, self.is_undirected))
+
+    def register(self, subgraphs):
+        """Give every pattern of `subgraphs` its global id.
+
+        Args:
+            subgraphs: dict of id -> Graph, e.g. gSpan.subgraphs.
+
+        Returns:
+            dict of id in `subgraphs` -> global id. Isomorphic patterns get
+            the same global id.
+        """
+        codes = {gid: canonical_code(g, self.is_undirected)
+                 for gid, g in subgraphs.items()}
+        with self._locked():
+            self.reload()
+            new = [code for code in set(codes.values())
+                   if code not in self.ids]
+            if new:
+                for code in sorted(new, key=repr):
+                    self.ids[code] = len(self.ids)
+                dump_pickle({'version': REGISTRY_VERSION,
+                             'is_undirected': self.is_undirected,
+                             'ids': self.ids}, self.file_name)
+        return {gid: self.ids[code] for gid, code in codes.items()}
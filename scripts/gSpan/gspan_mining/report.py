@@ -0,0 +1,213 @@
+"""Sinks that stream the frequent patterns found by gSpan."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import array
+import json
+import struct
+
+import numpy as np
+
+
+REPORT_MODES = ('none', 'jsonl', 'binary')
+
+COLUMNAR_MAGIC = b'GSPNCOL1'
+COLUMNAR_BLOCK = struct.Struct('<IIQ')
+
+
+class ReportSink(object):
+    """Sink that drops every pattern.
+
+    Subclasses override write() to persist the patterns. Patterns are passed
+    as they are found; `dfscode` is a list of (frm, to, vlb1, elb, vlb2)
+    tuples of interned labels, vacant labels being -1.
+    """
+
+    def __init__(self, file_name=None):
+        """Initialize ReportSink instance.
+
+        Args:
+            file_name: file to write the patterns to.
+        """
+        self.file_name = file_name
+        self.vlb_table = None
+        self.elb_table = None
+
+    def open(self, vlb_table, elb_table):
+        """Start a run whose labels are interned by the given tables."""
+        self.vlb_table = vlb_table
+        self.elb_table = elb_table
+        return self
+
+    def write(self, gid, support, dfscode, num_vertices, where):
+        """Write one pattern."""
+        pass
+
+    def close(self):
+        """Finish the run."""
+        pass
+
+
+class JSONLinesSink(ReportSink):
+    """Sink writing one JSON object per pattern, with decoded labels."""
+
+    def __init__(self, file_name):
+        """Initialize JSONLinesSink instance."""
+        super(JSONLinesSink, self).__init__(file_name)
+        self._f = None
+
+    def open(self, vlb_table, elb_table):
+        """Open the output file."""
+        super(JSONLinesSink, self).open(vlb_table, elb_table)
+        self._f = open(self.file_name, 'w')
+        return self
+
+    def _decode(self, table, code):
+        return None if code < 0 else table.decode(code)
+
+    def write(self, gid, support, dfscode, num_vertices, where):
+        """Write one pattern as a JSON line."""
+        code = [
+            [frm, to,
+             self._decode(self.vlb_table, vlb1),
+             self._decode(self.elb_table, elb),
+             self._decode(self.vlb_table, vlb2)]
+            for frm, to, vlb1, elb, vlb2 in dfscode
+        ]
+        self._f.write(json.dumps({
+            'gid': gid,
+            'support': support,
+            'dfscode': code,
+            'num_vert': num_vertices,
+            'where': sorted(where),
+        }))
+        self._f.write('\n')
+
+    def close(self):
+        """Close the output file."""
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class ColumnarSink(ReportSink):
+    """Sink writing patterns to a compact binary columnar file.
+
+    The file starts with COLUMNAR_MAGIC, a uint32 length and a JSON header
+    holding the label tables. Patterns follow in blocks of at most
+    `block_size`; a block is a (npatterns, ncode_edges, nwhere) header
+    followed by the columns gid, support, num_vert, code_len and where_len
+    (uint32 each), the DFS code edges (int32, five per edge) and the
+    supporting gids (uint32). Use read_columnar() to load such a file.
+    """
+
+    def __init__(self, file_name, block_size=4096):
+        """Initialize ColumnarSink instance."""
+        super(ColumnarSink, self).__init__(file_name)
+        self.block_size = block_size
+        self._f = None
+        self._reset_block()
+
+    def _reset_block(self):
+        self._cols = {name: array.array('I') for name in
+                      ('gid', 'support', 'num_vert', 'code_len', 'where_len',
+                       'where')}
+        self._code = array.array('i')
+
+    def open(self, vlb_table, elb_table):
+        """Open the output file and write the header."""
+        super(ColumnarSink, self).open(vlb_table, elb_table)
+        header = json.dumps({'vlb': list(vlb_table.names),
+                             'elb': list(elb_table.names)}).encode('utf-8')
+        self._f = open(self.file_name, 'wb')
+        self._f.write(COLUMNAR_MAGIC)
+        self._f.write(struct.pack('<I', len(header)))
+        self._f.write(header)
+        return self
+
+    def write(self, gid, support, dfscode, num_vertices, where):
+        """Buffer one pattern, flushing full blocks."""
+        cols = self._cols
+        cols['gid'].append(gid)
+        cols['support'].append(support)
+        cols['num_vert'].append(num_vertices)
+        cols['code_len'].append(len(dfscode))
+        cols['where_len'].append(len(where))
+        cols['where'].extend(sorted(where))
+        for dfsedge in dfscode:
+            self._code.extend(dfsedge)
+        if len(cols['gid']) >= self.block_size:
+            self._flush()
+
+    def _flush(self):
+        cols = self._cols
+        if not cols['gid']:
+            return
+        self._f.write(COLUMNAR_BLOCK.pack(len(cols['gid']),
+                                          len(self._code) // 5,
+                                          len(cols['where'])))
+        for name in ('gid', 'support', 'num_vert', 'code_len', 'where_len'):
+            self._f.write(np.asarray(cols[name], dtype='<u4').tobytes())
+        self._f.write(np.asarray(self._code, dtype='<i4').tobytes())
+        self._f.write(np.asarray(cols['where'], dtype='<u4').tobytes())
+        self._reset_block()
+
+    def close(self):
+        """Flush the last block and close the output file."""
+        if self._f is not None:
+            self._flush()
+            self._f.close()
+            self._f = None
+
+
+def read_columnar(file_name):
+    """Load a file written by ColumnarSink.
+
+    Returns:
+        dict with the label lists 'vlb' and 'elb', the per-pattern columns
+        'gid', 'support', 'num_vert', 'code_len', 'where_len', the
+        concatenated 'code' array of shape (n, 5) and 'where' array.
+        Per-pattern slices follow from the cumulative sums of 'code_len'
+        and 'where_len'.
+    """
+    names = ('gid', 'support', 'num_vert', 'code_len', 'where_len')
+    blocks = {name: list() for name in names + ('code', 'where')}
+    with open(file_name, 'rb') as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError('{} is not a columnar report'.format(file_name))
+        hlen, = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(hlen).decode('utf-8'))
+        while True:
+            buf = f.read(COLUMNAR_BLOCK.size)
+            if len(buf) < COLUMNAR_BLOCK.size:
+                break
+            n, m, k = COLUMNAR_BLOCK.unpack(buf)
+            for name in names:
+                blocks[name].append(np.frombuffer(f.read(4 * n), dtype='<u4'))
+            blocks['code'].append(
+                np.frombuffer(f.read(20 * m), dtype='<i4').reshape(m, 5))
+            blocks['where'].append(np.frombuffer(f.read(4 * k), dtype='<u4'))
+    res = {'vlb': header['vlb'], 'elb': header['elb']}
+    for name, parts in blocks.items():
+        if parts:
+            res[name] = np.concatenate(parts)
+        elif name == 'code':
+            res[name] = np.zeros((0, 5), dtype='<i4')
+        else:
+            res[name] = np.zeros(0, dtype='<u4')
+    return res
+
+
+def make_sink(mode='none', file_name=None):
+    """Create the sink for one of REPORT_MODES."""
+    if mode == 'none':
+        return ReportSink(file_name)
+    if file_name is None:
+        raise ValueError('Report mode {} needs a file name.'.format(mode))
+    if mode == 'jsonl':
+        return JSONLinesSink(file_name)
+    if mode == 'binary':
+        return ColumnarSink(file_name)
+    raise ValueError('Unknown report mode {}, expected one of {}.'.format(
+        mode, ', '.join(REPORT_MODES)))
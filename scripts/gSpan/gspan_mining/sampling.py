@@ -0,0 +1,88 @@
+"""Find candidate patterns on a random sample of the graphs."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import math
+
+import numpy as np
+
+from .database import GraphDatabase
+from .gspan import gSpan
+from .partition import CandidateSet
+from .sweep import PatternLattice
+
+
+def sample_support(min_support, num_graphs, sample_size, delta=0.05):
+    """Return the support a sample is mined at.
+
+    The sample support of a pattern occurring in a fraction f of the
+    graphs is binomial with mean f * sample_size. By Hoeffding's bound, a
+    pattern of support at least min_support falls below
+    sample_size * (min_support / num_graphs - eps), for
+    eps = sqrt(ln(1 / delta) / (2 * sample_size)), with probability at
+    most `delta`.
+    """
+    if sample_size >= num_graphs:
+        return min_support
+    eps = math.sqrt(math.log(1.0 / delta) / (2 * sample_size))
+    return max(1, int(math.floor(
+        sample_size * (min_support / num_graphs - eps))))
+
+
+def sample_graphs(num_graphs, sample_size, seed=None):
+    """Return sorted positions of `sample_size` graphs drawn at random."""
+    rng = np.random.RandomState(seed)
+    return np.sort(rng.choice(num_graphs, min(sample_size, num_graphs),
+                              replace=False))
+
+
+def mine_candidates(database_file_name, min_support, sample_size,
+                    delta=0.05, seed=None, is_undirected=True,
+                    max_num_vertices=float('inf'), max_ngraphs=float('inf'),
+                    start_gid=None, hub=None, verbose=True):
+    """Mine a random sample of the graphs for candidates of a full run.
+
+    Pass the result as `constraints` to a gSpan run over all the graphs:
+    it reports the candidates of support at least min_support, with their
+    exact supports and `where`. Each pattern of that support is missed
+    with probability at most `delta`, see sample_support(); no pattern is
+    reported that a run without sampling would not report.
+
+    Args:
+        sample_size: number of graphs in the sample, or the fraction of
+            the graphs if below 1.
+        delta: probability a frequent pattern is not a candidate.
+        seed: seed of the sample, None for a random one.
+
+    Returns:
+        partition.CandidateSet of the patterns frequent in the sample.
+    """
+    num_graphs = len(GraphDatabase.read_graph_ids(
+        database_file_name, start_gid=start_gid, max_ngraphs=max_ngraphs))
+    if sample_size < 1:
+        sample_size = int(math.ceil(sample_size * num_graphs))
+    sample_size = int(min(max(sample_size, 1), num_graphs))
+    support = sample_support(min_support, num_graphs, sample_size, delta)
+    if verbose:
+        print('Mining a sample of {} of {} graphs at support {}'.format(
+            sample_size, num_graphs, support))
+    lattice = PatternLattice(support, max_num_vertices,
+                             is_undirected=is_undirected)
+    gs = gSpan(
+        database_file_name=database_file_name,
+        min_support=support,
+        max_num_vertices=max_num_vertices,
+        max_ngraphs=max_ngraphs,
+        start_gid=start_gid,
+        is_undirected=is_undirected,
+        quiet=True,
+        lattice=lattice,
+        hub=hub,
+        sample=sample_graphs(num_graphs, sample_size, seed),
+    )
+    gs.run()
+    candidates = CandidateSet.from_lattice(lattice)
+    if verbose:
+        print('{} candidates'.format(len(candidates.codes)))
+    return candidates
@@ -0,0 +1,141 @@
+"""Opt-in counters and timers of the gSpan hot path."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import json
+import time
+
+
+# gSpan methods timed by MiningStats.
+TIMED_METHODS = (
+    '_get_root_projections',
+    '_get_support',
+    '_is_min',
+    '_compute_is_min',
+    '_report',
+    '_has_extension',
+    '_extend_projections',
+    '_get_forward_root_edges',
+    '_get_backward_edge',
+    '_get_forward_pure_edges',
+    '_get_forward_rmpath_edges',
+)
+
+
+class MiningStats(object):
+    """Calls, times and search counters of one gSpan run.
+
+    Pass an instance as `stats` to gSpan to collect them; gSpan then wraps
+    the TIMED_METHODS of that instance, so runs without stats execute the
+    plain methods. Times are cumulative; the self time of a method leaves
+    out the timed methods it calls, e.g. the self time of
+    _extend_projections is spent building the histories of the new
+    embeddings. The peak embedding count is the most embeddings held on
+    the search stack at once, by one process in a parallel run.
+    """
+
+    def __init__(self):
+        """Initialize MiningStats instance."""
+        self.calls = collections.Counter()
+        self.times = collections.defaultdict(float)
+        self.self_times = collections.defaultdict(float)
+        # DFS depth -> [number of projections, embeddings, largest one]
+        self.projection_sizes = dict()
+        self.pruned = collections.Counter()
+        self.peak_embeddings = 0
+        self.counters = dict()
+        self._children = [0.0]
+
+    def reset(self):
+        """Clear the stats in place, keeping wrapped methods valid."""
+        self.calls.clear()
+        self.times.clear()
+        self.self_times.clear()
+        self.projection_sizes.clear()
+        self.pruned.clear()
+        self.peak_embeddings = 0
+        self.counters.clear()
+        self._children[:] = [0.0]
+        return self
+
+    def timed(self, name, func):
+        """Return `func` counting its calls and time under `name`."""
+        calls, times, self_times = self.calls, self.times, self.self_times
+        children = self._children
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            children.append(0.0)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                delta = perf_counter() - start
+                child = children.pop()
+                calls[name] += 1
+                times[name] += delta
+                self_times[name] += delta - child
+                children[-1] += delta
+        return wrapper
+
+    def projection(self, depth, size):
+        """Count a projection of `size` embeddings at DFS depth `depth`."""
+        sizes = self.projection_sizes.get(depth)
+        if sizes is None:
+            self.projection_sizes[depth] = [1, size, size]
+        else:
+            sizes[0] += 1
+            sizes[1] += size
+            if size > sizes[2]:
+                sizes[2] = size
+
+    def merge(self, other):
+        """Add the stats collected by `other`, e.g. in a worker."""
+        self.calls.update(other.calls)
+        for name, t in other.times.items():
+            self.times[name] += t
+        for name, t in other.self_times.items():
+            self.self_times[name] += t
+        for depth, (n, total, largest) in other.projection_sizes.items():
+            sizes = self.projection_sizes.setdefault(depth, [0, 0, 0])
+            sizes[0] += n
+            sizes[1] += total
+            sizes[2] = max(sizes[2], largest)
+        self.pruned.update(other.pruned)
+        self.peak_embeddings = max(self.peak_embeddings,
+                                   other.peak_embeddings)
+        return self
+
+    def __getstate__(self):
+        """Pickle the collected stats only."""
+        state = self.__dict__.copy()
+        state['_children'] = [0.0]
+        return state
+
+    def to_dict(self):
+        """Return the stats as a JSON serializable dict."""
+        return {
+            'methods': {
+                name: {'calls': self.calls[name],
+                       'time': self.times[name],
+                       'self_time': self.self_times[name]}
+                for name in sorted(self.calls)
+            },
+            'projection_sizes': [
+                {'depth': depth, 'projections': n, 'embeddings': total,
+                 'max': largest}
+                for depth, (n, total, largest) in
+                sorted(self.projection_sizes.items())
+            ],
+            'pruned': {'support': self.pruned['support'],
+                       'minimality': self.pruned['minimality']},
+            'peak_embeddings': self.peak_embeddings,
+            'counters': self.counters,
+        }
+
+    def dump(self, file_name):
+        """Write the stats to a JSON file."""
+        with open(file_name, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
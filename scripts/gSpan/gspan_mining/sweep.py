@@ -0,0 +1,133 @@
+"""Mine once at a low support and answer higher supports by filtering."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import pickle
+
+from .gspan import DFScode
+from .graph import Graph
+
+
+class PatternLattice(object):
+    """Frequent patterns of one run, in the order gSpan found them.
+
+    gSpan visits the same DFS codes in the same order at any support, and
+    only stops growing a code once its support drops below the threshold.
+    The patterns of a run at a higher support are therefore exactly the
+    recorded patterns whose support reaches it, in the recorded order, and
+    query() rebuilds the `subgraphs` and `support_where` that run would
+    have produced, gids included. Every pattern keeps the index of the
+    pattern it was grown from, its DFS code prefix, in `parents`.
+
+    Pass an instance as `lattice` to gSpan to record a run.
+    """
+
+    def __init__(self, min_support, max_num_vertices=float('inf'),
+                 is_undirected=True):
+        """Initialize PatternLattice instance.
+
+        Args:
+            min_support: support the lattice is mined at, the lowest one
+                it can answer.
+            max_num_vertices: upper bound of number of vertices it is mined
+                with, the highest one it can answer.
+            is_undirected: whether the mined graphs are undirected.
+        """
+        self.min_support = min_support
+        self.max_num_vertices = max_num_vertices
+        self.is_undirected = is_undirected
+        self.vlb_table = None
+        self.elb_table = None
+        self.hub = None
+        self.size1 = list()
+        self.codes = list()
+        self.supports = list()
+        self.num_vertices = list()
+        self.wheres = list()
+        self.parents = list()
+        self._index = dict()
+
+    def __len__(self):
+        """Return number of recorded patterns with at least one edge."""
+        return len(self.codes)
+
+    def open(self, vlb_table, elb_table, hub=None):
+        """Start recording a run whose labels are interned by the tables.
+
+        `hub` is the hub.HubAnchor of a run mining without hub vertices;
+        query() re-attaches it.
+        """
+        self.vlb_table = vlb_table
+        self.elb_table = elb_table
+        self.hub = hub
+        return self
+
+    def add_size1(self, vlb, support):
+        """Record a frequent vertex label."""
+        self.size1.append((vlb, support))
+
+    def add(self, dfscode, support, num_vertices, where):
+        """Record a frequent pattern given as DFScode.to_tuple().
+
+        `num_vertices` counts the vertices of the reported pattern.
+        """
+        self._index[dfscode] = len(self.codes)
+        self.parents.append(self._index.get(dfscode[:-1], -1))
+        self.codes.append(dfscode)
+        self.supports.append(support)
+        self.num_vertices.append(num_vertices)
+        self.wheres.append(frozenset(where))
+
+    def query(self, min_support, min_num_vertices=1,
+              max_num_vertices=float('inf')):
+        """Return the patterns of a run with the given parameters.
+
+        Returns:
+            (subgraphs, support_where) as set on gSpan by such a run.
+        """
+        if min_support < self.min_support:
+            raise ValueError(
+                'Lattice is mined at support {}, can not answer {}.'.format(
+                    self.min_support, min_support))
+        if max_num_vertices > self.max_num_vertices:
+            raise ValueError(
+                'Lattice is mined with at most {} vertices, can not answer '
+                '{}.'.format(self.max_num_vertices, max_num_vertices))
+        subgraphs, support_where = dict(), dict()
+        gid = 0
+        if min_num_vertices <= 1:
+            for vlb, support in self.size1:
+                if support >= min_support:
+                    g = Graph(gid, is_undirected=self.is_undirected)
+                    g.add_vertex(0, self.vlb_table.decode(vlb))
+                    subgraphs[gid] = g
+                    gid += 1
+        if max_num_vertices < 2:
+            return subgraphs, support_where
+        for i, code in enumerate(self.codes):
+            if (self.supports[i] < min_support or
+                    not min_num_vertices <= self.num_vertices[i] <=
+                    max_num_vertices):
+                continue
+            dfscode = DFScode.from_tuple(code)
+            subgraphs[gid] = dfscode.to_graph(gid=gid,
+                                              is_undirected=self.is_undirected,
+                                              vlb_table=self.vlb_table,
+                                              elb_table=self.elb_table)
+            if self.hub is not None:
+                subgraphs[gid] = self.hub.attach(subgraphs[gid])
+            support_where[gid] = set(self.wheres[i])
+            gid += 1
+        return subgraphs, support_where
+
+    def save(self, file_name):
+        """Save the lattice as a pickle file."""
+        with open(file_name, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(file_name):
+        """Load a lattice saved by save()."""
+        with open(file_name, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,31 @@
+"""Check ContainmentIndex against the supports gSpan mines."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import unittest
+
+from gspan_mining.containment import ContainmentIndex
+from gspan_mining.gspan import gSpan
+
+
+MONTH_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          os.pardir, os.pardir, os.pardir, 'data', 'months',
+                          'january.gspan.data')
+
+
+@unittest.skipUnless(os.path.exists(MONTH_FILE), 'month file not found')
+class ContainmentTest(unittest.TestCase):
+
+    def test_support_where_matches_gspan(self):
+        gs = gSpan(database_file_name=MONTH_FILE, min_support=20,
+                   is_undirected=True, quiet=True)
+        gs.run()
+        index = ContainmentIndex.from_file(MONTH_FILE, is_undirected=True)
+        subgraphs = {gid: gs.subgraphs[gid] for gid in gs.support_where}
+        self.assertEqual(index.support_where(subgraphs), gs.support_where)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,5 +3,8 @@ from __future__ import division
 from __future__ import print_function
 
 from .graph import Graph
+from .encoding import OneHotEncoder
+from .lsh import MinHashLSH
+from .cache import EncodingCache
 
 __version__ = '0.0.1'
\ No newline at end of file
@@ -0,0 +1,158 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import hashlib
+import os
+import pickle
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .encoding import OneHotEncoder
+
+CACHE_VERSION = 1
+
+
+def content_hash(graph):
+    """
+    Hashes the labeled structure of a gSpan graph.
+
+    Graphs with the same vertices, edges and labels get the same hash,
+    whatever their graph id is.
+
+    :param graph: gSpan graph object
+
+    :return     : Hex digest of the vertices and edges with their labels
+    """
+    vertices = sorted((int(v.vid), repr(v.vlb)) for v in graph.vertices.values())
+    edges = sorted((int(e.frm), int(e.to), repr(e.elb))
+                   for v in graph.vertices.values() for e in v.edges.values())
+    return hashlib.sha1(repr((vertices, edges)).encode('utf-8')).hexdigest()
+
+
+class EncodingCache(object):
+    """
+    On-disk store of the one-hot encodings of gSpan graphs.
+
+    Encodings are kept as the columns of their labels, keyed by the
+    content_hash() of the graph, so a graph mined again in a later run
+    is looked up instead of encoded. Columns follow a vocabulary file,
+    which labels are only ever appended to, so stored encodings stay
+    valid as labels are added. Both files carry CACHE_VERSION; files of
+    another version are ignored and rewritten.
+
+    At most max_entries encodings are kept, the least recently used are
+    evicted first. Lookups only reorder the file when a run also
+    stores or evicts encodings, so a run of hits reads it and no more.
+    """
+    def __init__(self, dir_path, max_entries=1 << 20):
+        """
+        Initializes an EncodingCache instance and loads its files.
+
+        :param dir_path   : Directory of the cache files, created on save
+        :param max_entries: Number of encodings kept on disk
+
+        :return           : None
+        """
+        self.dir_path = dir_path
+        self.vocab_file = os.path.join(dir_path, 'vocab.pkl')
+        self.store_file = os.path.join(dir_path, 'encodings.pkl')
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def __len__(self):
+        """
+        Returns the number of stored encodings.
+
+        :return: Number of entries
+        """
+        return len(self.entries)
+
+    def load(self):
+        """
+        Reads the vocabulary and encodings, starting empty if they are
+        missing or of another version.
+
+        :return: EncodingCache object itself
+        """
+        self.encoder = OneHotEncoder()
+        self.entries = collections.OrderedDict()
+        self._dirty = False
+        if not (os.path.exists(self.vocab_file) and
+                os.path.exists(self.store_file)):
+            return self
+        with open(self.vocab_file, 'rb') as f:
+            vocab = pickle.load(f)
+        with open(self.store_file, 'rb') as f:
+            store = pickle.load(f)
+        if (vocab.get('version') != CACHE_VERSION or
+                store.get('version') != CACHE_VERSION or
+                store['num_labels'] > len(vocab['labels'])):
+            print("Ignoring encoding cache of another version:", self.dir_path)
+            return self
+        self.encoder = OneHotEncoder(vocab['labels'])
+        self.entries = store['entries']
+        return self
+
+    def save(self):
+        """
+        Writes the vocabulary and encodings, if anything changed.
+
+        The vocabulary is written first, so the encodings on disk never
+        refer to columns it lacks.
+
+        :return: None
+        """
+        if not self._dirty:
+            return
+        from gspan_mining.atomic import dump_pickle
+        if not os.path.exists(self.dir_path):
+            os.makedirs(self.dir_path)
+        columns = self.encoder.columns
+        dump_pickle({'version': CACHE_VERSION,
+                     'labels': sorted(columns, key=columns.get)}, self.vocab_file)
+        dump_pickle({'version': CACHE_VERSION,
+                     'num_labels': len(columns),
+                     'entries': self.entries}, self.store_file)
+        self._dirty = False
+
+    def _columns(self, graph):
+        key = content_hash(graph)
+        columns = self.entries.get(key)
+        if columns is None:
+            self.misses += 1
+            columns = tuple(sorted(set(self.encoder.add_label(v.vlb)
+                                       for v in graph.vertices.values())))
+            self.entries[key] = columns
+            self._dirty = True
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return columns
+
+    def encode(self, graphs):
+        """
+        Encodes graphs, looking up the stored ones and storing the rest.
+
+        :param graphs: Dictionary, key : id, value : gSpan graph
+
+        :return      : List of the ids, and scipy.sparse.csr_matrix of their
+                       encodings, a row per id, a column per label of the
+                       vocabulary
+        """
+        ids, indptr, indices = list(graphs), [0], []
+        for graph_id in ids:
+            indices.extend(self._columns(graphs[graph_id]))
+            indptr.append(len(indices))
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self._dirty = True
+        matrix = csr_matrix((np.ones(len(indices)),
+                             np.array(indices, dtype=np.int64),
+                             np.array(indptr, dtype=np.int64)),
+                            shape=(len(ids), len(self.encoder)))
+        return ids, matrix
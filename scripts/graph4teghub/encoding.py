@@ -0,0 +1,200 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+WORD_BITS        = 64
+SIMILARITY_ALGOS = ('cosine', 'jaccard', 'pearson', 'euclidean')
+BLOCK_BYTES      = 1 << 25
+
+# Number of set bits of every byte, for NumPy versions without bitwise_count.
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)],
+                          dtype=np.uint8)
+
+
+class OneHotEncoder(object):
+    """
+    Sparse one-hot encodings of the node labels of graphs.
+
+    Every label is mapped to a column once, in the order labels are added,
+    so encodings made at different times share their columns.
+    """
+    def __init__(self, vocab=()):
+        """
+        Initializes a OneHotEncoder instance.
+
+        :param vocab: Labels to map to the first columns, in order
+
+        :return     : None
+        """
+        self.columns = dict()
+        for nlbl in vocab:
+            self.add_label(nlbl)
+
+    def __len__(self):
+        """
+        Returns the number of columns.
+
+        :return: Number of mapped labels
+        """
+        return len(self.columns)
+
+    def add_label(self, nlbl):
+        """
+        Maps a label to the next column, if it is not mapped yet.
+
+        :param nlbl: Node label
+
+        :return    : Column of the label
+        """
+        return self.columns.setdefault(nlbl, len(self.columns))
+
+    def fit(self, graphs):
+        """
+        Maps the node labels of graphs to columns.
+
+        :param graphs: Iterable of Graph objects
+
+        :return      : OneHotEncoder object itself
+        """
+        for graph in graphs:
+            for nlbl in graph.set_of_nlbl:
+                self.add_label(nlbl)
+        return self
+
+    def transform(self, graphs):
+        """
+        Encodes graphs into one CSR matrix, a row per graph.
+
+        Labels without a column are left out. The matrix holds one entry
+        per label of a graph, however many columns there are.
+
+        :param graphs: Iterable of Graph objects
+
+        :return      : scipy.sparse.csr_matrix of shape (graphs, columns)
+        """
+        indptr, indices = [0], []
+        for graph in graphs:
+            indices.extend(sorted(self.columns[nlbl]
+                                  for nlbl in graph.set_of_nlbl
+                                  if nlbl in self.columns))
+            indptr.append(len(indices))
+        return csr_matrix((np.ones(len(indices)),
+                           np.array(indices, dtype=np.int64),
+                           np.array(indptr, dtype=np.int64)),
+                          shape=(len(indptr) - 1, len(self.columns)))
+
+    def fit_transform(self, graphs):
+        """
+        Maps the labels of graphs to columns and encodes them.
+
+        :param graphs: List of Graph objects
+
+        :return      : scipy.sparse.csr_matrix of shape (graphs, columns)
+        """
+        return self.fit(graphs).transform(graphs)
+
+
+def pack_bits(matrix):
+    """
+    Packs a binary matrix into uint64 words, 64 columns per word.
+
+    Column j of a row is bit j % 64 of its word j // 64, so a row takes
+    64 times less memory than as float64.
+
+    :param matrix: scipy.sparse matrix or 2-D array, nonzero entries are set
+
+    :return      : numpy.ndarray of uint64, of shape (rows, ceil(columns / 64))
+    """
+    matrix = csr_matrix(matrix)
+    num_rows, num_cols = matrix.shape
+    packed = np.zeros((num_rows, -(-num_cols // WORD_BITS)), dtype=np.uint64)
+    matrix.eliminate_zeros()
+    rows = np.repeat(np.arange(num_rows), np.diff(matrix.indptr))
+    cols = matrix.indices.astype(np.uint64)
+    np.bitwise_or.at(packed, (rows, (cols // WORD_BITS).astype(np.int64)),
+                     np.left_shift(np.uint64(1), cols % np.uint64(WORD_BITS)))
+    return packed
+
+
+def popcount(words, axis=-1):
+    """
+    Counts the set bits of packed rows.
+
+    :param words: numpy.ndarray of uint64 words
+    :param axis : Axis of the words of a row
+
+    :return     : numpy.ndarray of int64, the words summed over axis
+    """
+    words = np.ascontiguousarray(words, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        counts = np.bitwise_count(words)
+    else:
+        counts = _BYTE_POPCOUNT[words.view(np.uint8)].reshape(
+            words.shape + (8,)).sum(axis=-1)
+    return counts.sum(axis=axis, dtype=np.int64)
+
+
+def _similarity(inter, count_a, count_b, num_bits, algo):
+    """
+    Computes similarities of binary rows from their set bit counts.
+
+    Pairs whose similarity is undefined, e.g. with an empty row, get 0.
+    """
+    inter = inter.astype(np.float64)
+    count_a = count_a.astype(np.float64)
+    count_b = count_b.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if algo == 'cosine':
+            sim = inter / np.sqrt(count_a * count_b)
+        elif algo == 'jaccard':
+            sim = inter / (count_a + count_b - inter)
+        elif algo == 'pearson':
+            sim = ((num_bits * inter - count_a * count_b) /
+                   np.sqrt(count_a * (num_bits - count_a) *
+                           count_b * (num_bits - count_b)))
+        else:
+            return np.sqrt(np.maximum(count_a + count_b - 2 * inter, 0))
+    return np.nan_to_num(sim, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def binary_similarity(a, b, num_bits, algo='cosine', block_size=None):
+    """
+    Computes similarities of packed binary rows with popcounts.
+
+    For binary rows A and B of num_bits columns, with a = |A|, b = |B|
+    and i = |A & B|:
+        cosine    : i / sqrt(a * b)
+        jaccard   : i / (a + b - i)
+        pearson   : (n * i - a * b) / sqrt(a * (n - a) * b * (n - b))
+        euclidean : sqrt(a + b - 2 * i), a distance
+
+    :param a         : Packed row, or packed rows, see pack_bits
+    :param b         : Packed rows
+    :param num_bits  : Number of columns of the unpacked rows
+    :param algo      : One of SIMILARITY_ALGOS
+    :param block_size: Number of rows of a compared at once,
+                       default fits BLOCK_BYTES
+
+    :return          : numpy.ndarray of shape (len(b),) for a single row a,
+                       else (len(a), len(b))
+    """
+    if algo not in SIMILARITY_ALGOS:
+        raise ValueError('Unknown similarity {}, expected one of {}.'.format(
+            algo, ', '.join(SIMILARITY_ALGOS)))
+    a, b = np.asarray(a, dtype=np.uint64), np.asarray(b, dtype=np.uint64)
+    single = a.ndim == 1
+    a = np.atleast_2d(a)
+    count_b = popcount(b)
+    if block_size is None:
+        block_size = max(1, BLOCK_BYTES // max(b.nbytes, 1))
+    sims = np.empty((len(a), len(b)))
+    for start in range(0, len(a), block_size):
+        block = a[start:start + block_size]
+        inter = popcount(block[:, np.newaxis, :] & b[np.newaxis, :, :])
+        sims[start:start + block_size] = _similarity(
+            inter, popcount(block)[:, np.newaxis], count_b[np.newaxis, :],
+            num_bits, algo)
+    return sims[0] if single else sims
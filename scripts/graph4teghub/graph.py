@@ -248,6 +248,19 @@ class Graph(object):
             return None
         
 
+    def get_sparse_OneHotEncoding(self, encoder):
+        """
+        Returns the one-hot encoding of the node labels as a sparse row.
+
+        Unlike get_OneHotEncoding, the cost depends on the labels of the
+        graph only, not on the size of the vocabulary.
+
+        :param encoder: OneHotEncoder mapping labels to columns
+
+        :return       : scipy.sparse.csr_matrix of shape (1, columns)
+        """
+        return encoder.transform([self])
+
     def convert_networkx(self):
         """
         Transform graph to a networkx graph object.
@@ -0,0 +1,159 @@
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+MERSENNE_PRIME = (1 << 31) - 1
+MAX_HASH       = np.uint64(MERSENNE_PRIME)
+
+
+class MinHashLSH(object):
+    """
+    Locality sensitive hashing of node label sets, with MinHash bands.
+
+    A graph is hashed by the columns of its one-hot encoding, see
+    OneHotEncoder. Its signature holds bands * rows MinHash values, and
+    two graphs share a bucket of a band when all rows of that band agree.
+    Graphs of Jaccard similarity s share a bucket of some band with
+    probability 1 - (1 - s ** rows) ** bands, so candidates are found by
+    looking up bands buckets instead of comparing to every graph.
+
+    Columns of an OneHotEncoder never change, so graphs can be inserted
+    at any time, e.g. as the subgraphs of new months arrive.
+    """
+    def __init__(self, bands=32, rows=4, seed=0):
+        """
+        Initializes a MinHashLSH instance.
+
+        :param bands: Number of bands, more bands find more candidates
+        :param rows : Number of MinHash values of a band, more rows find
+                      fewer candidates, of higher similarity
+        :param seed : Seed of the hash functions
+
+        :return     : None
+        """
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.RandomState(seed)
+        num_perm = bands * rows
+        self._a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.buckets = [dict() for _ in range(bands)]
+        self.signatures = dict()
+
+    def __len__(self):
+        """
+        Returns the number of inserted graphs.
+
+        :return: Number of keys
+        """
+        return len(self.signatures)
+
+    def __contains__(self, key):
+        return key in self.signatures
+
+    def threshold(self):
+        """
+        Returns the Jaccard similarity at which graphs become candidates
+        with probability about 1/2.
+
+        :return: (1 / bands) ** (1 / rows)
+        """
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def signature(self, matrix):
+        """
+        Computes MinHash signatures of binary rows.
+
+        Rows without a set column, i.e. graphs with no labels, get MAX_HASH
+        everywhere.
+
+        :param matrix: scipy.sparse matrix or 2-D array, a row per graph
+
+        :return      : numpy.ndarray of uint64, of shape (rows, bands * rows)
+        """
+        matrix = csr_matrix(matrix)
+        matrix.eliminate_zeros()
+        sigs = np.full((matrix.shape[0], len(self._a)), MAX_HASH, dtype=np.uint64)
+        if not matrix.nnz:
+            return sigs
+        cols = matrix.indices.astype(np.uint64)
+        # Values stay below 2 ** 62, so no product overflows.
+        hashes = (cols[:, np.newaxis] * self._a + self._b) % MAX_HASH
+        lengths = np.diff(matrix.indptr)
+        full = np.flatnonzero(lengths)
+        sigs[full] = np.minimum.reduceat(hashes, matrix.indptr[full], axis=0)
+        return sigs
+
+    def _band_keys(self, sig):
+        return [sig[band * self.rows:(band + 1) * self.rows].tobytes()
+                for band in range(self.bands)]
+
+    def insert(self, keys, matrix):
+        """
+        Hashes graphs into the buckets of every band.
+
+        Keys already inserted are hashed again, so their signatures can be
+        updated. Graphs with no labels are kept out of the buckets.
+
+        :param keys  : List of graph ids, one per row of matrix
+        :param matrix: Encodings of the graphs, a row per key
+
+        :return      : None
+        """
+        sigs = self.signature(matrix)
+        for key, sig in zip(keys, sigs):
+            if key in self.signatures:
+                self.remove(key)
+            self.signatures[key] = sig
+            if sig[0] == MAX_HASH:
+                continue
+            for bucket, band_key in zip(self.buckets, self._band_keys(sig)):
+                bucket.setdefault(band_key, []).append(key)
+
+    def remove(self, key):
+        """
+        Takes a graph out of the index.
+
+        :param key: Graph id
+
+        :return   : None
+        """
+        sig = self.signatures.pop(key)
+        if sig[0] == MAX_HASH:
+            return
+        for bucket, band_key in zip(self.buckets, self._band_keys(sig)):
+            keys = bucket[band_key]
+            keys.remove(key)
+            if not keys:
+                del bucket[band_key]
+
+    def query(self, sig):
+        """
+        Returns the graphs sharing a bucket with a signature.
+
+        :param sig: Signature, a row of signature()
+
+        :return   : Set of graph ids
+        """
+        found = set()
+        if sig[0] == MAX_HASH:
+            return found
+        for bucket, band_key in zip(self.buckets, self._band_keys(sig)):
+            found.update(bucket.get(band_key, ()))
+        return found
+
+    def candidates(self, key):
+        """
+        Returns the graphs sharing a bucket with an inserted graph,
+        leaving itself out.
+
+        :param key: Graph id
+
+        :return   : Set of graph ids
+        """
+        found = self.query(self.signatures[key])
+        found.discard(key)
+        return found
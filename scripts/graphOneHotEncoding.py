@@ -2,41 +2,108 @@
 
 import os, sys, re, time, csv, pickle
 import numpy as np
-import multiprocessing as mp
 from tqdm import tqdm
-from sklearn.metrics.pairwise import cosine_similarity as cs
 from scipy.stats.stats import pearsonr
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.preprocessing import normalize
+from scipy.sparse import vstack, csr_matrix
 
 CURR_DIR = os.getcwd()
 sys.path.insert(0, os.path.join(CURR_DIR, 'gSpan'))
-from graph4teghub import Graph
+from graph4teghub import Graph, OneHotEncoder, MinHashLSH
+from graph4teghub.encoding import pack_bits, binary_similarity
 import gspan_mining
 
 K              = 20
 GRAPHS_DIR     = os.path.join(CURR_DIR, '..', 'data', 'reduced25.pkl')
 INPUT_PATH     = os.path.join(CURR_DIR, '..', 'data')
 GRAPHS         = {}
-ENCODINGS      = {}
+ENCODINGS      = {}    # graph id : sparse row of ENCODING_MATRIX
+ENCODING_MATRIX = None  # scipy.sparse.csr_matrix, a row per graph of ENCODING_IDS
+ENCODING_IDS   = []
+ENCODER        = None  # graph4teghub.OneHotEncoder, label : column
+PACKED         = None  # ENCODING_MATRIX packed into uint64 words, see pack_bits
+PACKED_ROWS    = {}    # graph id : row of ENCODING_MATRIX and PACKED
+LSH_INDEX      = None  # graph4teghub.MinHashLSH of ENCODING_MATRIX, None scans all graphs
+LSH_BANDS      = 32
+LSH_ROWS       = 4
 FILES          = ['words.csv', 'news.csv', 'named_entities.csv']
 FIELDNAMES     = [['wid:ID', ':LABEL', 'word'],
                   ['nid:ID', ':LABEL', 'label'],
                   ['neid:ID', ':LABEL', 'name']]
-SIM_ALGOS      = ['Cosine', 'Euclidean Distance', 'Pearson']
+SIM_ALGOS      = ['Cosine', 'Euclidean Distance', 'Pearson', 'Jaccard']
+SIM_KERNELS    = {'Cosine': 'cosine', 'Euclidean Distance': 'euclidean',
+                  'Pearson': 'pearson', 'Jaccard': 'jaccard'}
 SIMILAR_GRAPHS = {}
 VOCAB          = {}
+BLOCK_BYTES    = 1 << 25    # bytes of a block of the similarity matrix
+
+def get_sims(graph_id, algo='Cosine'):
+    """
+    graph_id : id of an encoded graph
+    algo : one of SIM_ALGOS
+
+    Returns similarities of the graph to all graphs of ENCODING_IDS, in that order
+    Computed with popcounts on PACKED, Euclidean Distance is a distance
+    """
+    row = PACKED_ROWS[graph_id]
+    return binary_similarity(PACKED[row], PACKED, ENCODING_MATRIX.shape[1],
+                             SIM_KERNELS[algo])
+
+def get_candidate_sims(graph_id, algo='Cosine'):
+    """
+    graph_id : id of an encoded graph
+    algo : one of SIM_ALGOS
+
+    Returns ids of the graphs LSH_INDEX finds for the graph, leaving itself out,
+    and their exact similarities to it
+    Without LSH_INDEX, all other graphs are compared
+    """
+    if LSH_INDEX is None:
+        sims = get_sims(graph_id, algo)
+        keep = np.asarray(ENCODING_IDS) != graph_id
+        return np.asarray(ENCODING_IDS)[keep], sims[keep]
+    keys = np.array(sorted(LSH_INDEX.candidates(graph_id)), dtype=int)
+    if not len(keys):
+        return keys, np.zeros(0)
+    rows = [PACKED_ROWS[key] for key in keys]
+    sims = binary_similarity(PACKED[PACKED_ROWS[graph_id]], PACKED[rows],
+                             ENCODING_MATRIX.shape[1], SIM_KERNELS[algo])
+    return keys, sims
+
+def get_top_k_sim(graph_id, k, algo='Cosine'):
+    """
+    Returns the k graphs most similar to graph_id, leaving itself out,
+    as an array of (key, sim), most similar first
+    With LSH_INDEX, only its candidates are ranked, so fewer than k may be found
+    """
+    keys, sims = get_candidate_sims(graph_id, algo)
+    if algo == 'Euclidean Distance':
+        order = np.argsort(sims, kind='stable')[:k]
+    else:
+        order = np.argsort(-sims, kind='stable')[:k]
+    return np.array(list(zip(keys[order].tolist(), sims[order].tolist())),
+                    dtype=[('key', int), ('sim', float)])
+
+def get_similar(graph_id, threshold, algo='Cosine'):
+    """
+    Returns dictionary, key : id of a graph at least threshold similar to graph_id,
+    including itself, value : similarity
+    """
+    keys, sims = get_candidate_sims(graph_id, algo)
+    similar = {key: sim for key, sim in zip(keys.tolist(), sims.tolist())
+               if sim >= threshold}
+    similar[graph_id] = get_sim(graph_id, graph_id, algo)
+    return similar
 
 def get_top_k_cosine_sim(graph_id, k):
-    all_sim = np.array([(key, cs(ENCODINGS[graph_id], ENCODINGS[key])[0][0]) 
-                        for key in tqdm(ENCODINGS, 
-                                        desc="Calculating Cosine Simlarity for Graph " + 
-                                             str(graph_id))],
-                        dtype=[('key', int), ('sim', float)])
-    all_sim = np.sort(all_sim, order='sim')[::-1]
-    return all_sim[1:k + 1]
+    return get_top_k_sim(graph_id, k, 'Cosine')
+
+def get_sim(i, j, algo='Cosine'):
+    return binary_similarity(PACKED[PACKED_ROWS[i]], PACKED[PACKED_ROWS[j]][np.newaxis],
+                             ENCODING_MATRIX.shape[1], SIM_KERNELS[algo])[0]
 
 def get_cosine_sim(i, j):
-    return cs(ENCODINGS[i], ENCODINGS[j])[0][0]
+    return get_sim(i, j, 'Cosine')
 
 def generate_vocab(graphs):
     VOCAB = {}
@@ -48,15 +115,80 @@ def generate_vocab(graphs):
                 VOCAB[nlbl] += 1
     return VOCAB
 
-def _get_encoding(data):
-    graph_id, graph = data
-    return (graph_id, np.array(graph.get_OneHotEncoding(list(VOCAB.keys())).reshape(1, -1)))
-
 def get_encodings():
-    with mp.Pool(os.cpu_count()) as p:
-        all_encodings = p.map(_get_encoding, GRAPHS.items())
-    for graph_id, embedding in all_encodings:
-        ENCODINGS[graph_id] = embedding
+    """
+    Encodes GRAPHS into one sparse matrix, columns following VOCAB
+    Memory grows with the labels of the graphs, not with the size of VOCAB
+    """
+    global ENCODER, ENCODING_MATRIX, ENCODING_IDS
+    ENCODER = OneHotEncoder(VOCAB)
+    ENCODING_IDS = list(GRAPHS)
+    ENCODING_MATRIX = ENCODER.transform(GRAPHS[graph_id] for graph_id in ENCODING_IDS)
+    _index_encodings()
+
+def load_encodings(subgraphs, cache):
+    """
+    subgraphs : dictionary, key : id, value : gSpan graph
+    cache : graph4teghub.EncodingCache
+
+    Encodes subgraphs through the cache, so only subgraphs it lacks are encoded,
+    and saves it. Columns and VOCAB follow the vocabulary of the cache
+    Subgraphs are not converted into GRAPHS
+    """
+    global ENCODER, ENCODING_MATRIX, ENCODING_IDS, VOCAB
+    ENCODING_IDS, ENCODING_MATRIX = cache.encode(subgraphs)
+    cache.save()
+    ENCODER = cache.encoder
+    counts = np.bincount(ENCODING_MATRIX.indices, minlength=len(ENCODER))
+    VOCAB = {nlbl: int(counts[col]) for nlbl, col in ENCODER.columns.items() if counts[col]}
+    _index_encodings()
+
+def _index_encodings():
+    """
+    Packs ENCODING_MATRIX and builds LSH_INDEX over it
+    """
+    global PACKED, LSH_INDEX
+    # Ids of earlier encodings would point at rows of another matrix
+    ENCODINGS.clear()
+    PACKED_ROWS.clear()
+    PACKED = pack_bits(ENCODING_MATRIX)
+    for row, graph_id in enumerate(ENCODING_IDS):
+        ENCODINGS[graph_id] = ENCODING_MATRIX[row]
+        PACKED_ROWS[graph_id] = row
+    LSH_INDEX = MinHashLSH(LSH_BANDS, LSH_ROWS)
+    LSH_INDEX.insert(ENCODING_IDS, ENCODING_MATRIX)
+
+def add_graphs(subgraphs):
+    """
+    subgraphs : dictionary, key : id, value : gSpan graph, e.g. of a new month
+
+    Encodes the subgraphs not encoded yet and inserts them into LSH_INDEX
+    New labels get new columns, columns of encoded graphs stay as they are
+    """
+    global ENCODING_MATRIX, PACKED
+    new = {k: v for k, v in subgraphs.items() if k not in PACKED_ROWS}
+    if not new:
+        return
+    import_from_list(new)
+    new_ids = list(new)
+    for graph_id in new_ids:
+        for nlbl in GRAPHS[graph_id].set_of_nlbl:
+            VOCAB[nlbl] = VOCAB.get(nlbl, 0) + 1
+    ENCODER.fit(GRAPHS[graph_id] for graph_id in new_ids)
+    rows = ENCODER.transform(GRAPHS[graph_id] for graph_id in new_ids)
+    old = ENCODING_MATRIX.tocsr()
+    old = csr_matrix((old.data, old.indices, old.indptr), shape=(old.shape[0], len(ENCODER)))
+    ENCODING_MATRIX = vstack([old, rows], format='csr')
+    packed = pack_bits(rows)
+    PACKED = np.vstack([np.pad(PACKED, ((0, 0), (0, packed.shape[1] - PACKED.shape[1]))),
+                        packed])
+    for graph_id in new_ids:
+        PACKED_ROWS[graph_id] = len(ENCODING_IDS)
+        ENCODING_IDS.append(graph_id)
+    # Rows of all graphs take the new columns, so encodings stack together
+    for row, graph_id in enumerate(ENCODING_IDS):
+        ENCODINGS[graph_id] = ENCODING_MATRIX[row]
+    LSH_INDEX.insert(new_ids, rows)
 
 
 def _create_graph(graph_id, graphObj):
@@ -65,10 +197,12 @@ def _create_graph(graph_id, graphObj):
     GRAPHS[graph_id] = graph
 
 def import_from_list(graph_list):
-    GRAPH_CNT = 0
-    for graph in graph_list.values():
-        _create_graph(GRAPH_CNT, graph)
-        GRAPH_CNT += 1
+    """
+    graph_list : dictionary, key : id, value : gSpan graph
+    Graphs keep their ids, so encodings can be looked up by subgraph id
+    """
+    for graph_id, graph in graph_list.items():
+        _create_graph(graph_id, graph)
 
 def import_graphs_from_file():
     with (open(GRAPHS_DIR, "rb")) as f:
@@ -80,38 +214,74 @@ def print_similarities(results):
         print(_id, '->', sim)
     print("-" * 20)
 
-def _init_gohe(subgraphs):
+def _init_gohe(subgraphs, cache=None):
+    """
+    subgraphs : dictionary, key : id, value : gSpan graph
+    cache : graph4teghub.EncodingCache to load encodings from, see load_encodings
+    """
     global VOCAB, GRAPHS
+    if cache is not None:
+        load_encodings(subgraphs, cache)
+        return
     import_from_list(subgraphs) 
     VOCAB = generate_vocab(GRAPHS)
     get_encodings()
 
-def get_clusters(subgraphs, threshold, init_gohe=True):
+def _normalized_encodings():
+    """
+    Returns sorted graph ids and their encodings stacked into one matrix
+    Rows are scaled to unit length, so their dot products are cosine similarities
+    Rows of empty encodings stay zero, as cosine_similarity takes them
+    """
+    keys = sorted(ENCODINGS)
+    if not keys:
+        return keys, np.zeros((0, len(VOCAB)))
+    encodings = vstack([ENCODINGS[key] for key in keys], format='csr')
+    return keys, normalize(encodings.astype(np.float64))
+
+def get_clusters(subgraphs, threshold, init_gohe=True, block_size=None):
+    """
+    subgraphs : dictionary, key : id, value : subgraph
+    threshold : min cosine similarity of a graph to the first graph of its cluster
+    init_gohe : whether to encode subgraphs first
+    block_size : number of rows of the similarity matrix computed at once,
+                 default fits BLOCK_BYTES
+
+    Going through the graphs in order, every graph not in a cluster yet opens one,
+    and takes the graphs more similar to it than threshold that are not in a cluster
+    Similarities of a block of such graphs to all graphs take a single matrix product
+    Returns dictionary, key : cluster id, value : list of graph ids
+    """
     if init_gohe:
         _init_gohe(subgraphs)
 
-    assigned_clusters = {}
+    keys, encodings = _normalized_encodings()
+    n = len(keys)
+    if block_size is None:
+        block_size = max(1, BLOCK_BYTES // (8 * max(n, 1)))
+    cluster_of = np.full(n, -1, dtype=np.int64)
     cluster_id = 0
 
-    for graph_id in tqdm(GRAPHS, desc='Clustering'):
-        if graph_id in assigned_clusters:
-            continue
-        all_sim = np.array([(key, cs(ENCODINGS[graph_id], ENCODINGS[key])[0][0])
-                                for key in ENCODINGS],
-                                dtype=[('key', int), ('sim', float)])
-        all_sim = np.sort(all_sim, order='key')
-        for i in range(len(all_sim)):
-            if all_sim[i][1] > threshold:
-                if i not in assigned_clusters:
-                    assigned_clusters[i] = cluster_id
-        cluster_id += 1
+    start = 0
+    with tqdm(total=n, desc='Clustering') as pbar:
+        while start < n:
+            rows = start + np.flatnonzero(cluster_of[start:] < 0)[:block_size]
+            if not len(rows):
+                break
+            similar = (encodings[rows] @ encodings.T).toarray() > threshold
+            for row, i in zip(similar, rows):
+                if cluster_of[i] >= 0:
+                    continue
+                row &= cluster_of < 0
+                cluster_of[row] = cluster_id
+                cluster_id += 1
+            pbar.update(rows[-1] + 1 - start)
+            start = rows[-1] + 1
 
     clusters = {}
-    for k, v in assigned_clusters.items():
-        if v in clusters:
-            clusters[v].append(k)
-        else:
-            clusters[v] = [k]
+    members = np.flatnonzero(cluster_of >= 0)
+    for i in members[np.argsort(cluster_of[members], kind='stable')]:
+        clusters.setdefault(int(cluster_of[i]), []).append(keys[i])
 
     return clusters
 
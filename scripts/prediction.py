@@ -5,17 +5,20 @@ import graphOneHotEncoding as gohe
 from converter import gSpan2query
 import pickle
 from tqdm import tqdm
+from graph4teghub import EncodingCache
 
 dirname = '../data/months/prediction/'
+cache_dir = dirname + 'encodings/'    # encodings of subgraphs, kept between runs
 train_months   = ['january', 'february', 'march', 'april', 'may', 'june', 'july', 'august', 'september', 'october', 'november']
 predict_months = ['december']
 
-subgraph_ranges = {}    # range : 'month_name'
+subgraph_months = {}    # subgraph id : names of the months it is mined in
 
 def gather_subgraphs():
         """
         Read subgraphs from both train and prediction months and return them together
-        Also fills subgraph ranges
+        Subgraph ids are global, so a subgraph mined in several months is read once
+        Also fills subgraph months
         """
         res = {}
         train_subgraphs   = []
@@ -23,13 +26,15 @@ def gather_subgraphs():
         for month in tqdm(train_months, desc='Reading Train Subgraphs'):
                 with open(dirname + month + '_subgraphs.pkl', 'rb') as f:
                         subgraphs = pickle.load(f)
-                        subgraph_ranges[range(min(subgraphs), max(subgraphs)+1)] = month
+                        for sid in subgraphs:
+                                subgraph_months.setdefault(sid, []).append(month)
                         train_subgraphs.append(subgraphs)
 
         for month in tqdm(predict_months, desc='Reading Predict Subgraphs'):
                 with open(dirname + month + '_subgraphs.pkl', 'rb') as f:
                         subgraphs = pickle.load(f)
-                        subgraph_ranges[range(min(subgraphs), max(subgraphs)+1)] = month
+                        for sid in subgraphs:
+                                subgraph_months.setdefault(sid, []).append(month)
                         predict_subgraphs.append(subgraphs)
 
         for d in train_subgraphs:
@@ -81,13 +86,20 @@ def predict(sequence, rules, ratio=0.9):
         then, check cosine similarity in the order of the sequence and candidate
         If similarity is above the ratio, append the consequent to predictions
         Return predictions
+
+        Similarities are at most 1, so every subgraph of a candidate must be at least
+        ratio similar to the one of the sequence. Those are looked up once per subgraph
+        of the sequence in gohe.LSH_INDEX, and re-ranked exactly
         """
         predictions = []
         candidates = {k:v for k, v in rules.items() if len(k) == len(sequence)}
+        similar = [gohe.get_similar(sid, ratio) for sid in sequence] if candidates else []
         for candidate in candidates:
                 sim = 1.0
                 for i in range(len(sequence)):
-                        sim *= gohe.get_cosine_sim(sequence[i], candidate[i])
+                        sim *= similar[i].get(candidate[i], 0.0)
+                        if sim < ratio:
+                                break
                 if sim >= ratio:
                         for cons in candidates[candidate]:
                                 predictions.append(cons)
@@ -99,7 +111,9 @@ if __name__ == "__main__":
         subgraphs = gather_subgraphs()
         rules     = gather_rules()
         sequences = gather_sequences()
-        gohe._init_gohe(subgraphs)
+        cache = EncodingCache(cache_dir)
+        gohe._init_gohe(subgraphs, cache)
+        print('Encodings loaded: {}, computed: {}'.format(cache.hits, cache.misses))
 
         # Check for similarities in antecedent of sequences and rules
         predictions = {}
@@ -2,10 +2,39 @@
 # various utility functions related with rule mining
 
 import numpy as np
-import pickle, os
-import re
+import pickle, os, sys
 from tqdm import tqdm
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gSpan'))
+from gspan_mining.database import GraphIndex, gids_of_dates
+
+MONTH_NAMES = [ 'january',
+                'february',
+                'march',
+                'april',
+                'may',
+                'june',
+                'july',
+                'august',
+                'september',
+                'october',
+                'november',
+                'december' ]
+
+# Number of graphs of each month in data/months
+MONTH_COUNTS = [ 895,
+                 831,
+                 852,
+                 955,
+                 1016,
+                 1077,
+                 949,
+                 874,
+                 828,
+                 1015,
+                 1394,
+                 1308 ]
+
 def topn(n, support_where):
         """
         n : (int)
@@ -61,19 +90,26 @@ def save_graphs(subgraphs, samples, fname='subgraphs.pkl'):
         with open(fname, 'wb') as f:
                 pickle.dump(res, f)
 
-def reID(subgraphs, samples, freq_seqs, support_where, start_ID=0):
+def reID(subgraphs, samples, freq_seqs, support_where, start_ID=0, registry=None):
         """
         subgraphs : dictionary, key : id, value : subgraph
         samples : ids to be kept
         freq_seqs : dictionary of frequent sequences, key : id, value : sequence
         support_where : dictionary, key : subgraph_id, value : list of supporting news_ids
         start_ID : new ID's will start from this
+        registry : gspan_mining.registry.PatternRegistry, if given, new ID's are
+                   the global ID's of the subgraphs in it and start_ID is unused
 
         This function is used to modify ID's of given arguments
+        With a registry, the same subgraph gets the same ID in every month,
+        and samples isomorphic to each other are merged
         Returns modified versions of them as a tuple
         """
         res = {}
-        idmap = {samples[i] : start_ID + i for i in range(len(samples))}
+        if registry is None:
+                idmap = {samples[i] : start_ID + i for i in range(len(samples))}
+        else:
+                idmap = registry.register({s : subgraphs[s] for s in samples})
         for sampleID in samples:
                 subg = subgraphs[sampleID]
                 subg.gid = idmap[sampleID]
@@ -81,8 +117,8 @@ def reID(subgraphs, samples, freq_seqs, support_where, start_ID=0):
 
         resupport_where = {}
         for i in range(len(samples)):
-                resupport_where[idmap[samples[i]]] = support_where[samples[i]]
-                samples[i] = idmap[samples[i]]
+                resupport_where.setdefault(idmap[samples[i]], set()).update(support_where[samples[i]])
+        samples[:] = list(dict.fromkeys(idmap[s] for s in samples))
 
         for k, seqs in tqdm(freq_seqs.items(), desc='Re-ID'):
                 for j in range(len(seqs)):
@@ -132,62 +168,49 @@ def partition_gspan_data(db_file, part_amounts, part_names):
                                             part_names   : [a, b, c]
                   will create 3 files named a, b, c,
                   containing 300, 400, 300 items(graphs) respectively
+
+        Graphs are located through an offset index built in one pass,
+        so every partition is copied as a single byte range.
+        gSpan can also mine such a window of db_file directly,
+        see its --start_gid, -n and --date_range arguments
+        """
+        index = GraphIndex(db_file)
+
+        start = 0
+        for fname, amount in tqdm(list(zip(part_names, part_amounts)),
+                                  desc='Partitioning Months'):
+                end = min(start + amount, len(index))
+                with open(fname + '.gspan.data', 'wb') as fmonth:
+                        fmonth.write(index.read(start, end))
+                        fmonth.write(b't # -1')
+                start = end
+
+def month_windows(dates_file=None):
+        """
+        dates_file : csv file holding the date of graph i on row i, optional
+
+        Returns dictionary, key : month name, value : (start_gid, count)
+        The windows can be passed to gSpan as --start_gid and -n
+        By default the windows follow MONTH_COUNTS, the split of the month files in data/months
+        With dates_file, they follow the dates instead. dates.csv dates 1395 graphs in November
+        and 1311 in December, so those windows differ from the month files
         """
-        f = open(db_file, 'rb')
-        
-        part_id = 0
-        for fname in tqdm(part_names, desc='Partitioning Months'):
-                c = 0
-                fmonth = open(fname + '.gspan.data', 'w')
-
-                t_exp = r'^t # (?P<gid>[0-9]+)\n$'
-                t_reg = re.compile(t_exp)
-                
-                while c <= part_amounts[part_id]:
-                        line = f.readline()
-                        match = re.match(t_reg, line.decode())
-                        if match:
-                                c += 1
-                                if c > part_amounts[part_id]:
-                                        f.seek(-len(line), 1)
-                                        break
-                        fmonth.write(line.decode())
-                fmonth.write('t # -1')
-
-                fmonth.close()
-                part_id += 1
-
-        f.close()
+        windows = {}
+        start = 0
+        for i, name in enumerate(MONTH_NAMES):
+                if dates_file is None:
+                        windows[name] = (start, MONTH_COUNTS[i])
+                        start += MONTH_COUNTS[i]
+                        continue
+                first = '2015-{:02d}-01'.format(i + 1)
+                last = '2015-{:02d}-31'.format(i + 1)
+                windows[name] = gids_of_dates(dates_file, first, last)
+
+        return windows
 
 def partition_news_gspan():
         '''
         This function is specific to our data
         '''
         db_file = '../data/graph.gspan.data'
-        part_amounts = [ 895,
-                         831,
-                         852,
-                         955,
-                         1016,
-                         1077,
-                         949,
-                         874,
-                         828,
-                         1015,
-                         1394,
-                         1308 ]
-
-        part_names   = [ 'january',
-                         'february',
-                         'march',
-                         'april',
-                         'may',
-                         'june',
-                         'july',
-                         'august',
-                         'september',
-                         'october',
-                         'november',
-                         'december' ]
-
-        partition_gspan_data(db_file, part_amounts, part_names)
+        partition_gspan_data(db_file, MONTH_COUNTS, MONTH_NAMES)